@@ -0,0 +1,246 @@
+"""Single file archives of many midi files, read through a memory map.
+
+An archive starts with a header pointing to the index, followed by the unchanged bytes of the
+midi files. The index holds the name, offset and length of every file and the fields of its
+header chunk, so these are known without reading the files. Appending writes the new files and
+a new index after the old index, and then updates the header, so an archive interrupted while
+appending still has its old contents. The old index is left as unused space.
+"""
+import bisect
+import collections
+import concurrent.futures
+import itertools
+import mmap
+import os
+import struct
+
+from corpus import ParseResult, expand_paths, summarize
+from fileio import MidiFile
+
+
+MAGIC = b'MPA1'
+SUFFIX = '.mpa'
+# magic, index offset, index size, number of entries
+HEADER = struct.Struct('>4sQQQ')
+# offset, length, format type, number of tracks, time division, name length, followed by the names
+RECORD = struct.Struct('>QQHHHH')
+
+ArchiveEntry = collections.namedtuple(
+    'ArchiveEntry', 'name offset length format_type number_of_tracks time_division')
+
+
+def read_header(buffer):
+    """Returns (index_offset, index_size, number_of_entries) from the start of an archive."""
+    if len(buffer) < HEADER.size:
+        raise ValueError("Not a midi archive")
+    magic, index_offset, index_size, number_of_entries = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a midi archive")
+    return index_offset, index_size, number_of_entries
+
+
+def read_index(buffer, number_of_entries):
+    """Returns the list of ArchiveEntry in the index in buffer."""
+    position = number_of_entries * RECORD.size
+    if len(buffer) < position:
+        raise ValueError("Truncated archive index")
+    entries = []
+    for offset, length, format_type, number_of_tracks, time_division, name_length in \
+            RECORD.iter_unpack(buffer[:position]):
+        name = str(buffer[position:position + name_length], 'utf-8')
+        position += name_length
+        entries.append(ArchiveEntry(name, offset, length, format_type, number_of_tracks, time_division))
+    return entries
+
+
+def index_to_bytes(entries):
+    names = [entry.name.encode('utf-8') for entry in entries]
+    records = (RECORD.pack(*entry[1:], len(name)) for entry, name in zip(entries, names))
+    return b''.join(itertools.chain(records, names))
+
+
+class ArchiveWriter(object):
+    """Writes midi files to a new archive, or appends them to an existing one if append is true.
+
+    The index is written by close, which is called when used as a context manager.
+    """
+
+    def __init__(self, filename, append=False):
+        if append:
+            self._stream = open(filename, "r+b")
+            index_offset, index_size, number_of_entries = read_header(self._stream.read(HEADER.size))
+            self._stream.seek(index_offset)
+            self.entries = read_index(self._stream.read(index_size), number_of_entries)
+            self._stream.seek(0, os.SEEK_END)
+        else:
+            self._stream = open(filename, "wb")
+            self._stream.write(HEADER.pack(MAGIC, HEADER.size, 0, 0))
+            self.entries = []
+        self._names = {entry.name for entry in self.entries}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, name, data):
+        """Adds the bytes of a midi file under name and returns its ArchiveEntry.
+
+        Raises ValueError if the name is already used or data doesn't start with a header chunk."""
+        if name in self._names:
+            raise ValueError("{!r} is already in the archive".format(name))
+        try:
+            format_type, number_of_tracks, time_division, _ = MidiFile.parse_header_from_buffer(data)
+        except struct.error:
+            raise ValueError("Truncated header chunk") from None
+        entry = ArchiveEntry(name, self._stream.tell(), len(data), format_type, number_of_tracks, time_division)
+        self._stream.write(data)
+        self.entries.append(entry)
+        self._names.add(name)
+        return entry
+
+    def add_file(self, path, name=None):
+        """Adds the file at path, under its path if name is not given."""
+        with open(path, "rb") as stream:
+            data = stream.read()
+        return self.add(os.fspath(path) if name is None else name, data)
+
+    def close(self):
+        """Writes the index and then the header pointing to it."""
+        if self._stream.closed:
+            return
+        index_offset = self._stream.tell()
+        index = index_to_bytes(self.entries)
+        self._stream.write(index)
+        self._stream.flush()
+        os.fsync(self._stream.fileno())
+        self._stream.seek(0)
+        self._stream.write(HEADER.pack(MAGIC, index_offset, len(index), len(self.entries)))
+        self._stream.close()
+
+
+class MidiArchive(object):
+    """Memory mapped archive, with the files available by name or by position.
+
+    The map is kept alive by the buffers and midi files handed out.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as stream:
+            buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(buffer)
+        self.index_offset, index_size, number_of_entries = read_header(self._buffer)
+        self.entries = read_index(self._buffer[self.index_offset:self.index_offset + index_size],
+                                  number_of_entries)
+        self._positions = {entry.name: position for position, entry in enumerate(self.entries)}
+        self._offsets = [entry.offset for entry in self.entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def position(self, name):
+        try:
+            return self._positions[name]
+        except KeyError:
+            raise KeyError("{!r} is not in the archive".format(name)) from None
+
+    def entry(self, key):
+        """Returns the ArchiveEntry of a name or position, without reading the file."""
+        return self.entries[key if isinstance(key, int) else self.position(key)]
+
+    def buffer(self, key):
+        """Returns the bytes of a file as a memoryview of the map."""
+        entry = self.entry(key)
+        return self._buffer[entry.offset:entry.offset + entry.length]
+
+    def midi_file(self, key, lazy=False, event_filter=None):
+        """Parses a file with MidiFile.from_buffer, so its payloads are slices of the map."""
+        return MidiFile.from_buffer(self.buffer(key), lazy=lazy, event_filter=event_filter)
+
+    def positions_between(self, start, stop):
+        """Returns the range of the positions of the files starting at offsets from start to stop."""
+        return range(bisect.bisect_left(self._offsets, start), bisect.bisect_left(self._offsets, stop))
+
+
+def summarize_entry(name, buffer):
+    """Parses a file and returns its corpus.FileSummary, the default function of scan."""
+    return summarize(MidiFile.from_buffer(buffer), len(buffer))
+
+
+# Archives opened by the scan_range calls of a process, by filename and index offset.
+_open_archives = {}
+
+
+def scan_range(filename, index_offset, start, stop, function=summarize_entry):
+    """Applies function to the files starting at offsets from start to stop.
+
+    Returns a list of ParseResult with the name of each file as path."""
+    key = (filename, index_offset)
+    archive = _open_archives.get(key)
+    if archive is None:
+        archive = _open_archives[key] = MidiArchive(filename)
+    results = []
+    for position in archive.positions_between(start, stop):
+        name = archive.entries[position].name
+        try:
+            results.append(ParseResult(name, function(name, archive.buffer(position)), None))
+        except Exception as e:
+            results.append(ParseResult(name, None, "{}: {}".format(e.__class__.__name__, e)))
+    return results
+
+
+def scan(filename, function=summarize_entry, max_workers=None, range_size=1 << 24, executor=None):
+    """Applies function(name, buffer) to every file of an archive in a process pool and yields
+    a ParseResult for each in completion order, like corpus.parse_files.
+
+    The archive is split into byte ranges of range_size, which the workers read sequentially
+    from their own map of the archive. function has to be picklable. Results are sent back,
+    so they should be small, like the FileSummary of the default function.
+    """
+    if executor is None:
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+            yield from scan(filename, function, max_workers, range_size, executor)
+        return
+
+    filename = os.path.abspath(filename)
+    with open(filename, "rb") as stream:
+        index_offset, _, _ = read_header(stream.read(HEADER.size))
+    max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    starts = iter(range(HEADER.size, index_offset, range_size))
+    in_flight = set()
+    while True:
+        for start in itertools.islice(starts, max_in_flight - len(in_flight)):
+            in_flight.add(executor.submit(scan_range, filename, index_offset, start, start + range_size, function))
+        if not in_flight:
+            return
+        done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            yield from future.result()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Create, list or scan midi archives.")
+    parser.add_argument("archive")
+    parser.add_argument("paths", nargs="*", help="Files or glob patterns to add, like 'library/**/*.mid'")
+    parser.add_argument("--append", action="store_true", help="Add the files to an existing archive")
+    parser.add_argument("--scan", action="store_true", help="Parse every file and print a summary")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    if args.paths:
+        with ArchiveWriter(args.archive, append=args.append) as writer:
+            for path in itertools.chain.from_iterable(expand_paths(path) for path in args.paths):
+                writer.add_file(path)
+    elif args.scan:
+        for parse_result in scan(args.archive, max_workers=args.workers):
+            if parse_result.error is None:
+                print(parse_result.path, *parse_result.result, sep="\t")
+            else:
+                print(parse_result.path, "error", parse_result.error, sep="\t")
+    else:
+        for entry in MidiArchive(args.archive).entries:
+            print(*entry, sep="\t")
@@ -0,0 +1,196 @@
+"""Columnar representation of midi tracks as numpy arrays.
+
+numpy is an optional dependency, and is only needed when TrackArrays are created.
+"""
+from array import array
+import struct
+
+from events import ChannelEvent, MetaEvent
+from events.event_factory import STATUS_TABLE
+import util
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# Whether a status byte has two parameters, for encoding without a function call per event.
+TWO_PARAMS = [util.has_two_params(status) for status in range(0x100)]
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for the columnar track representation")
+
+
+class TrackArrays:
+    """Columnar form of a midi track, with one array entry per event.
+
+    delta and tick are the delta and absolute times of the events.
+    status is the status byte of the event, 0xff for meta events and 0xf0/0xf7 for SysEx events.
+    data1 and data2 are the channel event parameters, 0 if unused.
+    For meta events data1 is the meta event type.
+    payload_offset and payload_length locate the data of meta and SysEx events in payload,
+    which is a bytes-like object shared by all events. The length is 0 for channel events.
+    """
+    columns = ('delta', 'tick', 'status', 'data1', 'data2', 'payload_offset', 'payload_length')
+
+    def __init__(self, delta, status, data1, data2, payload_offset, payload_length, payload, tick=None):
+        require_numpy()
+        self.delta = np.asarray(delta, dtype=np.int64)
+        self.tick = np.cumsum(self.delta) if tick is None else np.asarray(tick, dtype=np.int64)
+        self.status = np.asarray(status, dtype=np.uint8)
+        self.data1 = np.asarray(data1, dtype=np.uint8)
+        self.data2 = np.asarray(data2, dtype=np.uint8)
+        self.payload_offset = np.asarray(payload_offset, dtype=np.int64)
+        self.payload_length = np.asarray(payload_length, dtype=np.int64)
+        self.payload = payload
+
+    def __len__(self):
+        return len(self.delta)
+
+    def __eq__(self, other):
+        """Compares the events, not where the payloads are located in the payload blob."""
+        return len(self) == len(other) \
+            and all(np.array_equal(getattr(self, name), getattr(other, name)) for name in self.columns[:5]) \
+            and all(self.get_payload(i) == other.get_payload(i) for i in range(len(self)))
+
+    def get_payload(self, index):
+        """Returns the payload of the event at index as a slice of payload."""
+        start = int(self.payload_offset[index])
+        return self.payload[start:start + int(self.payload_length[index])]
+
+    @classmethod
+    def from_buffer(cls, buffer, offset, chunk_size):
+        """Decodes the track chunk data at offset in buffer without creating event objects.
+
+        The payloads are not copied, payload is a memoryview of buffer.
+        """
+        buffer = memoryview(buffer)
+        stop = offset + chunk_size
+        payload = buffer[offset:stop]
+        base = offset
+
+        delta, status, data1, data2 = array('q'), array('B'), array('B'), array('B')
+        payload_offset, payload_length = array('q'), array('q')
+        running_status = None
+        while offset < stop:
+            delta_time, offset = util.read_variable_length_int_at(buffer, offset)
+            byte = buffer[offset]
+            offset += 1
+            while byte == 0xf8:  # Filter out MIDI-beat clock
+                byte = buffer[offset]
+                offset += 1
+            if byte == 0xff or byte == 0xf0 or byte == 0xf7:
+                if byte == 0xff:
+                    first = buffer[offset]
+                    offset += 1
+                else:
+                    first = 0
+                length, offset = util.read_variable_length_int_at(buffer, offset)
+                second = 0
+                payload_offset.append(offset - base)
+                payload_length.append(length)
+                offset += length
+                running_status = None
+            else:
+                if byte >= 0xf0:
+                    raise util.unsupported_status_error(byte)
+                if byte < 0x80:
+                    if running_status is None:
+                        raise ValueError("Running status without a preceding channel event")
+                    byte = running_status
+                    offset -= 1
+                first = buffer[offset]
+                if util.has_two_params(byte):
+                    second = buffer[offset + 1]
+                    offset += 2
+                else:
+                    second = 0
+                    offset += 1
+                payload_offset.append(0)
+                payload_length.append(0)
+                running_status = byte
+            delta.append(delta_time)
+            status.append(byte)
+            data1.append(first)
+            data2.append(second)
+        return cls(delta, status, data1, data2, payload_offset, payload_length, payload)
+
+    @classmethod
+    def from_events(cls, events):
+        """Creates track arrays from a list of (delta_time, event) tuples."""
+        delta, status, data1, data2 = array('q'), array('B'), array('B'), array('B')
+        payload_offset, payload_length = array('q'), array('q')
+        payload = bytearray()
+        for delta_time, event in events:
+            delta.append(delta_time)
+            status.append(event.status)
+            if isinstance(event, ChannelEvent):
+                params = event.data
+                data1.append(params[0])
+                data2.append(params[1] if len(params) > 1 else 0)
+                payload_offset.append(0)
+                payload_length.append(0)
+            else:
+                data1.append(event.event_type if isinstance(event, MetaEvent) else 0)
+                data2.append(0)
+                payload_offset.append(len(payload))
+                payload_length.append(len(event.data))
+                payload += event.data
+        return cls(delta, status, data1, data2, payload_offset, payload_length, bytes(payload))
+
+    def to_events(self):
+        """Returns the events as a list of (delta_time, event) tuples."""
+        events = []
+        payload = memoryview(self.payload)
+        params = self.data1.astype(np.int64) | self.data2.astype(np.int64) << 8
+        columns = zip(self.delta.tolist(), self.status.tolist(), params.tolist(),
+                      self.payload_offset.tolist(), self.payload_length.tolist())
+        for delta_time, status, packed, start, length in columns:
+            event_class, _, param_count, constructor = STATUS_TABLE[status]
+            if param_count is not None:
+                event = constructor(packed)
+            elif status == 0xff:
+                event = MetaEvent(packed, payload[start:start + length])
+            else:
+                event = event_class(payload[start:start + length], status)
+            events.append((delta_time, event))
+        return events
+
+    def append_to(self, buffer):
+        """Appends the events as a track chunk to a bytearray without creating event objects.
+
+        Encodes like MidiTrack.append_to, with running status for consecutive channel events."""
+        start = len(buffer)
+        buffer += b'MTrk'
+        buffer += bytes(4)
+        encode = util.encode_variable_length_int
+        payload = memoryview(self.payload)
+        columns = zip(self.delta.tolist(), self.status.tolist(), self.data1.tolist(), self.data2.tolist(),
+                      self.payload_offset.tolist(), self.payload_length.tolist())
+        running_status = None
+        for delta_time, status, first, second, payload_start, length in columns:
+            buffer += encode(delta_time)
+            if status < 0xf0:
+                if status != running_status:
+                    buffer.append(status)
+                    running_status = status
+                buffer.append(first)
+                if TWO_PARAMS[status]:
+                    buffer.append(second)
+            else:
+                buffer.append(status)
+                if status == 0xff:
+                    buffer.append(first)
+                buffer += encode(length)
+                buffer += payload[payload_start:payload_start + length]
+                running_status = None
+        struct.pack_into(">L", buffer, start + 4, len(buffer) - start - 8)
+
+    def to_bytes(self):
+        """Returns the events as a track chunk, see append_to."""
+        buffer = bytearray()
+        self.append_to(buffer)
+        return bytes(buffer)
@@ -0,0 +1,47 @@
+"""Compares per-event decoding through ChannelEvent and the MidiEventFactory status table.
+
+ChannelEvent.from_stream/from_buffer go through util.get_status_and_params, util.get_nibbles
+and ChannelEvent.init_subclass, while MidiEventFactory does one lookup in STATUS_TABLE.
+
+Run from the repository root with: python -m benchmarks.bench_decode
+"""
+import io
+import timeit
+
+from events import ChannelEvent, MidiEventFactory
+
+
+def make_channel_events(number):
+    """Returns note on/off events on alternating channels, every other using running status."""
+    data = bytearray()
+    for i in range(number // 2):
+        data += bytes((0x90 | (i & 0xf), i & 0x7f, 0x40, i & 0x7f, 0x00))
+    return bytes(data)
+
+
+def decode_stream(decoder, data, number):
+    stream = io.BytesIO(data)
+    running_status = None
+    for _ in range(number):
+        running_status = decoder.from_stream(stream, running_status).status
+
+
+def decode_buffer(decoder, data, number):
+    offset = 0
+    running_status = None
+    for _ in range(number):
+        event, offset = decoder.from_buffer(data, offset, running_status)
+        running_status = event.status
+
+
+def main(number=100000, repeat=5):
+    data = make_channel_events(number)
+    for name, function in (("stream", decode_stream), ("buffer", decode_buffer)):
+        for decoder in (ChannelEvent, MidiEventFactory):
+            seconds = min(timeit.repeat(lambda: function(decoder, data, number), number=1, repeat=repeat))
+            print("{:6} {:18} {:8.0f} ns/event {:10.0f} events/s".format(
+                name, decoder.__name__, seconds / number * 1e9, number / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measures the input to event latency of RealTimeMidiDevice.
+
+A writer thread sends note on messages to a pipe (or a pseudo terminal with --pty), recording
+the time of each write, while the device reads the other end. The latency is the difference
+between the receive timestamp of an event and the time its message was written.
+
+Run from the repository root with: python -m benchmarks.bench_latency [--pty]
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+
+from deveceio import RealTimeMidiDevice
+
+
+def open_pipe():
+    return os.pipe()
+
+
+def open_pty():
+    import pty
+    import tty
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return slave, master
+
+
+def measure(read_fd, write_fd, number=2000, interval=0.0005):
+    """Returns the latencies in seconds of number messages written interval seconds apart."""
+    sent = [None] * number
+
+    def write_messages():
+        for i in range(number):
+            message = bytes((0x90 | (i >> 14) & 0xf, (i >> 7) & 0x7f, i & 0x7f))
+            sent[i] = time.perf_counter()
+            os.write(write_fd, message)
+            time.sleep(interval)
+
+    writer = threading.Thread(target=write_messages)
+    latencies = []
+    with open(read_fd, 'rb', buffering=0, closefd=False) as stream:
+        writer.start()
+        for timestamp, event in RealTimeMidiDevice(stream):
+            i = event.channel << 14 | event.note_number << 7 | event.velocity
+            latencies.append(timestamp - sent[i])
+            if len(latencies) == number:
+                break
+    writer.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--pty", action="store_true", help="Use a pseudo terminal instead of a pipe")
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    read_fd, write_fd = open_pty() if args.pty else open_pipe()
+    try:
+        latencies = sorted(measure(read_fd, write_fd, args.number))
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+    microseconds = [latency * 1e6 for latency in latencies]
+    print(json.dumps({
+        "benchmark": "latency",
+        "device": "pty" if args.pty else "pipe",
+        "messages": len(microseconds),
+        "min_us": microseconds[0],
+        "median_us": statistics.median(microseconds),
+        "p99_us": microseconds[int(len(microseconds) * 0.99)],
+        "max_us": microseconds[-1],
+    }))
+
+
+if __name__ == "__main__":
+    main()
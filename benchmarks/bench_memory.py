@@ -0,0 +1,38 @@
+"""Measures the memory used per event object.
+
+Run from the repository root with: python -m benchmarks.bench_memory
+"""
+import gc
+import tracemalloc
+
+from events import NoteOnEvent, MetaEvent, SysExEvent
+
+
+def bytes_per_event(factory, number=100000):
+    """Returns the average number of bytes allocated per object created by factory."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        events = [factory(i) for i in range(number)]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    list_size = events.__sizeof__()
+    return (after - before - list_size) / number
+
+
+def main():
+    results = {
+        "NoteOnEvent (velocity 64)": bytes_per_event(lambda i: NoteOnEvent(i & 0xf, (i & 0x7f, 0x40))),
+        # Best case, the packed parameters are at most 256 and are a cached small int.
+        "NoteOnEvent (velocity 0)": bytes_per_event(lambda i: NoteOnEvent(i & 0xf, (i & 0x7f, 0))),
+        "MetaEvent (shared data)": bytes_per_event(lambda i: MetaEvent(0x01, b'xx')),
+        "SysExEvent (shared data)": bytes_per_event(lambda i: SysExEvent(b'xx')),
+    }
+    for name, size in results.items():
+        print("{:30} {:6.1f} bytes/event".format(name, size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Microbenchmark of the variable length quantity codec.
+
+Compares the generator based helpers in util with the fast codec.
+Run from the repository root with: python -m benchmarks.bench_variable_length
+"""
+import io
+import json
+import random
+import timeit
+
+import util
+
+
+def reference_read(stream):
+    return util.seven_bit_numbers_to_int(bytes(util.variable_bytes_iterator(stream)))
+
+
+def reference_encode(integer):
+    seven_bits = util.seven_bit_iterator(integer)
+    var_bytes = bytearray([next(seven_bits)])
+    var_bytes.extend(b | 0x80 for b in seven_bits)
+    return bytes(reversed(var_bytes))
+
+
+def main(number=100000, repeat=5):
+    rng = random.Random(0)
+    # Mostly small delta times, like in real files.
+    values = [rng.choice((0, 0, rng.randrange(0x80), rng.randrange(0x4000), rng.randrange(0x10000000)))
+              for _ in range(number)]
+    data = util.encode_variable_length_ints(values)
+
+    def reference_decode_all():
+        stream = io.BytesIO(data)
+        for _ in range(number):
+            reference_read(stream)
+
+    def stream_decode_all():
+        stream = io.BytesIO(data)
+        for _ in range(number):
+            util.read_variable_length_int(stream)
+
+    def buffer_decode_all():
+        offset = 0
+        read = util.read_variable_length_int_at
+        for _ in range(number):
+            _, offset = read(data, offset)
+
+    benchmarks = {
+        "decode reference generators": reference_decode_all,
+        "decode read_variable_length_int": stream_decode_all,
+        "decode read_variable_length_int_at": buffer_decode_all,
+        "encode reference generators": lambda: [reference_encode(value) for value in values],
+        "encode int_to_variable_bytes": lambda: [util.int_to_variable_bytes(value) for value in values],
+        "encode encode_variable_length_ints": lambda: util.encode_variable_length_ints(values),
+    }
+    for name, function in benchmarks.items():
+        seconds = min(timeit.repeat(function, number=1, repeat=repeat))
+        print(json.dumps({"name": name, "ns_per_value": seconds / number * 1e9,
+                          "values_per_second": number / seconds}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Deterministic generator of synthetic Standard MIDI Files for benchmarks.
+
+Run from the repository root to write a corpus:
+python -m benchmarks.corpus_generator output_directory --files 100 --events 10000
+"""
+import os
+import random
+
+from events import ChannelEvent, MetaEvent, SysExEvent
+from fileio import MidiFile, MidiTrack
+
+
+def generate_meta_event(rng, meta_size):
+    """Returns a text, tempo or time signature event. Text events have meta_size bytes of data,
+    the others have well formed payloads of their fixed size."""
+    event_type = rng.choice((0x01, 0x03, 0x05, 0x51, 0x58))
+    if event_type == 0x51:
+        data = rng.randrange(250000, 1500000).to_bytes(3, 'big')
+    elif event_type == 0x58:
+        data = bytes((rng.randrange(1, 13), rng.randrange(1, 5), 24, 8))
+    else:
+        data = bytes(rng.randrange(0x20, 0x7f) for _ in range(meta_size))
+    return MetaEvent(event_type, data)
+
+
+def generate_track(rng, number_of_events, running_status_density=0.8, meta_ratio=0.01,
+                   sysex_ratio=0.01, sysex_size=64, meta_size=16):
+    """Returns a MidiTrack with number_of_events events ending with an end of track event.
+
+    running_status_density is the probability that a channel event has the same status as the
+    previous one, so the writer can use running status for it.
+    """
+    events = []
+    status = None
+    for _ in range(number_of_events - 1):
+        delta_time = rng.choice((0, 0, 0, rng.randrange(1, 128), rng.randrange(128, 20000)))
+        kind = rng.random()
+        if kind < meta_ratio:
+            event = generate_meta_event(rng, meta_size)
+            status = None
+        elif kind < meta_ratio + sysex_ratio:
+            event = SysExEvent(bytes(rng.randrange(0x80) for _ in range(sysex_size - 1)) + b'\xf7')
+            status = None
+        else:
+            if status is None or rng.random() >= running_status_density:
+                status = rng.randrange(0x80, 0xf0)
+            event_type, channel = status >> 4, status & 0xf
+            event = ChannelEvent.init_subclass(event_type, channel, (rng.randrange(0x80), rng.randrange(0x80)))
+        events.append((delta_time, event))
+    events.append((0, MetaEvent(0x2f, b'')))
+    return MidiTrack(events=events)
+
+
+def generate_midi_file(seed=0, number_of_events=10000, number_of_tracks=4, **kwargs):
+    """Returns the bytes of a format 1 midi file with number_of_events events spread over the tracks.
+
+    The same arguments always give the same file. kwargs are passed to generate_track.
+    """
+    rng = random.Random(seed)
+    midi_file = MidiFile(1, 480)
+    events_per_track = max(number_of_events // number_of_tracks, 1)
+    midi_file.tracks = [generate_track(rng, events_per_track, **kwargs) for _ in range(number_of_tracks)]
+    return midi_file.to_bytes()
+
+
+def write_corpus(directory, number_of_files, seed=0, **kwargs):
+    """Writes number_of_files generated files to directory and returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(number_of_files):
+        path = os.path.join(directory, "synthetic_{:06}.mid".format(i))
+        with open(path, "wb") as f:
+            f.write(generate_midi_file(seed + i, **kwargs))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Write a synthetic midi corpus.")
+    parser.add_argument("directory")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--tracks", type=int, default=4)
+    parser.add_argument("--running-status-density", type=float, default=0.8)
+    parser.add_argument("--meta-ratio", type=float, default=0.01)
+    parser.add_argument("--sysex-ratio", type=float, default=0.01)
+    parser.add_argument("--sysex-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_corpus(args.directory, args.files, args.seed, number_of_events=args.events,
+                 number_of_tracks=args.tracks, running_status_density=args.running_status_density,
+                 meta_ratio=args.meta_ratio, sysex_ratio=args.sysex_ratio, sysex_size=args.sysex_size)
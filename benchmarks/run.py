@@ -0,0 +1,157 @@
+"""Benchmark suite reporting events/s and bytes/s as JSON.
+
+Run from the repository root with: python -m benchmarks.run [--output results.json]
+Compare two runs with: python -m benchmarks.run --compare old.json new.json
+"""
+import argparse
+import io
+import itertools
+import json
+import platform
+import sys
+import timeit
+
+from benchmarks.corpus_generator import generate_midi_file
+from deveceio import MidiDevice
+from events import MidiEventFactory
+from fileio import MidiFile
+import util
+
+
+def time_function(function, repeat):
+    """Returns the best time in seconds of calling function repeat times."""
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def result(name, seconds, events, number_of_bytes):
+    return {
+        "name": name,
+        "seconds": seconds,
+        "events": events,
+        "bytes": number_of_bytes,
+        "events_per_second": events / seconds,
+        "bytes_per_second": number_of_bytes / seconds,
+    }
+
+
+def bench_variable_length(repeat, number=100000):
+    values = [(i * 2654435761) & (0x0fffffff >> (i % 4 * 7)) for i in range(number)]
+    encoded = [util.int_to_variable_bytes(value) for value in values]
+    data = b''.join(encoded)
+
+    def read_stream():
+        stream = io.BytesIO(data)
+        for _ in range(number):
+            util.read_variable_length_int(stream)
+
+    def read_buffer():
+        offset = 0
+        for _ in range(number):
+            _, offset = util.read_variable_length_int_at(data, offset)
+
+    def write():
+        for value in values:
+            util.int_to_variable_bytes(value)
+
+    yield result("util.read_variable_length_int", time_function(read_stream, repeat), number, len(data))
+    yield result("util.read_variable_length_int_at", time_function(read_buffer, repeat), number, len(data))
+    yield result("util.int_to_variable_bytes", time_function(write, repeat), number, len(data))
+
+
+def bench_single_events(midi_file, repeat):
+    events = [event for track in midi_file.tracks for _, event in track.events]
+    serialized = [event.serialize() for event in events]
+    number_of_bytes = sum(map(len, serialized))
+
+    def from_stream():
+        for data in serialized:
+            MidiEventFactory.from_stream(io.BytesIO(data))
+
+    def serialize():
+        for event in events:
+            event.serialize()
+
+    yield result("MidiEventFactory.from_stream", time_function(from_stream, repeat), len(events), number_of_bytes)
+    yield result("BaseMidiEvent.serialize", time_function(serialize, repeat), len(events), number_of_bytes)
+
+
+def bench_files(data, number_of_events, repeat):
+    yield result("MidiFile.from_stream", time_function(lambda: MidiFile.from_stream(io.BytesIO(data)), repeat),
+                 number_of_events, len(data))
+    yield result("MidiFile.from_buffer", time_function(lambda: MidiFile.from_buffer(data), repeat),
+                 number_of_events, len(data))
+    midi_file = MidiFile.from_buffer(data)
+    yield result("MidiFile.to_bytes", time_function(midi_file.to_bytes, repeat), number_of_events, len(data))
+
+
+def bench_device(midi_file, repeat):
+    """Iterates a MidiDevice over the events of all tracks without delta times."""
+    buffer = bytearray()
+    for track in midi_file.tracks:
+        running_status = None
+        for _, event in track.events:
+            running_status = event.append_to(buffer, running_status)
+    number_of_events = sum(len(track.events) for track in midi_file.tracks)
+
+    def iterate():
+        stream = io.BytesIO(buffer)
+        for _ in itertools.islice(MidiDevice(stream), number_of_events):
+            pass
+
+    yield result("MidiDevice.__iter__", time_function(iterate, repeat), number_of_events, len(buffer))
+
+
+def run(number_of_events=20000, repeat=5, **kwargs):
+    data = generate_midi_file(number_of_events=number_of_events, **kwargs)
+    midi_file = MidiFile.from_buffer(data)
+    number_of_events = sum(len(track.events) for track in midi_file.tracks)
+    results = []
+    results.extend(bench_variable_length(repeat))
+    results.extend(bench_single_events(midi_file, repeat))
+    results.extend(bench_files(data, number_of_events, repeat))
+    results.extend(bench_device(midi_file, repeat))
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "parameters": dict(number_of_events=number_of_events, repeat=repeat, **kwargs),
+        "results": results,
+    }
+
+
+def compare(old, new):
+    """Prints the events/s of new relative to old for the benchmarks in both."""
+    old_results = {r["name"]: r for r in old["results"]}
+    for r in new["results"]:
+        if r["name"] in old_results:
+            ratio = r["events_per_second"] / old_results[r["name"]]["events_per_second"]
+            print("{:40} {:12.0f} events/s {:6.2f}x".format(r["name"], r["events_per_second"], ratio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--tracks", type=int, default=4)
+    parser.add_argument("--running-status-density", type=float, default=0.8)
+    parser.add_argument("--sysex-ratio", type=float, default=0.01)
+    parser.add_argument("--meta-ratio", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the results to this file instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    args = parser.parse_args()
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            compare(json.load(old), json.load(new))
+        return
+    results = run(args.events, args.repeat, number_of_tracks=args.tracks,
+                  running_status_density=args.running_status_density,
+                  sysex_ratio=args.sysex_ratio, meta_ratio=args.meta_ratio)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
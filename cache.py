@@ -0,0 +1,190 @@
+"""Persistent cache of parsed midi files, keyed by the file content and the parser version.
+
+Entries are stored as columnar TrackArrays in a memory mappable file per midi file, so loading
+an entry only maps it and creates numpy views. Requires numpy.
+"""
+import collections
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+
+from arrays import TrackArrays, np, require_numpy
+from fileio import LazyTrackList, MidiFile, MidiTrack, PARSER_VERSION
+
+
+MAGIC = b'MPC1'
+SUFFIX = '.mpc'
+# magic, parser version, format type, time division, number of tracks
+HEADER = struct.Struct('>4sLHHL')
+# number of events, payload size
+TRACK_HEADER = struct.Struct('>QQ')
+COLUMNS = (('delta', 'int64'), ('tick', 'int64'), ('status', 'uint8'), ('data1', 'uint8'),
+           ('data2', 'uint8'), ('payload_offset', 'int64'), ('payload_length', 'int64'))
+ALIGNMENT = 8
+
+
+def padding(size):
+    return -size % ALIGNMENT
+
+
+def content_key(data):
+    """Returns the cache key of the bytes of a midi file."""
+    digest = hashlib.blake2b(data, digest_size=20)
+    digest.update(struct.pack('>L', PARSER_VERSION))
+    return digest.hexdigest()
+
+
+def write_entry(stream, format_type, time_division, track_arrays):
+    stream.write(HEADER.pack(MAGIC, PARSER_VERSION, format_type, time_division, len(track_arrays)))
+    stream.write(bytes(padding(HEADER.size)))
+    for arrays in track_arrays:
+        payload = bytes(arrays.payload)
+        stream.write(TRACK_HEADER.pack(len(arrays), len(payload)))
+        for name, dtype in COLUMNS:
+            data = np.ascontiguousarray(getattr(arrays, name), dtype=dtype).tobytes()
+            stream.write(data)
+            stream.write(bytes(padding(len(data))))
+        stream.write(payload)
+        stream.write(bytes(padding(len(payload))))
+
+
+def read_entry(buffer):
+    """Returns (format_type, time_division, list_of_track_arrays) with the arrays as views of buffer."""
+    magic, version, format_type, time_division, number_of_tracks = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != PARSER_VERSION:
+        raise ValueError("Not a cache entry of this parser version")
+    offset = HEADER.size + padding(HEADER.size)
+    buffer = memoryview(buffer)
+    track_arrays = []
+    for _ in range(number_of_tracks):
+        number_of_events, payload_size = TRACK_HEADER.unpack_from(buffer, offset)
+        offset += TRACK_HEADER.size
+        columns = {}
+        for name, dtype in COLUMNS:
+            columns[name] = np.frombuffer(buffer, dtype=dtype, count=number_of_events, offset=offset)
+            offset += columns[name].nbytes + padding(columns[name].nbytes)
+        payload = buffer[offset:offset + payload_size]
+        offset += payload_size + padding(payload_size)
+        track_arrays.append(TrackArrays(payload=payload, **columns))
+    return format_type, time_division, track_arrays
+
+
+class ParseCache(object):
+    """Cache of parsed midi files in a directory, with an in-process LRU in front of it.
+
+    The directory is kept below max_bytes by removing the least recently used entries, where
+    use is tracked by the modification time of the entry files. Entries are written to a
+    temporary file and renamed into place, so several processes can share a directory.
+    The in-process LRU holds the arrays of the memory_items most recently loaded files.
+    The content key of each loaded path is remembered with the size and modification time of
+    the file, so files that have not changed since are not read and hashed again.
+    """
+
+    def __init__(self, directory, max_bytes=1 << 30, memory_items=128):
+        require_numpy()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory = collections.OrderedDict()
+        self._keys = {}
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load_arrays(self, filename):
+        """Returns (format_type, time_division, list_of_track_arrays) for the file.
+
+        The file is parsed directly to arrays and stored if it is not in the cache."""
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        data = None
+        known = self._keys.get(path)
+        if known is not None and known[0] == version:
+            key = known[1]
+        else:
+            with open(path, "rb") as stream:
+                data = stream.read()
+            key = content_key(data)
+            self._keys[path] = (version, key)
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+        entry = self._read(key)
+        if entry is None:
+            if data is None:
+                with open(path, "rb") as stream:
+                    data = stream.read()
+            entry = MidiFile.arrays_from_buffer(data)
+            self._write(key, entry)
+        self._remember(key, entry)
+        return entry
+
+    def load(self, filename, lazy=True):
+        """Returns the file as a MidiFile built from the cached arrays.
+
+        By default the events of a track are created the first time it is accessed, so a warm
+        load just maps the cache entry and is over 100 times faster than parsing the file.
+        Creating all the event objects at once with lazy false takes most of the time of a
+        parse, and is only about 1.5 times faster."""
+        format_type, time_division, track_arrays = self.load_arrays(filename)
+        midi_file = MidiFile(format_type, time_division)
+        if lazy:
+            # The chunk table offsets are only passed back to decode, so the track indexes are used.
+            midi_file.tracks = LazyTrackList(lambda index: MidiTrack.from_arrays(track_arrays[index]),
+                                             [(index, 0) for index in range(len(track_arrays))],
+                                             iterate=lambda index: iter(track_arrays[index].to_events()))
+        else:
+            midi_file.tracks = [MidiTrack.from_arrays(arrays) for arrays in track_arrays]
+        return midi_file
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as stream:
+                buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            entry = read_entry(buffer)
+            os.utime(path)
+        except (OSError, ValueError, struct.error):
+            return None  # Missing, evicted by another process or from another parser version.
+        return entry
+
+    def _write(self, key, entry):
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, "wb") as stream:
+                write_entry(stream, *entry)
+            os.replace(temporary_path, self.path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the directory is below max_bytes."""
+        entries = []
+        for directory_entry in os.scandir(self.directory):
+            if directory_entry.name.endswith(SUFFIX):
+                try:
+                    stat = directory_entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, directory_entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
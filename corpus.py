@@ -0,0 +1,128 @@
+"""Parsing of whole libraries of midi files in a process pool."""
+import collections
+import concurrent.futures
+import glob
+import itertools
+import os
+
+from events import ChannelEvent
+from fileio import MidiFile
+
+
+FileSummary = collections.namedtuple(
+    'FileSummary', 'format_type number_of_tracks time_division number_of_events size')
+
+# result is a MidiFile or a FileSummary, error is a string describing the exception if parsing failed.
+ParseResult = collections.namedtuple('ParseResult', 'path result error')
+
+
+def summarize(midi_file, size):
+    number_of_events = sum(len(track.events) for track in midi_file.tracks)
+    return FileSummary(midi_file.format_type, len(midi_file.tracks), midi_file.time_division,
+                       number_of_events, size)
+
+
+class PayloadPool(object):
+    """Interns the data of meta and SysEx events, so equal payloads share one bytes object.
+
+    Files of a corpus often repeat the same names, copyright notices and synth setup dumps.
+    Interned payloads are bytes, so they don't keep the buffer a file was parsed from alive.
+    """
+
+    def __init__(self):
+        self._payloads = {}
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def intern(self, data):
+        """Returns the pooled bytes equal to data."""
+        data = bytes(data)
+        return self._payloads.setdefault(data, data)
+
+    def intern_events(self, events):
+        """Replaces the data of the meta and SysEx events in a list of (delta_time, event) tuples.
+
+        The encoded events don't change, so tracks are not marked as modified."""
+        intern = self.intern
+        for _, event in events:
+            if not isinstance(event, ChannelEvent):
+                event.intern_data(intern(event.data))
+
+    def intern_file(self, midi_file):
+        for track in midi_file.tracks:
+            self.intern_events(track.events)
+        return midi_file
+
+
+def parse_file(path, summary=False):
+    """Parses a single file, returning a ParseResult instead of raising."""
+    try:
+        with open(path, "rb") as stream:
+            data = stream.read()
+        midi_file = MidiFile.from_buffer(data)
+        result = summarize(midi_file, len(data)) if summary else midi_file
+        return ParseResult(path, result, None)
+    except Exception as e:
+        return ParseResult(path, None, "{}: {}".format(e.__class__.__name__, e))
+
+
+def parse_chunk(paths, summary=False):
+    return [parse_file(path, summary) for path in paths]
+
+
+def expand_paths(paths):
+    """Yields the paths, expanding a single glob pattern given as a string."""
+    if isinstance(paths, (str, bytes, os.PathLike)):
+        return iter(sorted(glob.iglob(os.fspath(paths), recursive=True)))
+    return iter(paths)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_files(paths, summary=False, max_workers=None, chunksize=16, executor=None):
+    """Parses midi files in a process pool and yields a ParseResult for each in completion order.
+
+    paths is an iterable of paths or a glob pattern. The paths are sent to the workers chunksize at
+    a time, with at most two chunks per worker in flight. If summary is true, a FileSummary is sent
+    back instead of the parsed MidiFile, which is much cheaper to pickle.
+    An executor can be given to reuse a pool, max_workers should then be its number of workers.
+    """
+    if executor is None:
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+            yield from parse_files(paths, summary, max_workers, chunksize, executor)
+        return
+
+    max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    chunks = chunked(expand_paths(paths), chunksize)
+    in_flight = set()
+    while True:
+        for chunk in itertools.islice(chunks, max_in_flight - len(in_flight)):
+            in_flight.add(executor.submit(parse_chunk, chunk, summary))
+        if not in_flight:
+            return
+        done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            yield from future.result()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Parse midi files in parallel and print a summary of each.")
+    parser.add_argument("paths", nargs="+", help="Files or glob patterns, like 'library/**/*.mid'")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=16)
+    args = parser.parse_args()
+    paths = itertools.chain.from_iterable(expand_paths(path) for path in args.paths)
+    for parse_result in parse_files(paths, summary=True, max_workers=args.workers, chunksize=args.chunksize):
+        if parse_result.error is None:
+            print(parse_result.path, *parse_result.result, sep="\t")
+        else:
+            print(parse_result.path, "error", parse_result.error, sep="\t")
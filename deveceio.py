@@ -1,4 +1,11 @@
-from events.event_factory import event_generator
+import asyncio
+import collections
+import os
+import time
+
+from events import MetaEvent, SysExEvent, SystemCommonEvent, SystemRealTimeEvent
+from events.event_factory import event_generator, STATUS_TABLE, get_running_status_entry
+import util
 
 
 class MidiDevice(object):
@@ -10,6 +17,309 @@ class MidiDevice(object):
         return event_generator(self.stream)
 
 
+# Number of data bytes of the system common messages.
+SYSTEM_COMMON_PARAM_COUNTS = {0xf1: 1, 0xf2: 2, 0xf3: 1, 0xf4: 0, 0xf5: 0, 0xf6: 0}
+
+
+class MidiStreamParser(object):
+    """Incremental parser for the bytes of a live midi stream.
+
+    feed can be called with any number of bytes, and messages split between calls are
+    completed by later calls. System real-time bytes (0xf8-0xff) are handled anywhere in the
+    stream, also in the middle of other messages, and are dropped if their status is in
+    real_time_filter. SysEx messages are read until the terminating 0xf7, which is kept at the
+    end of the data like in midi files. Data bytes without a status are ignored.
+    """
+
+    def __init__(self, real_time_filter=(0xf8,)):
+        self.real_time_filter = frozenset(real_time_filter)
+        self.running_status = None
+        self._entry = None
+        self._params = []
+        self._param_count = 0
+        self._sysex = None
+
+    def feed(self, data):
+        """Parses the bytes in data and returns a list of the completed events."""
+        events = []
+        params = self._params
+        for byte in data:
+            if byte >= 0xf8:
+                if byte not in self.real_time_filter:
+                    events.append(SystemRealTimeEvent(byte))
+                continue
+            if byte < 0x80:
+                if self._sysex is not None:
+                    self._sysex.append(byte)
+                    continue
+                if self.running_status is None:
+                    continue
+                params.append(byte)
+                if len(params) == self._param_count:
+                    events.append(self._complete_message())
+                continue
+            if self._sysex is not None:
+                if byte == 0xf7:
+                    self._sysex.append(byte)
+                events.append(SysExEvent(bytes(self._sysex)))
+                self._sysex = None
+                if byte == 0xf7:
+                    continue
+            self._start_message(byte, events)
+        return events
+
+    def _start_message(self, status, events):
+        self._params.clear()
+        if status < 0xf0:
+            self.running_status = status
+            self._entry = STATUS_TABLE[status]
+            self._param_count = self._entry.param_count
+            return
+        self.running_status = None
+        if status == 0xf0:
+            self._sysex = bytearray()
+        elif status in SYSTEM_COMMON_PARAM_COUNTS:
+            self._param_count = SYSTEM_COMMON_PARAM_COUNTS[status]
+            if self._param_count:
+                self.running_status = status
+                self._entry = None
+            else:
+                events.append(SystemCommonEvent(status))
+
+    def _complete_message(self):
+        params = self._params
+        if self._entry is None:
+            event = SystemCommonEvent(self.running_status, bytes(params))
+            self.running_status = None
+        elif self._param_count == 2:
+            event = self._entry.constructor(params[0] | params[1] << 8)
+        else:
+            event = self._entry.constructor(params[0])
+        params.clear()
+        return event
+
+
+class RealTimeMidiDevice(object):
+    """Low latency reader of a live midi stream.
+
+    Reads whatever bytes are available, up to read_size at a time, and parses them with a
+    MidiStreamParser. Iterating yields (timestamp, event) tuples, where timestamp is the
+    value of clock (a monotonic clock in seconds) right after the bytes were received.
+    """
+
+    def __init__(self, stream, read_size=4096, real_time_filter=(0xf8,), clock=time.perf_counter):
+        self.stream = stream
+        self.read_size = read_size
+        self.real_time_filter = real_time_filter
+        self.clock = clock
+
+    def _get_read_function(self):
+        try:
+            fd = self.stream.fileno()
+        except (AttributeError, OSError):
+            return getattr(self.stream, 'read1', self.stream.read)
+        return lambda size: os.read(fd, size)
+
+    def __iter__(self):
+        read = self._get_read_function()
+        read_size = self.read_size
+        clock = self.clock
+        parser = MidiStreamParser(self.real_time_filter)
+        while True:
+            data = read(read_size)
+            timestamp = clock()
+            if not data:
+                return
+            for event in parser.feed(data):
+                yield timestamp, event
+
+
+# Overflow policies for full EventQueues.
+BLOCK = 'block'
+DROP_OLDEST = 'drop-oldest'
+DROP_NEWEST = 'drop-newest'
+
+
+async def read_variable_length_int(reader):
+    """Async version of util.read_variable_length_int for an asyncio.StreamReader."""
+    value = 0
+    while True:
+        byte, = await reader.readexactly(1)
+        value = (value << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            return value
+
+
+async def read_event(reader, running_status=None):
+    """Async version of MidiEventFactory.from_stream for an asyncio.StreamReader."""
+    status, = await reader.readexactly(1)
+    while status == 0xf8:  # Filter out MIDI-beat clock
+        status, = await reader.readexactly(1)
+    entry = STATUS_TABLE[status]
+    if entry is None:
+        _, _, param_count, constructor = get_running_status_entry(running_status)
+        if param_count == 2:
+            second, = await reader.readexactly(1)
+            return constructor(status | second << 8)
+        return constructor(status)
+    event_class, _, param_count, constructor = entry
+    if param_count == 2:
+        first, second = await reader.readexactly(2)
+        return constructor(first | second << 8)
+    if param_count == 1:
+        first, = await reader.readexactly(1)
+        return constructor(first)
+    if event_class is MetaEvent:
+        event_type, = await reader.readexactly(1)
+        return MetaEvent(event_type, await reader.readexactly(await read_variable_length_int(reader)))
+    if event_class is SysExEvent:
+        return SysExEvent(await reader.readexactly(await read_variable_length_int(reader)), status)
+    raise util.unsupported_status_error(status)
+
+
+async def async_event_generator(reader):
+    """Async version of event_generator, which stops at the end of the stream."""
+    running_status = None
+    while True:
+        try:
+            event = await read_event(reader, running_status)
+        except asyncio.IncompleteReadError:
+            return
+        running_status = event.status
+        yield event
+
+
+class EventQueue:
+    """Bounded queue of events for one consumer of an AsyncMidiDevice.
+
+    When the queue holds maxsize events, the BLOCK policy makes the device wait for the consumer,
+    DROP_OLDEST drops the oldest queued event and DROP_NEWEST drops the new event.
+    The number of dropped events is counted in dropped. A maxsize of 0 means unbounded.
+    """
+
+    def __init__(self, maxsize=1024, overflow=BLOCK):
+        if overflow not in (BLOCK, DROP_OLDEST, DROP_NEWEST):
+            raise ValueError("Unknown overflow policy: {}".format(overflow))
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self._events = collections.deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._exception = None
+
+    def __len__(self):
+        return len(self._events)
+
+    def full(self):
+        return 0 < self.maxsize <= len(self._events)
+
+    async def put(self, event):
+        if self.full():
+            if self.overflow == BLOCK:
+                while self.full() and not self.closed:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+            elif self.overflow == DROP_NEWEST:
+                self.dropped += 1
+                return
+            else:
+                self._events.popleft()
+                self.dropped += 1
+        if not self.closed:
+            self._events.append(event)
+            self._not_empty.set()
+
+    def close(self, exception=None):
+        """Ends the iteration when the queued events are consumed, raising exception if given."""
+        self.closed = True
+        self._exception = exception
+        self._not_empty.set()
+        self._not_full.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._events:
+            if self.closed:
+                if self._exception is not None:
+                    raise self._exception
+                raise StopAsyncIteration
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        event = self._events.popleft()
+        self._not_full.set()
+        return event
+
+
+class AsyncMidiDevice(object):
+    """Reads events from an asyncio.StreamReader and fans them out to bounded EventQueues.
+
+    async for event in AsyncMidiDevice(reader) subscribes a queue and starts reading.
+    For several consumers, subscribe a queue for each and then call start.
+    """
+
+    def __init__(self, reader, maxsize=1024, overflow=BLOCK):
+        self.reader = reader
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.queues = []
+        self._task = None
+
+    @classmethod
+    async def from_fd(cls, fd, **kwargs):
+        """Creates a device reading from a pipe, tty or socket file descriptor without blocking."""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                     os.fdopen(fd, 'rb', buffering=0))
+        return cls(reader, **kwargs)
+
+    def subscribe(self, maxsize=None, overflow=None):
+        """Returns a new EventQueue receiving all events read from now on."""
+        queue = EventQueue(self.maxsize if maxsize is None else maxsize,
+                           self.overflow if overflow is None else overflow)
+        self.queues.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        """Removes and closes queue, so a device blocked on it continues."""
+        self.queues.remove(queue)
+        queue.close()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._read_events())
+        return self._task
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _read_events(self):
+        exception = None
+        try:
+            async for event in async_event_generator(self.reader):
+                for queue in list(self.queues):
+                    await queue.put(event)
+        except Exception as e:
+            exception = e
+        finally:
+            for queue in self.queues:
+                queue.close(exception)
+
+    def __aiter__(self):
+        queue = self.subscribe()
+        self.start()
+        return queue
+
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1:
@@ -1,5 +1,5 @@
 
-from .base import SysExEvent
+from .base import SysExEvent, SystemCommonEvent, SystemRealTimeEvent
 from .channel_events import (
     ChannelEvent,
     NoteOffEvent,
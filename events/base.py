@@ -1,8 +1,18 @@
-import io
+import weakref
+
 import util
 
 
+def set_owner(events, owner):
+    """Makes the events of a list of (delta_time, event) tuples mark owner as modified when they
+    are changed. owner is an EventList, which is only referenced weakly."""
+    reference = weakref.ref(owner)
+    for _, event in events:
+        event._owner = reference
+
+
 class FromStreamMixin:
+    __slots__ = ()
 
     @classmethod
     def from_stream(cls, stream, running_status=None):
@@ -12,39 +22,170 @@ class FromStreamMixin:
         return cls.from_stream_and_status(stream, status, running_status)
 
 
-class BaseMidiEvent(FromStreamMixin):
-    """Abstract base class for all Midi events"""
+class FromBufferMixin:
+    __slots__ = ()
+
+    @classmethod
+    def from_buffer(cls, buffer, offset=0, running_status=None):
+        """Returns a tuple of the form (event, new_offset)"""
+        status = buffer[offset]
+        offset += 1
+        while status == 0xf8:  # Filter out MIDI-beat clock
+            status = buffer[offset]
+            offset += 1
+        return cls.from_buffer_and_status(buffer, offset, status, running_status)
+
+
+class BaseMidiEvent(FromStreamMixin, FromBufferMixin):
+    """Abstract base class for all Midi events
+
+    Events of parsed tracks have an owner, see set_owner, which they mark as modified when
+    one of their attributes is set. An event in several tracks only marks the last one it was
+    parsed or encoded in.
+    """
+    __slots__ = ('_owner',)
+
+    def _record_edit(self):
+        try:
+            owner = self._owner()
+        except AttributeError:
+            return  # Not in a parsed track.
+        if owner is not None:
+            owner.modified = True
 
     @classmethod
     def from_stream_and_status(cls, stream, status, running_status=None):
         raise NotImplementedError("MidiEvent is an abstract class")
 
+    @classmethod
+    def from_buffer_and_status(cls, buffer, offset, status, running_status=None):
+        raise NotImplementedError("MidiEvent is an abstract class")
+
     def write_to(self, stream, running_status=None):
         pass
 
+    def append_to(self, buffer, running_status=None):
+        """Appends the event to a bytearray and returns the running status after the event."""
+        raise NotImplementedError("MidiEvent is an abstract class")
+
     def serialize(self):
-        with io.BytesIO() as stream:
-            self.write_to(stream)
-            return stream.getvalue()
+        buffer = bytearray()
+        self.append_to(buffer)
+        return bytes(buffer)
+
+    def key(self):
+        """Returns a hashable value that is equal for equal events, for use in sets and dicts.
+
+        Events are mutable, so they are not hashable themselves. The key is the encoded event."""
+        return self.serialize()
 
 
 class SysExEvent(BaseMidiEvent):
+    __slots__ = ('_data', '_status')
 
     def __init__(self, data, status=0xf0):
-        self.data = data
-        self.status = status
+        self._data = data
+        self._status = status
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        self._record_edit()
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, status):
+        self._status = status
+        self._record_edit()
 
     @classmethod
     def from_stream_and_status(cls, stream, status, running_status=None):
         data = util.read_variable_length_data(stream)
         return cls(data, status)
 
+    @classmethod
+    def from_buffer_and_status(cls, buffer, offset, status, running_status=None):
+        data, offset = util.read_variable_length_data_at(buffer, offset)
+        return cls(data, status), offset
+
     def write_to(self, stream, running_status=None):
         stream.write(bytes((self.status,)))
         util.write_variable_length_data(stream, self.data)
 
+    def append_to(self, buffer, running_status=None):
+        buffer.append(self.status)
+        buffer += util.int_to_variable_bytes(len(self.data))
+        buffer += self.data
+        return None
+
+    def intern_data(self, data):
+        """Replaces data with an equal object, like a pooled bytes object, without it counting
+        as a change of the event."""
+        if data != self._data:
+            raise ValueError("Interned data has to be equal to the data of the event")
+        self._data = data
+
     def __eq__(self, other):
         return self.status == other.status and self.data == other.data
 
+    def __reduce__(self):
+        # data may be a memoryview slice of a parsed buffer, which can not be pickled.
+        return self.__class__, (bytes(self.data), self.status)
+
     def __repr__(self):
         return "<{}: data={}>".format(self.__class__.__name__, self.data)
+
+
+class SystemCommonEvent(BaseMidiEvent):
+    """System common message (0xf1-0xf6) from a live midi stream. These cancel running status."""
+    __slots__ = ('status', 'data')
+
+    def __init__(self, status, data=b''):
+        self.status = status
+        self.data = data
+
+    def write_to(self, stream, running_status=None):
+        stream.write(bytes((self.status,)))
+        stream.write(self.data)
+
+    def append_to(self, buffer, running_status=None):
+        buffer.append(self.status)
+        buffer += self.data
+        return None
+
+    def __eq__(self, other):
+        return isinstance(other, SystemCommonEvent) and self.status == other.status and self.data == other.data
+
+    def __repr__(self):
+        return "<{}: status=0x{:02x} data={}>".format(self.__class__.__name__, self.status, bytes(self.data))
+
+
+class SystemRealTimeEvent(BaseMidiEvent):
+    """System real-time message (0xf8-0xff) from a live midi stream.
+
+    These are single bytes that may appear anywhere, even inside other messages,
+    and they don't affect running status."""
+    __slots__ = ('status',)
+
+    def __init__(self, status):
+        self.status = status
+
+    def write_to(self, stream, running_status=None):
+        stream.write(bytes((self.status,)))
+
+    def append_to(self, buffer, running_status=None):
+        buffer.append(self.status)
+        return running_status
+
+    def __eq__(self, other):
+        return isinstance(other, SystemRealTimeEvent) and self.status == other.status
+
+    def __repr__(self):
+        return "<{}: status=0x{:02x}>".format(self.__class__.__name__, self.status)
@@ -4,21 +4,28 @@ import util
 
 
 class ChannelEventParameter:
-    """Descriptor for getting and setting channel event parameters."""
+    """Descriptor for getting and setting channel event parameters.
+
+    The parameters are packed into one integer, one byte per parameter with the first parameter
+    in the least significant byte."""
 
     def __init__(self, index=None, name=None):
         self.index = index
         self.name = name
 
     def __get__(self, instance, cls):
-        return instance.data[self.index]
+        if instance is None:
+            return self
+        return (instance._params >> (self.index << 3)) & 0xff
 
     def __set__(self, instance, value):
         if not isinstance(value, int):
             raise TypeError("{} has to be an integer".format(self.name))
         if not 0 <= value <= 127:
             raise ValueError("{} has to be between 0 and 127".format(self.name))
-        instance.data[self.index] = value
+        shift = self.index << 3
+        instance._params = instance._params & ~(0xff << shift) | value << shift
+        instance._record_edit()
 
     def __delete__(self, instance):
         pass
@@ -39,6 +46,7 @@ class ParametersMetaClass(type):
                 param_list.append(key)
 
         namespace["param_list"] = param_list
+        namespace.setdefault("__slots__", ())
         return super().__new__(mcs, name, bases, dict(namespace))
 
 
@@ -59,20 +67,75 @@ class ChannelEventMetaClass(ParametersMetaClass, EventRegisterMetaClass):
 
 
 class ChannelEvent(BaseMidiEvent, metaclass=ChannelEventMetaClass):
+    """Base class for channel events.
+
+    Instances have no __dict__, the parameters are packed into a single integer.
+    A typical NoteOnEvent takes 84 bytes on 64-bit CPython 3.11, 56 for the object and 28 for
+    the packed integer, compared to about 147 bytes with a __dict__ and a bytearray. Only
+    packed integers up to 256, which in practice means a velocity of 0, are cached small ints
+    shared between events. See benchmarks/bench_memory.py.
+    """
+    __slots__ = ('_channel', '_params')
     Parameter = ChannelEventParameter
 
     def __init__(self, channel, data):
-        self.channel = channel
-        self.data = data
+        self._channel = channel
+        self._params = int.from_bytes(bytes(data[:len(self.param_list)]), 'little')
+
+    @property
+    def channel(self):
+        return self._channel
+
+    @channel.setter
+    def channel(self, channel):
+        self._channel = channel
+        self._record_edit()
+
+    @property
+    def data(self):
+        """The parameters as bytes."""
+        return self._params.to_bytes(len(self.param_list), 'little')
+
+    @data.setter
+    def data(self, data):
+        self._params = int.from_bytes(bytes(data[:len(self.param_list)]), 'little')
+        self._record_edit()
 
     @classmethod
     def init_subclass(cls, event_type, channel, params):
         class_to_use = cls.event_types.get(event_type)
         return class_to_use(channel, params)
 
+    @classmethod
+    def from_packed(cls, channel, params):
+        """Creates an event from parameters already packed into an integer."""
+        event = cls.__new__(cls)
+        event._channel = channel
+        event._params = params
+        return event
+
+    def packed(self):
+        """Returns (channel, params) with the parameters packed as for from_packed, the first one
+        in the low byte. This is faster than reading the channel and parameter attributes."""
+        return self._channel, self._params
+
+    @classmethod
+    def packed_constructor(cls, channel):
+        """Returns a function creating events on channel from packed parameters.
+
+        This is the same as from_packed, without the classmethod and argument overhead."""
+        new = cls.__new__
+
+        def constructor(params):
+            event = new(cls)
+            event._channel = channel
+            event._params = params
+            return event
+        return constructor
+
     @property
     def status(self):
-        return (self.event_type << 4) + self.channel
+        return (self.event_type << 4) + self._channel
 
     @classmethod
     def from_stream_and_status(cls, stream, status, running_status=None):
@@ -80,20 +143,39 @@ class ChannelEvent(BaseMidiEvent, metaclass=ChannelEventMetaClass):
         event_type, channel = util.get_nibbles(status)
         return cls.init_subclass(event_type, channel, params)
 
+    @classmethod
+    def from_buffer_and_status(cls, buffer, offset, status, running_status=None):
+        status, params, offset = util.get_status_and_params_at(buffer, offset, status, running_status)
+        event_type, channel = util.get_nibbles(status)
+        return cls.init_subclass(event_type, channel, params), offset
+
     def __repr__(self):
         param_string = ", ".join(
             "{}={}".format(param, self.__getattribute__(param)) for param in self.param_list)
         return "<{}: channel={}, {}>".format(self.__class__.__name__, self.channel, param_string)
 
     def __eq__(self, other):
-        return self.status == other.status\
-            and all(getattr(self, param) == getattr(other, param) for param in self.param_list)
+        return self.status == other.status and self._params == other._params
+
+    def __reduce__(self):
+        return self.__class__, (self._channel, self.data)
+
+    def key(self):
+        """The status and the parameters packed into an integer, see BaseMidiEvent.key."""
+        return self.status | self._params << 8
 
     def write_to(self, stream, running_status=None):
         if running_status != self.status:
             stream.write(bytes((self.status, )))
         stream.write(self.data)
 
+    def append_to(self, buffer, running_status=None):
+        status = self.status
+        if running_status != status:
+            buffer.append(status)
+        buffer += self.data
+        return status
+
 
 class NoteOffEvent(ChannelEvent):
     event_type = 0x8
@@ -1,25 +1,125 @@
+import collections
 from .channel_events import ChannelEvent
 from .meta_events import MetaEvent
-from .base import SysExEvent, FromStreamMixin
+from .base import SysExEvent, FromStreamMixin, FromBufferMixin
+import util
 
 
-class MidiEventFactory(FromStreamMixin):
+# Precomputed decoding information for a status byte. param_count and constructor are None
+# for events that are not channel events, these are decoded by event_class instead.
+StatusEntry = collections.namedtuple('StatusEntry', 'event_class channel param_count constructor')
+
+
+class MidiBeatClockFilter:
+    """Filters out MIDI-beat clock by decoding the event after it instead."""
 
     @staticmethod
     def from_stream_and_status(stream, status, running_status=None):
-        if status == 0xff:
-            event_class = MetaEvent
-        elif status in (0xf0, 0xf7):
-            event_class = SysExEvent
-        else:
-            event_class = ChannelEvent
+        while status == 0xf8:
+            status, = stream.read(1)
+        return MidiEventFactory.from_stream_and_status(stream, status, running_status)
+
+    @staticmethod
+    def from_buffer_and_status(buffer, offset, status, running_status=None):
+        while status == 0xf8:
+            status = buffer[offset]
+            offset += 1
+        return MidiEventFactory.from_buffer_and_status(buffer, offset, status, running_status)
+
+
+class UnsupportedStatus:
+
+    @staticmethod
+    def from_stream_and_status(stream, status, running_status=None):
+        raise util.unsupported_status_error(status)
+
+    @staticmethod
+    def from_buffer_and_status(buffer, offset, status, running_status=None):
+        raise util.unsupported_status_error(status)
+
+
+def build_status_table():
+    """Returns a list with a StatusEntry for every possible status byte.
+
+    Data bytes map to None, as they mean running status."""
+    table = [None] * 0x80
+    for status in range(0x80, 0xf0):
+        event_type, channel = util.get_nibbles(status)
+        event_class = ChannelEvent.event_types[event_type]
+        param_count = 2 if util.has_two_params(status) else 1
+        constructor = event_class.packed_constructor(channel)
+        table.append(StatusEntry(event_class, channel, param_count, constructor))
+    for status in range(0xf0, 0x100):
+        table.append(StatusEntry(UnsupportedStatus, None, None, None))
+    table[0xf0] = table[0xf7] = StatusEntry(SysExEvent, None, None, None)
+    table[0xf8] = StatusEntry(MidiBeatClockFilter, None, None, None)
+    table[0xff] = StatusEntry(MetaEvent, None, None, None)
+    return table
+
+
+STATUS_TABLE = build_status_table()
+
+
+def get_running_status_entry(running_status):
+    entry = STATUS_TABLE[running_status] if running_status is not None else None
+    if entry is None or entry.param_count is None:
+        raise ValueError("Running status without a preceding channel event")
+    return entry
+
+
+class MidiEventFactory(FromStreamMixin, FromBufferMixin):
+    """Decodes any event with a single lookup in STATUS_TABLE."""
+
+    @staticmethod
+    def from_stream_and_status(stream, status, running_status=None):
+        entry = STATUS_TABLE[status]
+        if entry is None:
+            _, _, param_count, constructor = get_running_status_entry(running_status)
+            if param_count == 2:
+                return constructor(status | stream.read(1)[0] << 8)
+            return constructor(status)
+        event_class, _, param_count, constructor = entry
+        if param_count == 2:
+            first, second = stream.read(2)
+            return constructor(first | second << 8)
+        if param_count == 1:
+            return constructor(stream.read(1)[0])
         return event_class.from_stream_and_status(stream, status, running_status)
 
+    @staticmethod
+    def from_buffer_and_status(buffer, offset, status, running_status=None):
+        entry = STATUS_TABLE[status]
+        if entry is None:
+            _, _, param_count, constructor = get_running_status_entry(running_status)
+            if param_count == 2:
+                return constructor(status | buffer[offset] << 8), offset + 1
+            return constructor(status), offset
+        event_class, _, param_count, constructor = entry
+        if param_count == 2:
+            return constructor(buffer[offset] | buffer[offset + 1] << 8), offset + 2
+        if param_count == 1:
+            return constructor(buffer[offset]), offset + 1
+        return event_class.from_buffer_and_status(buffer, offset, status, running_status)
+
+
+def event_generator(stream, stats=None, event_filter=None):
+    """Yields the events in stream. If stats is a ParseStats, the events are recorded in it.
 
-def event_generator(stream):
+    If event_filter is a filtering.EventFilter, only the events it keeps are decoded and yielded."""
+    if stats is not None and event_filter is not None:
+        raise ValueError("stats and event_filter can not be used together")
+    if stats is not None:
+        from .instrumentation import instrumented_event_generator
+        return instrumented_event_generator(stream, stats)
+    if event_filter is not None:
+        from .filtering import filtered_event_generator
+        return filtered_event_generator(stream, event_filter)
+    return _event_generator(stream)
+
+
+def _event_generator(stream):
     running_status = None
     while True:
         event = MidiEventFactory.from_stream(stream, running_status=running_status)
         running_status = event.status
         yield event
-
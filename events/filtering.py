@@ -0,0 +1,139 @@
+"""Filtering of events while parsing, so unwanted events are skipped without being decoded.
+
+Like instrumentation, filtered parsing goes through the separate generators in this module.
+"""
+from .event_factory import STATUS_TABLE, MidiEventFactory, UnsupportedStatus
+from .meta_events import MetaEvent
+import util
+
+
+class EventFilter(object):
+    """Selects the events to keep when parsing.
+
+    event_classes is a tuple of event classes, statuses a container of status bytes like
+    range(0x80, 0xa0), channels a container of channel numbers and meta_types a container
+    of meta event types. Criteria that are None don't filter anything, and an event is kept
+    if it passes all of them. channels only applies to channel events and meta_types only
+    to meta events, so keeping only tempo events is
+    EventFilter(event_classes=(MetaEvent,), meta_types={0x51}).
+
+    The criteria are evaluated once per status byte and meta type when the filter is created.
+    """
+
+    def __init__(self, event_classes=None, statuses=None, channels=None, meta_types=None):
+        self.event_classes = event_classes
+        self.statuses = statuses
+        self.channels = channels
+        self.meta_types = meta_types
+        self.keep_status = [self._keeps_status(status) for status in range(0x100)]
+        self.keep_meta = [meta_types is None or event_type in meta_types for event_type in range(0x100)]
+
+    def _keeps_status(self, status):
+        entry = STATUS_TABLE[status]
+        if entry is None:
+            return False  # Data byte, running status is looked up by its real status.
+        if entry.event_class is UnsupportedStatus:
+            return True  # Decoded to raise the error of the unfiltered parser.
+        if self.event_classes is not None and not issubclass(entry.event_class, tuple(self.event_classes)):
+            return False
+        if self.statuses is not None and status not in self.statuses:
+            return False
+        return entry.channel is None or self.channels is None or entry.channel in self.channels
+
+    def _decodes(self, status, running_status):
+        if status >= 0x80:
+            return self.keep_status[status]
+        # Running status without a preceding channel event is decoded to raise the parser error.
+        return running_status is None or STATUS_TABLE[running_status].param_count is None \
+            or self.keep_status[running_status]
+
+    def read_event(self, stream, running_status=None):
+        """Reads an event like MidiEventFactory.from_stream, decoding it only if it is kept.
+
+        Returns a tuple of the form (event_or_none, running_status)."""
+        status, = stream.read(1)
+        while status == 0xf8:  # Filter out MIDI-beat clock
+            status, = stream.read(1)
+        if status == 0xff:
+            event_type, = stream.read(1)
+            if self.keep_status[0xff] and self.keep_meta[event_type]:
+                return MetaEvent(event_type, util.read_variable_length_data(stream)), status
+            util.skip_variable_length_data(stream)
+            return None, status
+        if self._decodes(status, running_status):
+            event = MidiEventFactory.from_stream_and_status(stream, status, running_status)
+            return event, event.status
+        real_status = status if status >= 0x80 else running_status
+        param_count = STATUS_TABLE[real_status].param_count
+        if param_count is None:
+            util.skip_variable_length_data(stream)
+        else:
+            stream.read(param_count if status >= 0x80 else param_count - 1)
+        return None, real_status
+
+    def read_event_at(self, buffer, offset, running_status=None):
+        """Buffer version of read_event.
+
+        Returns a tuple of the form (event_or_none, running_status, new_offset)."""
+        status = buffer[offset]
+        offset += 1
+        while status == 0xf8:  # Filter out MIDI-beat clock
+            status = buffer[offset]
+            offset += 1
+        if status == 0xff:
+            event_type = buffer[offset]
+            if self.keep_status[0xff] and self.keep_meta[event_type]:
+                data, offset = util.read_variable_length_data_at(buffer, offset + 1)
+                return MetaEvent(event_type, data), status, offset
+            length, offset = util.read_variable_length_int_at(buffer, offset + 1)
+            return None, status, offset + length
+        if self._decodes(status, running_status):
+            event, offset = MidiEventFactory.from_buffer_and_status(buffer, offset, status, running_status)
+            return event, event.status, offset
+        real_status = status if status >= 0x80 else running_status
+        param_count = STATUS_TABLE[real_status].param_count
+        if param_count is None:
+            length, offset = util.read_variable_length_int_at(buffer, offset)
+            return None, real_status, offset + length
+        return None, real_status, offset + (param_count if status >= 0x80 else param_count - 1)
+
+    def __repr__(self):
+        return "<{}: event_classes={} statuses={} channels={} meta_types={}>".format(
+            self.__class__.__name__, self.event_classes, self.statuses, self.channels, self.meta_types)
+
+
+def filtered_event_generator(stream, event_filter):
+    """event_generator yielding only the events kept by event_filter."""
+    running_status = None
+    while True:
+        event, running_status = event_filter.read_event(stream, running_status)
+        if event is not None:
+            yield event
+
+
+def filtered_delta_time_event_generator(stream, bytes_to_read, event_filter):
+    """fileio.delta_time_event_generator yielding only the events kept by event_filter.
+
+    The delta times of skipped events are added to the delta time of the next kept event."""
+    stop = stream.tell() + bytes_to_read
+    running_status = None
+    delta_time = 0
+    while stream.tell() < stop:
+        delta_time += util.read_variable_length_int(stream)
+        event, running_status = event_filter.read_event(stream, running_status)
+        if event is not None:
+            yield delta_time, event
+            delta_time = 0
+
+
+def filtered_buffer_delta_time_event_generator(buffer, offset, stop, event_filter):
+    """Buffer version of filtered_delta_time_event_generator."""
+    running_status = None
+    delta_time = 0
+    while offset < stop:
+        delta, offset = util.read_variable_length_int_at(buffer, offset)
+        delta_time += delta
+        event, running_status, offset = event_filter.read_event_at(buffer, offset, running_status)
+        if event is not None:
+            yield delta_time, event
+            delta_time = 0
@@ -0,0 +1,87 @@
+"""Opt-in statistics about parsed events.
+
+The plain decoding functions are not touched, instrumented parsing goes through
+the separate generators in this module, so there is no cost when it is not used.
+"""
+import collections
+import contextlib
+import time
+
+from .channel_events import ChannelEvent
+from .event_factory import MidiEventFactory
+import util
+
+
+TrackStats = collections.namedtuple(
+    'TrackStats', 'index events size payload_bytes running_status_hits seconds')
+
+
+class ParseStats(object):
+    """Counts of parsed events, and TrackStats for every decoded track.
+
+    hook is called with the ParseStats and the TrackStats each time a track is decoded.
+    """
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.events_by_class = collections.Counter()
+        self.events_by_status = collections.Counter()
+        self.payload_bytes = 0
+        self.running_status_hits = 0
+        self.tracks = []
+
+    @property
+    def events(self):
+        return sum(self.events_by_status.values())
+
+    def read_event(self, stream, running_status=None):
+        """Reads an event like MidiEventFactory.from_stream and records it."""
+        status, = stream.read(1)
+        while status == 0xf8:  # Filter out MIDI-beat clock
+            status, = stream.read(1)
+        event = MidiEventFactory.from_stream_and_status(stream, status, running_status)
+        self.events_by_class[event.__class__.__name__] += 1
+        self.events_by_status[event.status] += 1
+        if status < 0x80:
+            self.running_status_hits += 1
+        if not isinstance(event, ChannelEvent):
+            self.payload_bytes += len(event.data)
+        return event
+
+    @contextlib.contextmanager
+    def track(self, size):
+        """Records a TrackStats for the track of size bytes decoded in the with block."""
+        events, payload_bytes, running_status_hits = self.events, self.payload_bytes, self.running_status_hits
+        start = time.perf_counter()
+        yield
+        track_stats = TrackStats(len(self.tracks), self.events - events, size,
+                                 self.payload_bytes - payload_bytes,
+                                 self.running_status_hits - running_status_hits,
+                                 time.perf_counter() - start)
+        self.tracks.append(track_stats)
+        if self.hook is not None:
+            self.hook(self, track_stats)
+
+    def __repr__(self):
+        return "<{}: events={} payload_bytes={} running_status_hits={} tracks={}>".format(
+            self.__class__.__name__, self.events, self.payload_bytes, self.running_status_hits, len(self.tracks))
+
+
+def instrumented_event_generator(stream, stats):
+    """event_generator recording every event in stats."""
+    running_status = None
+    while True:
+        event = stats.read_event(stream, running_status)
+        running_status = event.status
+        yield event
+
+
+def instrumented_delta_time_event_generator(stream, bytes_to_read, stats):
+    """fileio.delta_time_event_generator recording every event in stats."""
+    stop = stream.tell() + bytes_to_read
+    running_status = None
+    while stream.tell() < stop:
+        delta_time = util.read_variable_length_int(stream)
+        event = stats.read_event(stream, running_status)
+        running_status = event.status
+        yield delta_time, event
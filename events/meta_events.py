@@ -3,11 +3,30 @@ import util
 
 
 class MetaEvent(BaseMidiEvent):
+    __slots__ = ('_event_type', '_data')
     status = 0xff
 
     def __init__(self, event_type, data):
-        self.event_type = event_type
-        self.data = data
+        self._event_type = event_type
+        self._data = data
+
+    @property
+    def event_type(self):
+        return self._event_type
+
+    @event_type.setter
+    def event_type(self, event_type):
+        self._event_type = event_type
+        self._record_edit()
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        self._record_edit()
 
     @classmethod
     def from_stream_and_status(cls, stream, status, running_status=None):
@@ -15,14 +34,37 @@ class MetaEvent(BaseMidiEvent):
         data = util.read_variable_length_data(stream)
         return cls(event_type, data)
 
+    @classmethod
+    def from_buffer_and_status(cls, buffer, offset, status, running_status=None):
+        event_type = buffer[offset]
+        data, offset = util.read_variable_length_data_at(buffer, offset + 1)
+        return cls(event_type, data), offset
+
     def write_to(self, stream, running_status=None):
         stream.write(bytes((self.status, self.event_type)))
         util.write_variable_length_data(stream, self.data)
 
+    def append_to(self, buffer, running_status=None):
+        buffer.append(self.status)
+        buffer.append(self.event_type)
+        buffer += util.int_to_variable_bytes(len(self.data))
+        buffer += self.data
+        return None
+
+    def intern_data(self, data):
+        """Replaces data with an equal object, see SysExEvent.intern_data."""
+        if data != self._data:
+            raise ValueError("Interned data has to be equal to the data of the event")
+        self._data = data
+
+    def __reduce__(self):
+        # data may be a memoryview slice of a parsed buffer, which can not be pickled.
+        return self.__class__, (self.event_type, bytes(self.data))
+
     def __eq__(self, other):
         return self.status == other.status \
                and self.event_type == other.event_type\
                and self.data == other.data
 
     def __repr__(self):
-        return "<{}: event_type={} data={}>".format(self.__class__.__name__, self.event_type, self.data)
+        return "<{}: event_type={} data={}>".format(self.__class__.__name__, self.event_type, bytes(self.data))
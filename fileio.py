@@ -1,10 +1,21 @@
+from events.base import set_owner
 from events.event_factory import MidiEventFactory, event_generator
+from events.instrumentation import instrumented_delta_time_event_generator
+from events.filtering import filtered_delta_time_event_generator, filtered_buffer_delta_time_event_generator
+from arrays import TrackArrays
+from seekindex import DEFAULT_INTERVAL, TrackIndex, indexes_from_bytes, indexes_to_bytes
 import util
+import collections.abc
+import concurrent.futures
+import functools
+import heapq
+import io
+import mmap
 import struct
 
 
 def delta_time_event_generator(stream, bytes_to_read):
-    stop = stream.stell() + bytes_to_read
+    stop = stream.tell() + bytes_to_read
     event_iterator = event_generator(stream)
     while stream.tell() < stop:
         delta_time = util.read_variable_length_int(stream)
@@ -12,6 +23,55 @@ def delta_time_event_generator(stream, bytes_to_read):
         yield delta_time, event
 
 
+def buffer_delta_time_event_generator(buffer, offset, stop):
+    """Buffer version of delta_time_event_generator.
+
+    Yields (delta_time, event) for the events between offset and stop."""
+    running_status = None
+    while offset < stop:
+        delta_time, offset = util.read_variable_length_int_at(buffer, offset)
+        event, offset = MidiEventFactory.from_buffer(buffer, offset, running_status)
+        running_status = event.status
+        yield delta_time, event
+
+
+class CountingReader(object):
+    """Wrapper for readable streams counting the bytes read, so tell works on pipes and stdin.
+
+    Unbuffered streams are buffered, as events are read a byte at a time."""
+
+    def __init__(self, stream):
+        if isinstance(stream, io.RawIOBase):
+            stream = io.BufferedReader(stream)
+        self.stream = stream
+        self.position = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.position += len(data)
+        return data
+
+    def tell(self):
+        return self.position
+
+    def skip(self, size):
+        """Reads and discards size bytes, see util.skip_bytes."""
+        util.skip_bytes(self, size)
+
+
+# Increased whenever parsing changes in a way that changes the parsed result,
+# which invalidates cached parse results.
+PARSER_VERSION = 1
+
+# Files smaller than this are decoded serially even if an executor is given.
+PARALLEL_THRESHOLD = 1 << 20
+
+
+def decode_track_chunk(chunk, event_filter=None):
+    """Decodes a single track chunk. A module level function so process pools can pickle it."""
+    return MidiTrack.from_buffer(chunk, event_filter=event_filter)
+
+
 class ChunkParserMixin:
     _CHUNK_ID = None
 
@@ -27,6 +87,13 @@ class ChunkParserMixin:
         chunk_size, = struct.unpack(">L", stream.read(4))
         return chunk_size
 
+    @classmethod
+    def get_chunk_size_from_buffer(cls, buffer, offset=0):
+        """Returns a tuple of the form (chunk_size, offset_of_chunk_data)"""
+        cls._assert_correct_chunk_id(bytes(buffer[offset:offset + 4]))
+        chunk_size, = struct.unpack_from(">L", buffer, offset + 4)
+        return chunk_size, offset + 8
+
     @classmethod
     def _assert_correct_chunk_id(cls, chunk_id):
         if chunk_id != cls._CHUNK_ID:
@@ -34,24 +101,293 @@ class ChunkParserMixin:
                 chunk_id, cls._CHUNK_ID))
 
 
+class EventList(list):
+    """List of (delta_time, event) tuples that records if it has been changed.
+
+    Changes to the list are recorded here, and so are changes to the events of parsed tracks,
+    which have the list as their owner.
+    """
+    modified = False
+
+    def __reduce__(self):
+        # Unpickling would otherwise fill the list with extend, which counts as a change.
+        return self.__class__, (list(self),), self.__dict__ or None
+
+
+def _recording_change(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.modified = True
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend', 'insert',
+              'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(EventList, _name, _recording_change(getattr(list, _name)))
+del _name
+
+
 class MidiTrack(ChunkParserMixin, object):
+    """A track chunk as a list of (delta_time, event) tuples.
+
+    data is the chunk data the events were parsed from, and index is a seekindex.TrackIndex
+    into data once one is built or loaded. Parsed tracks keep their events in an EventList,
+    and as long as neither the list, one of its events nor the events attribute is changed,
+    the track is written by copying data instead of encoding the events. Call mark_modified
+    after changing an event that is also in another track.
+    """
     _CHUNK_ID = b'MTrk'
 
-    def __init__(self, events=None):
-        self.events = events
+    def __init__(self, events=None, data=None):
+        if data is not None:
+            if not isinstance(events, EventList):
+                events = EventList(events)
+            set_owner(events, events)
+        self._events = events
+        self._modified = data is None
+        self.data = data
+        self.index = None
+
+    @property
+    def events(self):
+        return self._events
+
+    @events.setter
+    def events(self, events):
+        self._events = events
+        self._modified = True
+
+    @property
+    def modified(self):
+        """True if the events may differ from data, so the track has to be encoded when written."""
+        return self._modified or self._events.modified
+
+    def mark_modified(self):
+        self._modified = True
+
+    def _set_data(self, data):
+        """Sets data to the encoded events, after which the track is not modified."""
+        if not isinstance(self._events, EventList):
+            self._events = EventList(self._events)
+        set_owner(self._events, self._events)
+        self._events.modified = False
+        self._modified = False
+        self.data = data
+        self.index = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.data is not None:
+            state['data'] = bytes(self.data)  # Memoryview slices can not be pickled.
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.data is not None:
+            set_owner(self._events, self._events)  # Owners are weak references, which are not pickled.
 
     @classmethod
-    def from_stream(cls, stream):
+    def from_stream(cls, stream, stats=None, event_filter=None):
+        """Parses a track chunk from stream. If stats is a ParseStats, the track is recorded in it.
+
+        If event_filter is an EventFilter, only the events it keeps are decoded, and the delta times
+        of the skipped events are added to the next kept event."""
+        if stats is not None and event_filter is not None:
+            raise ValueError("stats and event_filter can not be used together")
         chunk_size = cls.get_chunk_size(stream)
-        events = list(delta_time_event_generator(stream, chunk_size))
+        if event_filter is not None:
+            events = list(filtered_delta_time_event_generator(stream, chunk_size, event_filter))
+        elif stats is None:
+            data = stream.read(chunk_size)  # Decoded as bytes, so the payloads are bytes too.
+            if len(data) != chunk_size:
+                raise ValueError("Track chunk of {} bytes ends after {} bytes".format(chunk_size, len(data)))
+            return cls(events=EventList(buffer_delta_time_event_generator(data, 0, chunk_size)), data=data)
+        else:
+            with stats.track(chunk_size):
+                events = list(instrumented_delta_time_event_generator(stream, chunk_size, stats))
         return cls(events=events)
 
+    @classmethod
+    def get_chunk_size_from_buffer(cls, buffer, offset=0):
+        """Returns a tuple of the form (chunk_size, offset_of_chunk_data).
+
+        Raises ValueError if the chunk data ends after the buffer, like from_stream does."""
+        chunk_size, offset = super().get_chunk_size_from_buffer(buffer, offset)
+        if offset + chunk_size > len(buffer):
+            raise ValueError("Track chunk of {} bytes ends after {} bytes".format(chunk_size, len(buffer) - offset))
+        return chunk_size, offset
+
+    @classmethod
+    def from_buffer(cls, buffer, offset=0, event_filter=None):
+        """Parses the track chunk starting at offset in buffer.
+
+        Meta and SysEx payloads are slices of buffer, not copies.
+        If event_filter is an EventFilter, only the events it keeps are decoded."""
+        buffer = memoryview(buffer)
+        chunk_size, offset = cls.get_chunk_size_from_buffer(buffer, offset)
+        if event_filter is not None:
+            return cls(events=list(filtered_buffer_delta_time_event_generator(
+                buffer, offset, offset + chunk_size, event_filter)))
+        data = buffer[offset:offset + chunk_size]
+        return cls(events=EventList(buffer_delta_time_event_generator(buffer, offset, offset + chunk_size)),
+                   data=data)
+
+    @classmethod
+    def iter_from_buffer(cls, buffer, offset=0):
+        """Returns an iterator of the (delta_time, event) tuples of the track chunk starting at offset."""
+        buffer = memoryview(buffer)
+        chunk_size, offset = cls.get_chunk_size_from_buffer(buffer, offset)
+        return buffer_delta_time_event_generator(buffer, offset, offset + chunk_size)
+
+    @classmethod
+    def arrays_from_buffer(cls, buffer, offset=0):
+        """Decodes the track chunk starting at offset in buffer directly to TrackArrays."""
+        chunk_size, offset = cls.get_chunk_size_from_buffer(buffer, offset)
+        return TrackArrays.from_buffer(buffer, offset, chunk_size)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(events=arrays.to_events())
+
+    def to_arrays(self):
+        """Returns the events as TrackArrays. Requires numpy."""
+        return TrackArrays.from_events(self.events)
+
+    def transform(self, function, *args, **kwargs):
+        """Replaces the events with the result of a bulk transform from the transforms module.
+
+        function is called with the TrackArrays of the events and the other arguments,
+        and returns the transformed TrackArrays. Requires numpy."""
+        self.events = function(self.to_arrays(), *args, **kwargs).to_events()
+
+    def build_index(self, interval=DEFAULT_INTERVAL):
+        """Builds, sets and returns a TrackIndex with a checkpoint every interval events.
+
+        Modified tracks are encoded first to get their chunk data."""
+        if self.modified:
+            self.to_bytes()
+        self.index = TrackIndex.build(self.data, interval)
+        return self.index
+
+    def events_from(self, tick):
+        """Returns an iterator of (tick, event) tuples for the events at or after tick.
+
+        With an index, decoding starts at the checkpoint before tick, so only up to interval
+        events are skipped. Without one, the decoded events are scanned from the start."""
+        if self.index is not None and not self.modified:
+            return self.index.events_from(self.data, tick)
+        return self._scan_events_from(tick)
+
+    def _scan_events_from(self, tick):
+        current = 0
+        for delta_time, event in self.events:
+            current += delta_time
+            if current >= tick:
+                yield current, event
+
+    def append_to(self, buffer):
+        """Appends the track chunk to a bytearray.
+
+        Tracks that are not modified are copied from data. Otherwise the events are encoded,
+        using running status for consecutive channel events with the same status, and the chunk
+        size is filled in when all the events are written. The encoded chunk data then becomes
+        the data of the track."""
+        start = len(buffer)
+        buffer += self._CHUNK_ID
+        if not self.modified:
+            buffer += struct.pack(">L", len(self.data))
+            buffer += self.data
+            return
+        buffer += bytes(4)
+        running_status = None
+        for delta_time, event in self.events:
+            buffer += util.encode_variable_length_int(delta_time)
+            running_status = event.append_to(buffer, running_status)
+        struct.pack_into(">L", buffer, start + 4, len(buffer) - start - 8)
+        self._set_data(memoryview(bytes(buffer[start + 8:])))
+
+    def to_bytes(self):
+        buffer = bytearray()
+        self.append_to(buffer)
+        return bytes(buffer)
+
+    def write_to(self, stream):
+        """Writes the track chunk to stream, unmodified tracks are written directly from data."""
+        if self.modified:
+            stream.write(self.to_bytes())
+        else:
+            stream.write(self._CHUNK_ID + struct.pack(">L", len(self.data)))
+            stream.write(self.data)
+
     def __str__(self):
         string = [self.__class__.__name__, "Number of events:{}".format(len(self.events))]
         string.extend("time: {} \t{}".format(t, e) for t, e in self.events)
         return "\n".join(string)
 
 
+class LazyTrackList(collections.abc.Sequence):
+    """Sequence of tracks that are only decoded the first time they are accessed.
+
+    chunk_table is a list of (offset, size) tuples, where offset is the position of the
+    track chunk header and size is the size of the chunk data.
+    decode is called with an offset and returns the MidiTrack at that offset.
+    iterate is optional, and is called with an offset to get an iterator of the
+    (delta_time, event) tuples of the track without decoding all of it.
+    read_chunk is optional, and is called with an offset and a chunk data size to get the
+    bytes of the whole track chunk, so tracks that are not decoded can be written as is.
+    If keep_decoded is false, tracks are decoded again on every access.
+    """
+
+    def __init__(self, decode, chunk_table, keep_decoded=True, iterate=None, read_chunk=None):
+        self.decode = decode
+        self.chunk_table = chunk_table
+        self.keep_decoded = keep_decoded
+        self.iterate = iterate
+        self.read_chunk = read_chunk
+        self._tracks = [None] * len(chunk_table)
+
+    def __len__(self):
+        return len(self.chunk_table)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        track = self._tracks[index]
+        if track is None:
+            offset, _ = self.chunk_table[index]
+            track = self.decode(offset)
+            if self.keep_decoded:
+                self._tracks[index] = track
+        return track
+
+    def iter_events(self, index):
+        """Returns an iterator of the (delta_time, event) tuples of the track at index.
+
+        Tracks that are not decoded yet are streamed if possible, and not kept."""
+        track = self._tracks[index]
+        if track is None and self.iterate is not None:
+            offset, _ = self.chunk_table[index]
+            return self.iterate(offset)
+        return iter(self[index].events)
+
+    def raw_chunk(self, index):
+        """Returns the bytes of the track chunk at index if the track is not decoded, otherwise None."""
+        if self._tracks[index] is not None or self.read_chunk is None:
+            return None
+        return self.read_chunk(*self.chunk_table[index])
+
+    def is_decoded(self, index):
+        return self._tracks[index] is not None
+
+    def release(self, index=None):
+        """Drops the decoded track at index, or all decoded tracks if index is None."""
+        if index is None:
+            self._tracks = [None] * len(self.chunk_table)
+        else:
+            self._tracks[index] = None
+
+
 class MidiFile(ChunkParserMixin, object):
     _CHUNK_ID = b'MThd'
 
@@ -61,23 +397,277 @@ class MidiFile(ChunkParserMixin, object):
         self.tracks = []
 
     @classmethod
-    def from_stream(cls, stream):
+    def from_stream(cls, stream, lazy=False, stats=None, event_filter=None):
+        """Parses a midi file from stream.
+
+        If lazy is true, only the header and the chunk headers are read, and each track is
+        decoded the first time it is accessed. The stream has to be seekable and stay open
+        for as long as the tracks are accessed.
+        If stats is a ParseStats, the decoded events and tracks are recorded in it.
+        If event_filter is an events.filtering.EventFilter, only the events it keeps are decoded,
+        the others are skipped without being created. The delta times of skipped events are
+        added to the next kept event, so the kept events stay at the same ticks.
+        """
         format_type, number_of_tracks, time_division = MidiFile.parse_header(stream)
         obj = MidiFile(format_type, time_division)
-        obj.tracks = [MidiTrack.from_stream(stream) for _ in range(number_of_tracks)]
+        if lazy:
+            def decode(offset):
+                stream.seek(offset)
+                return MidiTrack.from_stream(stream, stats, event_filter)
+            def read_chunk(offset, size):
+                stream.seek(offset)
+                return stream.read(8 + size)
+            obj.tracks = LazyTrackList(decode, cls.read_chunk_table(stream, number_of_tracks),
+                                       read_chunk=None if event_filter is not None else read_chunk)
+        else:
+            obj.tracks = [MidiTrack.from_stream(stream, stats, event_filter) for _ in range(number_of_tracks)]
         return obj
 
     @classmethod
-    def from_filename(cls, filename):
+    def from_buffer(cls, buffer, lazy=False, executor=None, parallel_threshold=PARALLEL_THRESHOLD,
+                    event_filter=None):
+        """Parses a midi file from a bytes-like object such as bytes, memoryview or mmap.
+
+        Meta and SysEx payloads are slices of buffer, not copies.
+        If lazy is true, tracks are decoded the first time they are accessed.
+        If an executor is given and the buffer is at least parallel_threshold bytes, the tracks
+        are decoded concurrently in it. Thread pools get slices of the shared buffer, while
+        process pools get a copy of each track chunk, and the payloads of the tracks are then
+        copies as well.
+        event_filter works like in from_stream.
+        """
+        buffer = memoryview(buffer)
+        format_type, number_of_tracks, time_division, offset = cls.parse_header_from_buffer(buffer)
+        obj = cls(format_type, time_division)
+        chunk_table = cls.chunk_table_from_buffer(buffer, offset, number_of_tracks)
+        if lazy:
+            obj.tracks = LazyTrackList(lambda offset: MidiTrack.from_buffer(buffer, offset, event_filter),
+                                       chunk_table,
+                                       iterate=None if event_filter is not None
+                                       else lambda offset: MidiTrack.iter_from_buffer(buffer, offset),
+                                       read_chunk=None if event_filter is not None
+                                       else lambda offset, size: buffer[offset:offset + 8 + size])
+        elif executor is not None and len(buffer) >= parallel_threshold:
+            copy = isinstance(executor, concurrent.futures.ProcessPoolExecutor)
+            chunks = (buffer[offset:offset + 8 + size] for offset, size in chunk_table)
+            decode = functools.partial(decode_track_chunk, event_filter=event_filter)
+            obj.tracks = list(executor.map(decode, map(bytes, chunks) if copy else chunks))
+        else:
+            obj.tracks = [MidiTrack.from_buffer(buffer, offset, event_filter) for offset, _ in chunk_table]
+        return obj
+
+    @classmethod
+    def from_filename(cls, filename, lazy=None, executor=None, parallel_threshold=PARALLEL_THRESHOLD,
+                      cache=None):
+        """Parses the file, or loads it from cache if a cache.ParseCache is given.
+
+        lazy defaults to true with a cache, see ParseCache.load, and to false without one.
+        An executor can not be used with a cache."""
+        if cache is not None:
+            if executor is not None:
+                raise ValueError("executor can not be used with cache")
+            return cache.load(filename, lazy is None or lazy)
+        if lazy or executor is not None:
+            return cls.from_mmap(filename, lazy, executor, parallel_threshold)
         with open(filename, "rb") as stream:
             return cls.from_stream(stream)
 
+    @classmethod
+    def from_mmap(cls, filename, lazy=False, executor=None, parallel_threshold=PARALLEL_THRESHOLD):
+        """Memory maps the file and parses it with from_buffer.
+
+        The map is kept alive by the payloads and lazy tracks referring to it."""
+        with open(filename, "rb") as stream:
+            buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(buffer, lazy, executor, parallel_threshold)
+
+    @classmethod
+    def iter_stream(cls, stream):
+        """Yields a (midi_file, events) tuple for every midi file in a stream of concatenated files.
+
+        midi_file has the header information and no tracks. events is an iterator of
+        (track_index, delta_time, event) tuples like iter_events, which is skipped if it is not
+        consumed before the next file is requested.
+        """
+        reader = CountingReader(stream)
+        while True:
+            chunk_id = reader.read(4)
+            if not chunk_id:
+                return
+            cls._assert_correct_chunk_id(chunk_id)
+            header = reader.read(struct.unpack(">L", reader.read(4))[0])
+            format_type, number_of_tracks, time_division = struct.unpack(">HHH", header[:6])
+            events = cls._iter_stream_tracks(reader, number_of_tracks)
+            yield cls(format_type, time_division), events
+            collections.deque(events, maxlen=0)
+
+    @classmethod
+    def iter_events(cls, stream):
+        """Yields (track_index, delta_time, event) tuples for the midi file in stream.
+
+        The stream is read sequentially and doesn't need to be seekable, so pipes and stdin work,
+        and only the current event is held in memory. Chunks that are not track chunks are skipped.
+        Nothing is read after the last track chunk, see iter_stream for concatenated files.
+        """
+        for _, events in cls.iter_stream(stream):
+            yield from events
+            return
+
+    @staticmethod
+    def _iter_stream_tracks(reader, number_of_tracks):
+        track_index = 0
+        while track_index < number_of_tracks:
+            chunk_id = reader.read(4)
+            size_bytes = reader.read(4)
+            if len(size_bytes) != 4:
+                raise ValueError("The stream ended before track {} of {}".format(track_index, number_of_tracks))
+            chunk_size, = struct.unpack(">L", size_bytes)
+            if chunk_id != MidiTrack._CHUNK_ID:
+                reader.skip(chunk_size)
+                continue
+            for delta_time, event in delta_time_event_generator(reader, chunk_size):
+                yield track_index, delta_time, event
+            track_index += 1
+
+    @classmethod
+    def arrays_from_buffer(cls, buffer):
+        """Decodes every track in buffer to TrackArrays without creating event objects.
+
+        Returns a tuple of the form (format_type, time_division, list_of_track_arrays).
+        """
+        buffer = memoryview(buffer)
+        format_type, number_of_tracks, time_division, offset = cls.parse_header_from_buffer(buffer)
+        chunk_table = cls.chunk_table_from_buffer(buffer, offset, number_of_tracks)
+        return format_type, time_division, [MidiTrack.arrays_from_buffer(buffer, offset) for offset, _ in chunk_table]
+
+    @staticmethod
+    def read_chunk_table(stream, number_of_tracks):
+        """Skips through the track chunks in stream and returns a list of (offset, size) tuples."""
+        chunk_table = []
+        for _ in range(number_of_tracks):
+            offset = stream.tell()
+            chunk_size = MidiTrack.get_chunk_size(stream)
+            stream.seek(chunk_size, io.SEEK_CUR)
+            chunk_table.append((offset, chunk_size))
+        return chunk_table
+
+    @staticmethod
+    def chunk_table_from_buffer(buffer, offset, number_of_tracks):
+        """Buffer version of read_chunk_table, starting at the first track chunk."""
+        chunk_table = []
+        for _ in range(number_of_tracks):
+            chunk_size, data_offset = MidiTrack.get_chunk_size_from_buffer(buffer, offset)
+            chunk_table.append((offset, chunk_size))
+            offset = data_offset + chunk_size
+        return chunk_table
+
     @classmethod
     def parse_header(cls, stream):
         """Returns the a tuple of the form (format_type, number_of_tracks, time_division)"""
         header_bytes = cls.get_entire_chunk(stream)
         return struct.unpack(">HHH", header_bytes[:6])
 
+    @classmethod
+    def parse_header_from_buffer(cls, buffer, offset=0):
+        """Returns a tuple of the form (format_type, number_of_tracks, time_division, offset_of_first_track)"""
+        chunk_size, offset = cls.get_chunk_size_from_buffer(buffer, offset)
+        return struct.unpack_from(">HHH", buffer, offset) + (offset + chunk_size,)
+
+    def iter_track_events(self, index):
+        """Returns an iterator of the (delta_time, event) tuples of the track at index.
+
+        Lazy tracks that are not decoded yet are streamed without being decoded."""
+        if isinstance(self.tracks, LazyTrackList):
+            return self.tracks.iter_events(index)
+        return iter(self.tracks[index].events)
+
+    def merged_events(self):
+        """Yields (tick, track_index, event) tuples for all the tracks in time order.
+
+        This is a k-way merge of the tracks, so only one event per track is held at a time.
+        Events at the same tick come in track order, and in their original order within a track.
+        """
+        def absolute_ticks(track_index, events):
+            tick = 0
+            for delta_time, event in events:
+                tick += delta_time
+                yield tick, track_index, event
+        return heapq.merge(*(absolute_ticks(index, self.iter_track_events(index))
+                             for index in range(len(self.tracks))))
+
+    def transform(self, function, *args, tracks=None, **kwargs):
+        """Applies a bulk transform to the tracks with an index in tracks, or all tracks.
+
+        See MidiTrack.transform."""
+        for index in range(len(self.tracks)) if tracks is None else tracks:
+            self.tracks[index].transform(function, *args, **kwargs)
+
+    def build_indexes(self, interval=DEFAULT_INTERVAL):
+        """Builds a TrackIndex for every track, see MidiTrack.build_index."""
+        return [track.build_index(interval) for track in self.tracks]
+
+    def save_indexes(self, filename):
+        """Writes the indexes of all the tracks to filename, to be loaded with load_indexes."""
+        with open(filename, "wb") as stream:
+            stream.write(indexes_to_bytes([track.index for track in self.tracks]))
+
+    def load_indexes(self, filename):
+        """Sets the indexes of the tracks from a file written by save_indexes.
+
+        Raises ValueError if the indexes don't match the chunk data of the tracks."""
+        with open(filename, "rb") as stream:
+            indexes = indexes_from_bytes(stream.read())
+        if len(indexes) != len(self.tracks):
+            raise ValueError("{} indexes for {} tracks".format(len(indexes), len(self.tracks)))
+        for track, index in zip(self.tracks, indexes):
+            if track.data is None or len(track.data) != index.size:
+                raise ValueError("The index does not match the track chunk data")
+        for track, index in zip(self.tracks, indexes):
+            track.index = index
+
+    def _header_chunk(self):
+        return self._CHUNK_ID + struct.pack(">LHHH", 6, self.format_type, len(self.tracks), self.time_division)
+
+    def _raw_chunk(self, index):
+        if isinstance(self.tracks, LazyTrackList):
+            return self.tracks.raw_chunk(index)
+        return None
+
+    def append_to(self, buffer):
+        """Appends the header chunk and all the track chunks to a bytearray.
+
+        Only modified tracks are encoded, the chunks of the other tracks are copied as they
+        were parsed, and lazy tracks that are not decoded are not decoded to be written."""
+        buffer += self._header_chunk()
+        for index in range(len(self.tracks)):
+            chunk = self._raw_chunk(index)
+            if chunk is None:
+                self.tracks[index].append_to(buffer)
+            else:
+                buffer += chunk
+
+    def to_bytes(self):
+        buffer = bytearray()
+        self.append_to(buffer)
+        return bytes(buffer)
+
+    def write_to(self, stream):
+        """Writes the file to stream like append_to, without building it in memory first.
+
+        Unmodified chunks are written from slices of the parsed buffer, so for memory mapped
+        files they are copied straight from the page cache."""
+        stream.write(self._header_chunk())
+        for index in range(len(self.tracks)):
+            chunk = self._raw_chunk(index)
+            if chunk is None:
+                self.tracks[index].write_to(stream)
+            else:
+                stream.write(chunk)
+
+    def to_filename(self, filename):
+        with open(filename, "wb") as stream:
+            self.write_to(stream)
+
     def __str__(self):
         str_lst = [self.__class__.__name__,
                    "format_type: {}".format(self.format_type),
@@ -0,0 +1,132 @@
+"""Pairing of note on and note off events into notes with a start and an end.
+
+Notes are paired in a single pass, with a stack of sounding notes per channel and pitch.
+A note on event with velocity 0 is a note off.
+"""
+import collections
+import operator
+
+from events import NoteOnEvent, NoteOffEvent
+from fileio import MidiFile
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# start and end are absolute ticks, track is the index of the track of the note on event.
+Note = collections.namedtuple('Note', 'start end pitch velocity channel track')
+
+# Policies for a note on while notes of the same channel and pitch are sounding.
+FIRST_IN_FIRST_OUT = 'fifo'  # The next note off ends the oldest sounding note.
+LAST_IN_FIRST_OUT = 'lifo'  # The next note off ends the newest sounding note.
+RETRIGGER = 'retrigger'  # The sounding notes end where the new note starts.
+IGNORE = 'ignore'  # The new note on is ignored.
+OVERLAP_POLICIES = (FIRST_IN_FIRST_OUT, LAST_IN_FIRST_OUT, RETRIGGER, IGNORE)
+
+# Policies for notes that are still sounding at the end.
+CLOSE = 'close'  # The notes end at the tick of the last event.
+DROP = 'drop'  # The notes are left out.
+UNTERMINATED_POLICIES = (CLOSE, DROP)
+
+
+def pair_notes(timed_events, overlap=FIRST_IN_FIRST_OUT, unterminated=CLOSE, end_tick=None):
+    """Pairs the note events of an iterable of (tick, track_index, event) tuples in tick order.
+
+    Unterminated notes are closed at end_tick, or at the tick of the last event if it is None.
+    Returns a tuple of the lists (start, end, pitch, velocity, channel, track) with an entry
+    for every note in the order they start. Note off events without a sounding note are ignored.
+    """
+    if overlap not in OVERLAP_POLICIES:
+        raise ValueError("overlap has to be one of {}".format(OVERLAP_POLICIES))
+    if unterminated not in UNTERMINATED_POLICIES:
+        raise ValueError("unterminated has to be one of {}".format(UNTERMINATED_POLICIES))
+    starts, ends, pitches, velocities, channels, tracks = [], [], [], [], [], []
+    sounding = collections.defaultdict(collections.deque)  # channel << 7 | pitch -> note indexes
+    take_oldest = overlap != LAST_IN_FIRST_OUT
+    tick = 0
+    for tick, track_index, event in timed_events:
+        event_class = event.__class__
+        if event_class is NoteOnEvent:
+            channel, params = event.packed()
+            if params >> 8:
+                pitch = params & 0xff
+                stack = sounding[channel << 7 | pitch]
+                if stack:
+                    if overlap == IGNORE:
+                        continue
+                    if overlap == RETRIGGER:
+                        for index in stack:
+                            ends[index] = tick
+                        stack.clear()
+                stack.append(len(starts))
+                starts.append(tick)
+                ends.append(None)
+                pitches.append(pitch)
+                velocities.append(params >> 8)
+                channels.append(channel)
+                tracks.append(track_index)
+                continue
+        elif event_class is NoteOffEvent:
+            channel, params = event.packed()
+        else:
+            continue
+        stack = sounding.get(channel << 7 | params & 0xff)
+        if stack:
+            ends[stack.popleft() if take_oldest else stack.pop()] = tick
+
+    columns = (starts, ends, pitches, velocities, channels, tracks)
+    if any(sounding.values()):
+        if unterminated == CLOSE:
+            end_tick = tick if end_tick is None else end_tick
+            ends[:] = [end_tick if end is None else end for end in ends]
+        else:
+            keep = [end is not None for end in ends]
+            columns = tuple([value for value, kept in zip(column, keep) if kept] for column in columns)
+    return columns
+
+
+def note_events(events, track_index=0):
+    """Returns a list of (tick, track_index, event) tuples for the note events in a list of
+    (delta_time, event) tuples, and the tick of the last event."""
+    timed_events = []
+    tick = 0
+    for delta_time, event in events:
+        tick += delta_time
+        if event.__class__ is NoteOnEvent or event.__class__ is NoteOffEvent:
+            timed_events.append((tick, track_index, event))
+    return timed_events, tick
+
+
+def _source_events(source):
+    if not isinstance(source, MidiFile):
+        return note_events(source.events)
+    # Same order as MidiFile.merged_events. The sort is stable and the tracks are already
+    # sorted runs, which the sort merges in close to linear time.
+    timed_events, end_tick = [], 0
+    for index in range(len(source.tracks)):
+        track_events, track_end = note_events(source.iter_track_events(index), index)
+        timed_events += track_events
+        end_tick = max(end_tick, track_end)
+    timed_events.sort(key=operator.itemgetter(0))
+    return timed_events, end_tick
+
+
+def extract_notes(source, overlap=FIRST_IN_FIRST_OUT, unterminated=CLOSE):
+    """Returns the notes of a MidiTrack, or of all the tracks of a MidiFile, as a list of Note.
+
+    The tracks of a file are merged, so a note off in one track ends a note of the same
+    channel and pitch started in another. See pair_notes for the policies."""
+    timed_events, end_tick = _source_events(source)
+    return list(map(Note._make, zip(*pair_notes(timed_events, overlap, unterminated, end_tick))))
+
+
+def extract_note_arrays(source, overlap=FIRST_IN_FIRST_OUT, unterminated=CLOSE):
+    """Like extract_notes, but returns a Note of numpy arrays. Requires numpy."""
+    if np is None:
+        raise ImportError("numpy is required for note arrays")
+    dtypes = (np.int64, np.int64, np.uint8, np.uint8, np.uint8, np.int64)
+    timed_events, end_tick = _source_events(source)
+    columns = pair_notes(timed_events, overlap, unterminated, end_tick)
+    return Note._make(np.array(column, dtype=dtype) for column, dtype in zip(columns, dtypes))
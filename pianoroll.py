@@ -0,0 +1,218 @@
+"""Rendering of notes into pitch by time matrices, dense with numpy or sparse with scipy.
+
+The events are read in one pass that stops at the end of the rendered window, the notes are
+paired with notes.pair_notes and everything after that is done on numpy arrays. Requires numpy,
+and scipy for sparse matrices.
+"""
+import operator
+
+from events import ControllerEvent, MetaEvent, NoteOnEvent, NoteOffEvent, ProgramChangeEvent
+from notes import pair_notes
+from tempo import TEMPO_META_TYPE, TempoMap, tempo_from_payload
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+try:
+    import scipy.sparse
+except ImportError:  # pragma: no cover
+    scipy = None
+
+
+SUSTAIN_CONTROLLER = 64
+
+TICKS = 'ticks'
+SECONDS = 'seconds'
+
+# Layerings, rendering the notes of each channel or program into a separate 128 row matrix.
+CHANNEL = 'channel'
+PROGRAM = 'program'
+NUMBER_OF_LAYERS = {None: 1, CHANNEL: 16, PROGRAM: 128}
+
+# Cells painted at once when rendering a sparse matrix.
+SPARSE_BLOCK_CELLS = 1 << 24
+
+
+def collect_events(midi_file, stop_tick=None):
+    """Reads the events of all the tracks up to stop_tick in a single pass.
+
+    Returns a tuple of the form (note_events, controls, end_tick), where note_events is a list
+    of (tick, track_index, event) tuples for the note events in merged order and controls is a
+    dict with arrays of the tick, channel and value of the sustain pedal and program changes,
+    and of the tick and value of the tempo changes.
+    """
+    note_events, pedal, programs, tempos = [], [], [], []
+    end_tick = 0
+    for index in range(len(midi_file.tracks)):
+        tick = 0
+        for delta_time, event in midi_file.iter_track_events(index):
+            tick += delta_time
+            if stop_tick is not None and tick >= stop_tick:
+                break
+            event_class = event.__class__
+            if event_class is NoteOnEvent or event_class is NoteOffEvent:
+                note_events.append((tick, index, event))
+            elif event_class is ControllerEvent:
+                channel, params = event.packed()
+                if params & 0xff == SUSTAIN_CONTROLLER:
+                    pedal.append((tick, channel, params >> 8))
+            elif event_class is ProgramChangeEvent:
+                programs.append((tick, *event.packed()))
+            elif event_class is MetaEvent and event.event_type == TEMPO_META_TYPE:
+                tempos.append((tick, tempo_from_payload(event.data)))
+        end_tick = max(end_tick, tick)
+    note_events.sort(key=operator.itemgetter(0))  # Stable, so events at a tick stay in track order.
+    controls = {}
+    for name, values in (('pedal', pedal), ('program', programs)):
+        values.sort(key=operator.itemgetter(0))
+        columns = np.array(values, dtype=np.int64).reshape(-1, 3).T
+        controls[name + '_tick'], controls[name + '_channel'], controls[name + '_value'] = columns
+    tempos.sort(key=operator.itemgetter(0))
+    controls['tempo_tick'], controls['tempo_value'] = np.array(tempos, dtype=np.int64).reshape(-1, 2).T
+    if stop_tick is not None:
+        end_tick = min(end_tick, stop_tick)
+    return note_events, controls, end_tick
+
+
+def sustain(starts, ends, pitches, channels, pedal_tick, pedal_channel, pedal_value, end_tick):
+    """Returns the ends of the notes extended by the sustain pedal.
+
+    A note released while the pedal of its channel is down ends when the pedal is released,
+    or when the same pitch is played again on the channel, but not before its own release."""
+    released, ends = ends, ends.copy()
+    for channel in np.unique(pedal_channel):
+        on_channel = pedal_channel == channel
+        ticks, down = pedal_tick[on_channel], pedal_value[on_channel] >= 64
+        # Index of the first pedal release at or after every pedal event, len(ticks) if there is none.
+        release_index = np.where(down, len(ticks), np.arange(len(ticks)))
+        release_index = np.minimum.accumulate(release_index[::-1])[::-1]
+        release_ticks = np.append(ticks, end_tick)[np.append(release_index, len(ticks))]
+
+        notes = np.flatnonzero(channels == channel)
+        last_pedal = np.searchsorted(ticks, ends[notes], side='right') - 1
+        held = (last_pedal >= 0) & down[np.maximum(last_pedal, 0)]
+        notes, last_pedal = notes[held], last_pedal[held]
+        ends[notes] = np.maximum(ends[notes], release_ticks[last_pedal + 1])
+
+    # Cut sustained notes where the same pitch is played again on the channel.
+    order = np.lexsort((starts, pitches, channels))
+    same_key = (pitches[order][1:] == pitches[order][:-1]) & (channels[order][1:] == channels[order][:-1])
+    current, following = order[:-1][same_key], order[1:][same_key]
+    ends[current] = np.maximum(np.minimum(ends[current], starts[following]), released[current])
+    return ends
+
+
+def render(starts, ends, pitches, values, resolution, start=0, stop=None, layers=None, number_of_layers=1,
+           sparse=False):
+    """Renders notes into a matrix with a row per pitch and a column per resolution.
+
+    starts and ends are the note times in any unit, and the columns cover start to stop in the
+    same unit. A note fills every column it overlaps, and at least one. values are the cell
+    values, where notes overlap the largest is kept. With layers, an array with a layer index
+    for every note, the matrix has a 128 row block per layer.
+    Returns a dense array of shape (number_of_layers, 128, columns), or a scipy.sparse CSR
+    matrix of shape (number_of_layers * 128, columns) if sparse is true.
+    """
+    if resolution <= 0:
+        raise ValueError("resolution has to be positive")
+    starts, ends = np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64)
+    if stop is None:
+        stop = ends.max() if len(ends) else start
+    number_of_columns = max(int(np.ceil((stop - start) / resolution)), 0)
+    rows = np.asarray(pitches, dtype=np.int64)
+    if layers is not None:
+        rows = rows + np.asarray(layers, dtype=np.int64) * 128
+
+    visible = (ends > start) & (starts < stop) | (starts == ends) & (starts >= start) & (starts < stop)
+    first = np.floor((starts[visible] - start) / resolution).astype(np.int64)
+    last = np.maximum(np.ceil((ends[visible] - start) / resolution).astype(np.int64), first + 1)
+    first, last = np.clip(first, 0, number_of_columns), np.clip(last, 0, number_of_columns)
+    rows, values = rows[visible], np.asarray(values)[visible]
+
+    shape = (number_of_layers * 128, number_of_columns)
+    if not sparse:
+        roll = np.zeros(shape, dtype=values.dtype)
+        _paint(roll.ravel(), rows * number_of_columns + first, last - first, values)
+        return roll.reshape(number_of_layers, 128, number_of_columns)
+    if scipy is None:
+        raise ImportError("scipy is required for sparse piano rolls")
+
+    # The rows with notes are painted densely a block at a time, which bounds the memory used.
+    used_rows, row_indexes = np.unique(rows, return_inverse=True)
+    rows_per_block = max(SPARSE_BLOCK_CELLS // max(number_of_columns, 1), 1)
+    cell_rows, cell_columns, cell_values = [], [], []
+    for block_start in range(0, len(used_rows), rows_per_block):
+        block_rows = used_rows[block_start:block_start + rows_per_block]
+        in_block = (row_indexes >= block_start) & (row_indexes < block_start + rows_per_block)
+        block = np.zeros(len(block_rows) * number_of_columns, dtype=values.dtype)
+        offsets = (row_indexes[in_block] - block_start) * number_of_columns + first[in_block]
+        _paint(block, offsets, last[in_block] - first[in_block], values[in_block])
+        cells = np.flatnonzero(block)
+        cell_rows.append(block_rows[cells // number_of_columns])
+        cell_columns.append(cells % number_of_columns)
+        cell_values.append(block[cells])
+    if not cell_rows:
+        return scipy.sparse.csr_matrix(shape, dtype=values.dtype)
+    return scipy.sparse.csr_matrix((np.concatenate(cell_values), (np.concatenate(cell_rows),
+                                                                 np.concatenate(cell_columns))), shape=shape)
+
+
+def _paint(flat, offsets, lengths, values):
+    """Sets the lengths cells of flat from every offset to the value of the note, keeping the
+    largest value where notes overlap."""
+    cells = np.arange(lengths.sum()) + np.repeat(offsets - (np.cumsum(lengths) - lengths), lengths)
+    np.maximum.at(flat, cells, np.repeat(values, lengths))
+
+
+def piano_roll(midi_file, resolution, unit=TICKS, start=0, stop=None, binary=False, layering=None,
+               use_sustain=True, sparse=False):
+    """Renders the notes of a MidiFile, see render.
+
+    resolution, start and stop are in ticks, or in seconds if unit is SECONDS, in which case
+    the tempo changes are applied. Events after stop are not read, apart from the first few of
+    each track, and notes still sounding at stop end there. Cells hold the note on velocity,
+    or 1 if binary is true. layering can be CHANNEL or PROGRAM, to render each channel or each
+    program into its own layer. With use_sustain, notes are extended by the sustain pedal.
+    """
+    if np is None:
+        raise ImportError("numpy is required for piano rolls")
+    if layering not in NUMBER_OF_LAYERS:
+        raise ValueError("layering has to be one of {}".format(tuple(NUMBER_OF_LAYERS)))
+    stop_tick = stop
+    if unit == SECONDS:
+        if stop is not None:
+            # Only the tempo changes before stop are needed to find its tick.
+            stop_tick = int(np.ceil(TempoMap.until_seconds(midi_file, stop).seconds_to_tick(stop)))
+    elif unit != TICKS:
+        raise ValueError("unit has to be {!r} or {!r}".format(TICKS, SECONDS))
+
+    note_events, controls, end_tick = collect_events(midi_file, stop_tick)
+    columns = pair_notes(note_events, end_tick=end_tick)
+    starts, ends, pitches, velocities, channels, _ = (np.array(column, dtype=np.int64) for column in columns)
+    if use_sustain and len(controls['pedal_tick']):
+        ends = sustain(starts, ends, pitches, channels, controls['pedal_tick'], controls['pedal_channel'],
+                       controls['pedal_value'], end_tick)
+        if stop_tick is not None:
+            ends = np.minimum(ends, stop_tick)
+
+    layers = None
+    if layering == CHANNEL:
+        layers = channels
+    elif layering == PROGRAM:
+        layers = np.zeros(len(starts), dtype=np.int64)
+        for channel in np.unique(controls['program_channel']):
+            notes = channels == channel
+            on_channel = controls['program_channel'] == channel
+            program_ticks, programs = controls['program_tick'][on_channel], controls['program_value'][on_channel]
+            index = np.searchsorted(program_ticks, starts[notes], side='right') - 1
+            layers[notes] = np.where(index >= 0, programs[np.maximum(index, 0)], 0)
+
+    values = np.ones(len(starts), dtype=np.uint8) if binary else velocities.astype(np.uint8)
+    if unit == SECONDS:
+        tempo_map = TempoMap(midi_file.time_division, zip(controls['tempo_tick'].tolist(),
+                                                          controls['tempo_value'].tolist()))
+        starts, ends = tempo_map.ticks_to_seconds(starts), tempo_map.ticks_to_seconds(ends)
+    return render(starts, ends, pitches, values, resolution, start, stop, layers, NUMBER_OF_LAYERS[layering],
+                  sparse)
@@ -0,0 +1,128 @@
+"""Sparse checkpoint index for random access into track chunks by tick.
+
+Delta times are relative and running status depends on the previous event, so an event can
+normally only be decoded after every event before it. A TrackIndex remembers the absolute
+tick, the offset and the running status every interval events, so decoding can start at
+the checkpoint right before a tick instead of at the start of the track.
+"""
+from array import array
+import bisect
+import struct
+
+from events.event_factory import MidiEventFactory
+import util
+
+
+DEFAULT_INTERVAL = 256
+
+MAGIC = b'MTix'
+# magic, interval, size of the indexed chunk data, number of checkpoints
+HEADER = struct.Struct('>4sLQQ')
+
+
+class TrackIndex(object):
+    """Checkpoints into the data of a single track chunk.
+
+    ticks holds the absolute tick before the delta time of every interval'th event, offsets
+    the offset of that event in the chunk data and running_statuses the running status at
+    that point, 0 if there is none. size is the size of the indexed chunk data, used to
+    check that the index belongs to the data.
+    """
+
+    def __init__(self, interval, size, ticks, offsets, running_statuses):
+        self.interval = interval
+        self.size = size
+        self.ticks = ticks
+        self.offsets = offsets
+        self.running_statuses = running_statuses
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __eq__(self, other):
+        return (self.interval, self.size, list(self.ticks), list(self.offsets), list(self.running_statuses)) \
+            == (other.interval, other.size, list(other.ticks), list(other.offsets), list(other.running_statuses))
+
+    @classmethod
+    def build(cls, data, interval=DEFAULT_INTERVAL):
+        """Builds the index of track chunk data in one pass, without creating event objects."""
+        if not interval > 0:
+            raise ValueError("interval has to be positive, got {}".format(interval))
+        data = memoryview(data)
+        stop = len(data)
+        ticks, offsets, running_statuses = array('q'), array('q'), array('B')
+        tick, offset, running_status, count = 0, 0, None, 0
+        while offset < stop:
+            if count % interval == 0:
+                ticks.append(tick)
+                offsets.append(offset)
+                running_statuses.append(running_status or 0)
+            delta_time, offset = util.read_variable_length_int_at(data, offset)
+            tick += delta_time
+            running_status, offset = util.skip_event_at(data, offset, running_status)
+            count += 1
+        return cls(interval, stop, ticks, offsets, running_statuses)
+
+    def events_from(self, data, tick):
+        """Yields (tick, event) tuples for the events of data at or after tick.
+
+        Decoding starts at the last checkpoint before tick, and the events between the
+        checkpoint and tick are skipped without being decoded."""
+        if len(data) != self.size:
+            raise ValueError("The index is for chunk data of {} bytes, got {}".format(self.size, len(data)))
+        data = memoryview(data)
+        stop = len(data)
+        if not self.ticks:
+            return
+        checkpoint = max(bisect.bisect_left(self.ticks, tick) - 1, 0)
+        current = self.ticks[checkpoint]
+        offset = self.offsets[checkpoint]
+        running_status = self.running_statuses[checkpoint] or None
+        while offset < stop:
+            delta_time, event_offset = util.read_variable_length_int_at(data, offset)
+            if current + delta_time >= tick:
+                break
+            current += delta_time
+            running_status, offset = util.skip_event_at(data, event_offset, running_status)
+        while offset < stop:
+            delta_time, offset = util.read_variable_length_int_at(data, offset)
+            current += delta_time
+            event, offset = MidiEventFactory.from_buffer(data, offset, running_status)
+            running_status = event.status
+            yield current, event
+
+    def to_bytes(self):
+        count = len(self.ticks)
+        return HEADER.pack(MAGIC, self.interval, self.size, count) \
+            + struct.pack('>{}q'.format(count), *self.ticks) \
+            + struct.pack('>{}q'.format(count), *self.offsets) \
+            + bytes(self.running_statuses)
+
+    @classmethod
+    def from_bytes(cls, buffer, offset=0):
+        """Returns a tuple of the form (track_index, new_offset)"""
+        magic, interval, size, count = HEADER.unpack_from(buffer, offset)
+        if magic != MAGIC:
+            raise ValueError("Not a track index")
+        offset += HEADER.size
+        ticks = array('q', struct.unpack_from('>{}q'.format(count), buffer, offset))
+        offset += 8 * count
+        offsets = array('q', struct.unpack_from('>{}q'.format(count), buffer, offset))
+        offset += 8 * count
+        running_statuses = array('B', bytes(buffer[offset:offset + count]))
+        return cls(interval, size, ticks, offsets, running_statuses), offset + count
+
+
+def indexes_to_bytes(indexes):
+    """Returns the bytes of a list of TrackIndex, one for each track of a file."""
+    return struct.pack('>L', len(indexes)) + b''.join(index.to_bytes() for index in indexes)
+
+
+def indexes_from_bytes(buffer):
+    number_of_indexes, = struct.unpack_from('>L', buffer, 0)
+    offset = 4
+    indexes = []
+    for _ in range(number_of_indexes):
+        index, offset = TrackIndex.from_bytes(buffer, offset)
+        indexes.append(index)
+    return indexes
@@ -0,0 +1,132 @@
+"""Conversion between ticks and seconds using the tempo changes of a midi file."""
+import bisect
+
+from events import MetaEvent
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+TEMPO_META_TYPE = 0x51
+DEFAULT_TEMPO = 500000  # Microseconds per quarter note, 120 bpm.
+
+
+def smpte_seconds_per_tick(time_division):
+    """Returns the length of a tick for an SMPTE time division, where tempo changes don't matter."""
+    frames_per_second = 256 - (time_division >> 8)  # The upper byte is the negative frame rate.
+    if frames_per_second == 29:
+        frames_per_second = 30000 / 1001  # 30 drop frame
+    ticks_per_frame = time_division & 0xff
+    return 1 / (frames_per_second * ticks_per_frame)
+
+
+def tempo_from_payload(data):
+    """Returns the microseconds per quarter note of the data of a tempo event.
+
+    Raises ValueError if the data is not 3 bytes long."""
+    if len(data) != 3:
+        raise ValueError("Tempo event with {} bytes of data instead of 3".format(len(data)))
+    return int.from_bytes(data, 'big')
+
+
+class TempoMap:
+    """Piecewise linear mapping between ticks and seconds.
+
+    ticks holds the tick of each tempo change, seconds the time in seconds at that tick
+    and seconds_per_tick the length of a tick until the next change. All lookups are done
+    with bisect, or with numpy.searchsorted for whole arrays.
+    """
+
+    def __init__(self, time_division, tempo_changes=()):
+        """tempo_changes is an iterable of (tick, microseconds_per_quarter_note) tuples sorted by tick."""
+        self.time_division = time_division
+        if time_division & 0x8000:
+            self.ticks, self.seconds = [0], [0.0]
+            self.seconds_per_tick = [smpte_seconds_per_tick(time_division)]
+            return
+
+        self.ticks, self.seconds, self.seconds_per_tick = [0], [0.0], [DEFAULT_TEMPO / 1e6 / time_division]
+        for tick, tempo in tempo_changes:
+            self._append(tick, tempo)
+
+    def _append(self, tick, tempo):
+        """Adds a tempo change at or after the last one."""
+        seconds = self.seconds[-1] + (tick - self.ticks[-1]) * self.seconds_per_tick[-1]
+        if tick == self.ticks[-1]:
+            self.ticks.pop()
+            self.seconds.pop()
+            self.seconds_per_tick.pop()
+        self.ticks.append(tick)
+        self.seconds.append(seconds)
+        self.seconds_per_tick.append(tempo / 1e6 / self.time_division)
+
+    @staticmethod
+    def tempo_changes(midi_file):
+        """Returns the (tick, microseconds_per_quarter_note) tuples of all tracks sorted by tick.
+
+        Raises ValueError for tempo events whose data is not 3 bytes long."""
+        changes = []
+        for track in midi_file.tracks:
+            tick = 0
+            for delta_time, event in track.events:
+                tick += delta_time
+                if isinstance(event, MetaEvent) and event.event_type == TEMPO_META_TYPE:
+                    changes.append((tick, tempo_from_payload(event.data)))
+        changes.sort(key=lambda change: change[0])
+        return changes
+
+    @classmethod
+    def from_midi_file(cls, midi_file):
+        return cls(midi_file.time_division, cls.tempo_changes(midi_file))
+
+    @classmethod
+    def until_seconds(cls, midi_file, seconds):
+        """Builds the tempo map from the tempo changes before seconds.
+
+        The tracks are read in merged order until seconds, so only up to two events after it
+        are decoded per track. The map is only valid up to seconds."""
+        tempo_map = cls(midi_file.time_division)
+        if midi_file.time_division & 0x8000:
+            return tempo_map
+        for tick, _, event in midi_file.merged_events():
+            # All the changes up to tick are known, so the last segment holds the time of tick.
+            if tempo_map.seconds[-1] + (tick - tempo_map.ticks[-1]) * tempo_map.seconds_per_tick[-1] >= seconds:
+                break
+            if event.__class__ is MetaEvent and event.event_type == TEMPO_META_TYPE:
+                tempo_map._append(tick, tempo_from_payload(event.data))
+        return tempo_map
+
+    @classmethod
+    def from_track_arrays(cls, time_division, track_arrays):
+        """Builds the tempo map from a list of TrackArrays without creating event objects."""
+        changes = []
+        for arrays in track_arrays:
+            for index in np.flatnonzero((arrays.status == 0xff) & (arrays.data1 == TEMPO_META_TYPE)).tolist():
+                changes.append((int(arrays.tick[index]), tempo_from_payload(arrays.get_payload(index))))
+        changes.sort(key=lambda change: change[0])
+        return cls(time_division, changes)
+
+    def tick_to_seconds(self, tick):
+        index = max(bisect.bisect_right(self.ticks, tick) - 1, 0)
+        return self.seconds[index] + (tick - self.ticks[index]) * self.seconds_per_tick[index]
+
+    def seconds_to_tick(self, seconds):
+        """Returns the tick at seconds as a float, round it to get the closest tick."""
+        index = max(bisect.bisect_right(self.seconds, seconds) - 1, 0)
+        return self.ticks[index] + (seconds - self.seconds[index]) / self.seconds_per_tick[index]
+
+    def ticks_to_seconds(self, ticks):
+        """Vectorized tick_to_seconds for a numpy array of ticks."""
+        ticks = np.asarray(ticks)
+        index = np.maximum(np.searchsorted(self.ticks, ticks, side='right') - 1, 0)
+        return np.take(self.seconds, index) \
+            + (ticks - np.take(self.ticks, index)) * np.take(self.seconds_per_tick, index)
+
+    def seconds_to_ticks(self, seconds):
+        """Vectorized seconds_to_tick for a numpy array of seconds."""
+        seconds = np.asarray(seconds, dtype=np.float64)
+        index = np.maximum(np.searchsorted(self.seconds, seconds, side='right') - 1, 0)
+        return np.take(self.ticks, index) \
+            + (seconds - np.take(self.seconds, index)) / np.take(self.seconds_per_tick, index)
@@ -0,0 +1,82 @@
+import unittest
+import os
+import tempfile
+
+import archive
+from benchmarks.corpus_generator import generate_midi_file
+from corpus import FileSummary
+from fileio import MidiFile
+from tests.test_fileio import MIDI_FILE_BYTES
+
+
+class MidiArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "library" + archive.SUFFIX)
+        self.other_bytes = generate_midi_file(number_of_events=200, number_of_tracks=3)
+        with archive.ArchiveWriter(self.filename) as writer:
+            writer.add("a.mid", MIDI_FILE_BYTES)
+            writer.add("b/c.mid", self.other_bytes)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read(self):
+        midi_archive = archive.MidiArchive(self.filename)
+        self.assertEqual(len(midi_archive), 2)
+        self.assertIn("b/c.mid", midi_archive)
+        self.assertNotIn("c.mid", midi_archive)
+        self.assertEqual(midi_archive.entry("a.mid"),
+                         archive.ArchiveEntry("a.mid", archive.HEADER.size, len(MIDI_FILE_BYTES), 1, 2, 96))
+        self.assertEqual(midi_archive.entry(1).number_of_tracks, 3)
+        self.assertIsInstance(midi_archive.buffer(1), memoryview)
+        self.assertEqual(midi_archive.buffer("b/c.mid"), self.other_bytes)
+        expected = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        midi_file = midi_archive.midi_file("a.mid", lazy=True)
+        self.assertEqual([t.events for t in midi_file.tracks], [t.events for t in expected.tracks])
+        with self.assertRaises(KeyError):
+            midi_archive.entry("missing.mid")
+
+    def test_add_errors(self):
+        with archive.ArchiveWriter(self.filename, append=True) as writer:
+            with self.assertRaises(ValueError):
+                writer.add("a.mid", MIDI_FILE_BYTES)
+            with self.assertRaises(ValueError):
+                writer.add("d.mid", b'RIFF0000')
+            with self.assertRaises(ValueError):
+                writer.add("d.mid", b'MThd\x00\x00')
+        self.assertEqual(len(archive.MidiArchive(self.filename)), 2)
+
+    def test_append(self):
+        path = os.path.join(self.directory.name, "d.mid")
+        with open(path, "wb") as stream:
+            stream.write(MIDI_FILE_BYTES)
+        with archive.ArchiveWriter(self.filename, append=True) as writer:
+            writer.add_file(path, "d.mid")
+        midi_archive = archive.MidiArchive(self.filename)
+        self.assertEqual([entry.name for entry in midi_archive.entries], ["a.mid", "b/c.mid", "d.mid"])
+        self.assertEqual(midi_archive.buffer("d.mid"), MIDI_FILE_BYTES)
+        self.assertEqual(midi_archive.buffer("b/c.mid"), self.other_bytes)
+
+    def test_not_an_archive(self):
+        with open(self.filename, "wb") as stream:
+            stream.write(MIDI_FILE_BYTES)
+        with self.assertRaises(ValueError):
+            archive.MidiArchive(self.filename)
+
+    def test_scan(self):
+        with archive.ArchiveWriter(self.filename, append=True) as writer:
+            for i in range(20):
+                writer.add("{}.mid".format(i), MIDI_FILE_BYTES)
+            writer.add("broken.mid", MIDI_FILE_BYTES[:-5])
+        results = list(archive.scan(self.filename, max_workers=2, range_size=100))
+        self.assertEqual(sorted(r.path for r in results),
+                         sorted(entry.name for entry in archive.MidiArchive(self.filename).entries))
+        for result in results:
+            if result.path == "broken.mid":
+                self.assertIsNone(result.result)
+                self.assertIsNotNone(result.error)
+            elif result.path != "b/c.mid":
+                self.assertIsNone(result.error)
+                self.assertEqual(result.result, FileSummary(1, 2, 96, 8, len(MIDI_FILE_BYTES)))
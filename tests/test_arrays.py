@@ -0,0 +1,60 @@
+import unittest
+
+from arrays import TrackArrays, np
+from events import MetaEvent
+from fileio import MidiFile, MidiTrack
+from seekindex import TrackIndex
+from tests.test_fileio import MIDI_FILE_BYTES, TRACK1_BYTES, TRACK1_EVENTS, make_chunk
+import util
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TrackArraysTest(unittest.TestCase):
+
+    def setUp(self):
+        self.arrays = TrackArrays.from_buffer(TRACK1_BYTES, 0, len(TRACK1_BYTES))
+
+    def test_columns(self):
+        arrays = self.arrays
+        self.assertEqual(arrays.delta.tolist(), [0, 0x60, 0, 0, 0x80, 0])
+        self.assertEqual(arrays.tick.tolist(), [0, 0x60, 0x60, 0x60, 0xe0, 0xe0])
+        self.assertEqual(arrays.status.tolist(), [0x90, 0x90, 0xc0, 0xf0, 0x80, 0xff])
+        self.assertEqual(arrays.data1.tolist(), [0x3c, 0x3c, 0x05, 0, 0x3c, 0x2f])
+        self.assertEqual(arrays.data2.tolist(), [0x40, 0, 0, 0, 0x40, 0])
+        self.assertEqual(arrays.get_payload(3), b'\x7e\x7f\xf7')
+        self.assertEqual(arrays.get_payload(5), b'')
+
+    def test_unsupported_status(self):
+        for status in (0xf1, 0xf4, 0xf6, 0xf9, 0xfe):
+            data = b'\x00\x90\x3c\x40\x00' + bytes((status,)) + b'\x3c\x40'
+            decoders = (lambda: TrackArrays.from_buffer(data, 0, len(data)),
+                        lambda: MidiTrack.from_buffer(make_chunk(b'MTrk', data)),
+                        lambda: util.read_delta_times(data, 0, len(data)),
+                        lambda: TrackIndex.build(data, 1))
+            for decode in decoders:
+                with self.assertRaisesRegex(ValueError, "Unsupported status byte: 0x{:02x}".format(status)):
+                    decode()
+
+    def test_to_events(self):
+        self.assertEqual(self.arrays.to_events(), TRACK1_EVENTS)
+
+    def test_to_bytes(self):
+        self.assertEqual(self.arrays.to_bytes(), MidiTrack(events=TRACK1_EVENTS).to_bytes())
+        arrays = MidiFile.from_buffer(MIDI_FILE_BYTES).tracks[0].to_arrays()
+        self.assertEqual(arrays.to_bytes(), MIDI_FILE_BYTES[14:14 + 8 + 11])
+
+    def test_from_events_round_trip(self):
+        arrays = TrackArrays.from_events(TRACK1_EVENTS)
+        self.assertEqual(arrays, self.arrays)
+        self.assertEqual(MidiTrack.from_arrays(arrays).events, TRACK1_EVENTS)
+
+    def test_track_to_arrays(self):
+        track = MidiTrack(events=[(5, MetaEvent(0x01, b'abc'))] + TRACK1_EVENTS)
+        self.assertEqual(MidiTrack.from_arrays(track.to_arrays()).events, track.events)
+
+    def test_file_arrays_from_buffer(self):
+        format_type, time_division, track_arrays = MidiFile.arrays_from_buffer(MIDI_FILE_BYTES)
+        self.assertEqual((format_type, time_division), (1, 96))
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        self.assertEqual([a.to_events() for a in track_arrays],
+                         [t.events for t in midi_file.tracks])
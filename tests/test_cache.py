@@ -0,0 +1,93 @@
+import unittest
+import os
+import tempfile
+import unittest.mock
+
+from arrays import np
+from fileio import MidiFile
+from tests.test_fileio import MIDI_FILE_BYTES
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        import cache
+        self.cache_module = cache
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_directory = os.path.join(self.directory.name, "cache")
+        self.filename = self.write_file("a.mid", MIDI_FILE_BYTES)
+        self.expected = [t.events for t in MidiFile.from_buffer(MIDI_FILE_BYTES).tracks]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_file(self, name, data):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def cache_files(self):
+        return sorted(name for name in os.listdir(self.cache_directory) if name.endswith(".mpc"))
+
+    def test_load(self):
+        parse_cache = self.cache_module.ParseCache(self.cache_directory)
+        midi_file = MidiFile.from_filename(self.filename, cache=parse_cache)
+        self.assertEqual((midi_file.format_type, midi_file.time_division), (1, 96))
+        self.assertFalse(midi_file.tracks.is_decoded(0))
+        self.assertEqual([t.events for t in midi_file.tracks], self.expected)
+        self.assertEqual(len(self.cache_files()), 1)
+        midi_file = MidiFile.from_filename(self.filename, lazy=False, cache=parse_cache)
+        self.assertIsInstance(midi_file.tracks, list)
+        self.assertEqual([t.events for t in midi_file.tracks], self.expected)
+
+    def test_lazy_load(self):
+        parse_cache = self.cache_module.ParseCache(self.cache_directory)
+        parse_cache.load(self.filename)
+        midi_file = MidiFile.from_filename(self.filename, lazy=True, cache=parse_cache)
+        self.assertFalse(midi_file.tracks.is_decoded(1))
+        self.assertEqual(list(midi_file.iter_track_events(1)), self.expected[1])
+        self.assertFalse(midi_file.tracks.is_decoded(1))
+        self.assertEqual([t.events for t in midi_file.tracks], self.expected)
+        with self.assertRaises(ValueError):
+            MidiFile.from_filename(self.filename, executor=unittest.mock.Mock(), cache=parse_cache)
+
+    def test_warm_load_from_disk(self):
+        self.cache_module.ParseCache(self.cache_directory).load(self.filename)
+        parse_cache = self.cache_module.ParseCache(self.cache_directory)
+        with unittest.mock.patch.object(MidiFile, 'arrays_from_buffer') as arrays_from_buffer:
+            midi_file = parse_cache.load(self.filename)
+            arrays_from_buffer.assert_not_called()
+        self.assertEqual([t.events for t in midi_file.tracks], self.expected)
+
+    def test_unchanged_files_are_not_hashed(self):
+        parse_cache = self.cache_module.ParseCache(self.cache_directory)
+        first = parse_cache.load_arrays(self.filename)
+        with unittest.mock.patch.object(self.cache_module, 'content_key') as content_key:
+            self.assertIs(parse_cache.load_arrays(self.filename), first)
+            content_key.assert_not_called()
+        self.write_file("a.mid", MIDI_FILE_BYTES[:-4] + b'\x01\xff\x2f\x00')
+        os.utime(self.filename, ns=(0, 0))
+        self.assertIsNot(parse_cache.load_arrays(self.filename), first)
+
+    def test_memory_lru(self):
+        parse_cache = self.cache_module.ParseCache(self.cache_directory, memory_items=1)
+        first = parse_cache.load_arrays(self.filename)
+        self.assertIs(parse_cache.load_arrays(self.filename), first)
+        other = self.write_file("b.mid", MIDI_FILE_BYTES + b'\x00')
+        parse_cache.load_arrays(other)
+        self.assertIsNot(parse_cache.load_arrays(self.filename), first)
+
+    def test_parser_version_invalidates(self):
+        self.cache_module.ParseCache(self.cache_directory).load(self.filename)
+        with unittest.mock.patch.object(self.cache_module, 'PARSER_VERSION', 2):
+            parse_cache = self.cache_module.ParseCache(self.cache_directory)
+            parse_cache.load(self.filename)
+        self.assertEqual(len(self.cache_files()), 2)
+
+    def test_eviction(self):
+        parse_cache = self.cache_module.ParseCache(self.cache_directory, max_bytes=1)
+        parse_cache.load(self.filename)
+        parse_cache.load(self.write_file("b.mid", MIDI_FILE_BYTES + b'\x00'))
+        self.assertLessEqual(len(self.cache_files()), 1)
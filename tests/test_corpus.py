@@ -0,0 +1,55 @@
+import unittest
+import os
+import tempfile
+
+import corpus
+from fileio import MidiFile
+from tests.test_fileio import MIDI_FILE_BYTES
+
+
+class ParseFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(5):
+            path = os.path.join(self.directory.name, "{}.mid".format(i))
+            with open(path, "wb") as f:
+                f.write(MIDI_FILE_BYTES if i != 3 else b'RIFF')
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_summary(self):
+        results = list(corpus.parse_files(self.paths, summary=True, max_workers=2, chunksize=2))
+        self.assertEqual(sorted(r.path for r in results), self.paths)
+        for result in results:
+            if result.path == self.paths[3]:
+                self.assertIsNone(result.result)
+                self.assertIn("ValueError", result.error)
+            else:
+                self.assertIsNone(result.error)
+                self.assertEqual(result.result, corpus.FileSummary(1, 2, 96, 8, len(MIDI_FILE_BYTES)))
+
+    def test_midi_files_from_glob(self):
+        pattern = os.path.join(self.directory.name, "[0-2].mid")
+        results = list(corpus.parse_files(pattern, max_workers=2))
+        self.assertEqual(sorted(r.path for r in results), self.paths[:3])
+        expected = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        for result in results:
+            self.assertEqual([t.events for t in result.result.tracks], [t.events for t in expected.tracks])
+
+
+class PayloadPoolTest(unittest.TestCase):
+
+    def test_intern_file(self):
+        pool = corpus.PayloadPool()
+        first, second = MidiFile.from_buffer(MIDI_FILE_BYTES), MidiFile.from_buffer(MIDI_FILE_BYTES)
+        pool.intern_file(first)
+        pool.intern_file(second)
+        self.assertEqual(len(pool), 3)
+        self.assertIs(first.tracks[0].events[0][1].data, second.tracks[0].events[0][1].data)
+        self.assertIsInstance(first.tracks[1].events[3][1].data, bytes)
+        self.assertFalse(first.tracks[1].modified)
+        self.assertEqual(first.to_bytes(), MIDI_FILE_BYTES)
@@ -0,0 +1,126 @@
+import unittest
+import asyncio
+import io
+import os
+
+from deveceio import (AsyncMidiDevice, EventQueue, DROP_OLDEST, DROP_NEWEST,
+                      MidiStreamParser, RealTimeMidiDevice)
+from events import (MetaEvent, SysExEvent, NoteOnEvent, NoteOffEvent, ProgramChangeEvent,
+                    SystemCommonEvent, SystemRealTimeEvent)
+
+DEVICE_BYTES = b'\x90\x3c\x40\xf8\x3e\x40\xc1\x05\xf0\x02\x7e\x7f\xff\x01\x01a'
+DEVICE_EVENTS = [
+    NoteOnEvent(0, b'\x3c\x40'),
+    NoteOnEvent(0, b'\x3e\x40'),
+    ProgramChangeEvent(1, b'\x05'),
+    SysExEvent(b'\x7e\x7f'),
+    MetaEvent(0x01, b'a'),
+]
+
+
+def make_reader(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+class AsyncMidiDeviceTest(unittest.TestCase):
+
+    def test_async_iteration(self):
+        async def read_all():
+            return [event async for event in AsyncMidiDevice(make_reader(DEVICE_BYTES))]
+        self.assertEqual(asyncio.run(read_all()), DEVICE_EVENTS)
+
+    def test_fan_out(self):
+        async def read_all():
+            device = AsyncMidiDevice(make_reader(DEVICE_BYTES), maxsize=2)
+            queues = [device.subscribe(), device.subscribe()]
+            device.start()
+
+            async def consume(queue):
+                return [event async for event in queue]
+            return await asyncio.gather(*map(consume, queues))
+        self.assertEqual(asyncio.run(read_all()), [DEVICE_EVENTS, DEVICE_EVENTS])
+
+    def test_drop_policies(self):
+        async def read_all(overflow):
+            device = AsyncMidiDevice(make_reader(DEVICE_BYTES), maxsize=2, overflow=overflow)
+            queue = device.subscribe()
+            await device.start()
+            return [event async for event in queue], queue.dropped
+        self.assertEqual(asyncio.run(read_all(DROP_OLDEST)), (DEVICE_EVENTS[-2:], 3))
+        self.assertEqual(asyncio.run(read_all(DROP_NEWEST)), (DEVICE_EVENTS[:2], 3))
+
+    def test_error_is_raised_in_consumer(self):
+        async def read_all():
+            return [event async for event in AsyncMidiDevice(make_reader(b'\x90\x3c\x40\xf4'))]
+        with self.assertRaises(ValueError):
+            asyncio.run(read_all())
+
+    def test_from_fd(self):
+        async def read_all(fd):
+            device = await AsyncMidiDevice.from_fd(fd)
+            return [event async for event in device]
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, DEVICE_BYTES)
+        os.close(write_fd)
+        self.assertEqual(asyncio.run(read_all(read_fd)), DEVICE_EVENTS)
+
+    def test_unknown_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            EventQueue(overflow='drop-all')
+
+
+class MidiStreamParserTest(unittest.TestCase):
+
+    def test_messages_split_between_feeds(self):
+        parser = MidiStreamParser()
+        events = []
+        for byte in b'\x90\x3c\x40\x3e\x40\xc1\x05':
+            events.extend(parser.feed(bytes((byte,))))
+        self.assertEqual(events, [NoteOnEvent(0, b'\x3c\x40'), NoteOnEvent(0, b'\x3e\x40'),
+                                  ProgramChangeEvent(1, b'\x05')])
+
+    def test_real_time_inside_messages(self):
+        parser = MidiStreamParser(real_time_filter=())
+        events = parser.feed(b'\x90\x3c\xf8\x40\xf0\x7e\xfe\x7f\xf7\xff')
+        self.assertEqual(events, [
+            SystemRealTimeEvent(0xf8),
+            NoteOnEvent(0, b'\x3c\x40'),
+            SystemRealTimeEvent(0xfe),
+            SysExEvent(b'\x7e\x7f\xf7'),
+            SystemRealTimeEvent(0xff),
+        ])
+
+    def test_clock_is_filtered_by_default(self):
+        self.assertEqual(MidiStreamParser().feed(b'\xf8\x90\xf8\x3c\x40'), [NoteOnEvent(0, b'\x3c\x40')])
+
+    def test_system_common_cancels_running_status(self):
+        parser = MidiStreamParser()
+        events = parser.feed(b'\x90\x3c\x40\xf2\x01\x02\xf6\x3c\x40')
+        self.assertEqual(events, [NoteOnEvent(0, b'\x3c\x40'), SystemCommonEvent(0xf2, b'\x01\x02'),
+                                  SystemCommonEvent(0xf6)])
+
+    def test_unterminated_sysex(self):
+        self.assertEqual(MidiStreamParser().feed(b'\xf0\x01\x02\x80\x3c\x40'),
+                         [SysExEvent(b'\x01\x02'), NoteOffEvent(0, b'\x3c\x40')])
+
+
+class RealTimeMidiDeviceTest(unittest.TestCase):
+
+    def test_pipe(self):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b'\x90\x3c\x40\x3e')
+        os.write(write_fd, b'\x40\xfa')
+        os.close(write_fd)
+        with open(read_fd, 'rb', buffering=0) as stream:
+            timed_events = list(RealTimeMidiDevice(stream, real_time_filter=()))
+        self.assertEqual([event for _, event in timed_events],
+                         [NoteOnEvent(0, b'\x3c\x40'), NoteOnEvent(0, b'\x3e\x40'), SystemRealTimeEvent(0xfa)])
+        timestamps = [timestamp for timestamp, _ in timed_events]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_stream_without_fileno(self):
+        device = RealTimeMidiDevice(io.BytesIO(b'\x90\x3c\x40'), clock=lambda: 1.5)
+        self.assertEqual(list(device), [(1.5, NoteOnEvent(0, b'\x3c\x40'))])
@@ -1,8 +1,10 @@
 import unittest
 import io
+import pickle
 
-from events import MetaEvent, SysExEvent, ChannelEvent
-from events.event_factory import MidiEventFactory
+from events import MetaEvent, SysExEvent, ChannelEvent, NoteOnEvent, ProgramChangeEvent
+from deveceio import MidiDevice
+from events.event_factory import MidiEventFactory, STATUS_TABLE
 
 
 class MetaEventTest(unittest.TestCase):
@@ -130,3 +132,112 @@ class MidiEventFactoryTest(unittest.TestCase):
         stream = io.BytesIO(b'\x80\x03\x02\x11\x22')
         e = MidiEventFactory.from_stream(stream)
         self.assertIsInstance(e, ChannelEvent)
+
+    def test_from_buffer_returns_new_offset(self):
+        buffer = b'\x90\x3c\x40\x3c\x00\xff\x01\x02\x11\x22'
+        e1, offset = MidiEventFactory.from_buffer(buffer)
+        e2, offset = MidiEventFactory.from_buffer(buffer, offset, running_status=e1.status)
+        e3, offset = MidiEventFactory.from_buffer(buffer, offset, running_status=e2.status)
+        self.assertEqual(e1, ChannelEvent.init_subclass(0x9, 0, b'\x3c\x40'))
+        self.assertEqual(e2, ChannelEvent.init_subclass(0x9, 0, b'\x3c\x00'))
+        self.assertEqual(e3, MetaEvent(event_type=0x01, data=b'\x11\x22'))
+        self.assertEqual(offset, len(buffer))
+
+
+class CompactChannelEventTest(unittest.TestCase):
+
+    def setUp(self):
+        self.event = NoteOnEvent(channel=3, data=b'\x3c\x40')
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(self.event, '__dict__'))
+        self.assertFalse(hasattr(MetaEvent(0x01, b''), '__dict__'))
+        self.assertFalse(hasattr(SysExEvent(b''), '__dict__'))
+
+    def test_parameters(self):
+        e = self.event
+        self.assertEqual((e.note_number, e.velocity), (0x3c, 0x40))
+        e.velocity = 0x7f
+        self.assertEqual((e.note_number, e.velocity), (0x3c, 0x7f))
+        self.assertEqual(e.data, b'\x3c\x7f')
+        self.assertEqual(e.serialize(), b'\x93\x3c\x7f')
+
+    def test_packed(self):
+        self.assertEqual(self.event.packed(), (3, 0x403c))
+        self.assertEqual(NoteOnEvent.from_packed(*self.event.packed()), self.event)
+
+    def test_invalid_parameter(self):
+        with self.assertRaises(ValueError):
+            self.event.note_number = 128
+        with self.assertRaises(TypeError):
+            self.event.note_number = "1"
+
+    def test_single_parameter(self):
+        e = ProgramChangeEvent(channel=0, data=[5])
+        self.assertEqual(e.program_number, 5)
+        self.assertEqual(e.data, b'\x05')
+
+    def test_registered_event_types(self):
+        self.assertIs(ChannelEvent.event_types[0x9], NoteOnEvent)
+        self.assertEqual(NoteOnEvent.param_list, ['note_number', 'velocity'])
+
+
+class StatusTableTest(unittest.TestCase):
+
+    def test_table_covers_every_status(self):
+        self.assertEqual(len(STATUS_TABLE), 256)
+        entry = STATUS_TABLE[0x93]
+        self.assertEqual((entry.event_class, entry.channel, entry.param_count), (NoteOnEvent, 3, 2))
+        entry = STATUS_TABLE[0xc5]
+        self.assertEqual((entry.event_class, entry.channel, entry.param_count), (ProgramChangeEvent, 5, 1))
+
+    def test_filters_midi_beat_clock(self):
+        stream = io.BytesIO(b'\xf8\xf8\x93\x3c\x40')
+        self.assertEqual(MidiEventFactory.from_stream(stream), NoteOnEvent(3, b'\x3c\x40'))
+        event, offset = MidiEventFactory.from_buffer(b'\xf8\x93\x3c\x40')
+        self.assertEqual(event, NoteOnEvent(3, b'\x3c\x40'))
+        self.assertEqual(offset, 4)
+
+    def test_long_run_of_midi_beat_clock(self):
+        data = b'\xf8' * 5000 + b'\x93\x3c\x40'
+        self.assertEqual(MidiEventFactory.from_stream(io.BytesIO(data)), NoteOnEvent(3, b'\x3c\x40'))
+        self.assertEqual(MidiEventFactory.from_buffer(data), (NoteOnEvent(3, b'\x3c\x40'), len(data)))
+        self.assertEqual(MidiEventFactory.from_stream_and_status(io.BytesIO(data[1:]), 0xf8),
+                         NoteOnEvent(3, b'\x3c\x40'))
+        self.assertEqual(next(iter(MidiDevice(io.BytesIO(data)))), NoteOnEvent(3, b'\x3c\x40'))
+
+    def test_running_status(self):
+        stream = io.BytesIO(b'\x3c\x40\x05')
+        self.assertEqual(MidiEventFactory.from_stream(stream, running_status=0x93), NoteOnEvent(3, b'\x3c\x40'))
+        self.assertEqual(MidiEventFactory.from_stream(stream, running_status=0xc1), ProgramChangeEvent(1, b'\x05'))
+
+    def test_running_status_after_meta_event(self):
+        with self.assertRaises(ValueError):
+            MidiEventFactory.from_buffer(b'\x3c\x40', running_status=0xff)
+        with self.assertRaises(ValueError):
+            MidiEventFactory.from_buffer(b'\x3c\x40')
+
+    def test_unsupported_status(self):
+        with self.assertRaises(ValueError):
+            MidiEventFactory.from_stream(io.BytesIO(b'\xf4\x00'))
+
+
+class PickleTest(unittest.TestCase):
+
+    def test_pickle_payload_slices(self):
+        buffer = memoryview(b'\xff\x01\x02\x11\x22\xf0\x01\x7f')
+        meta, offset = MidiEventFactory.from_buffer(buffer)
+        sysex, offset = MidiEventFactory.from_buffer(buffer, offset)
+        for event in (meta, sysex, NoteOnEvent(3, b'\x3c\x40')):
+            self.assertEqual(pickle.loads(pickle.dumps(event)), event)
+
+
+class EventKeyTest(unittest.TestCase):
+
+    def test_equal_events_have_equal_keys(self):
+        events = [NoteOnEvent(0, b'\x3c\x40'), NoteOnEvent(1, b'\x3c\x40'), NoteOnEvent(0, b'\x3c\x41'),
+                  ProgramChangeEvent(0, b'\x3c'), MetaEvent(0x01, b'a'), MetaEvent(0x02, b'a'),
+                  SysExEvent(b'a'), SysExEvent(b'a', 0xf7)]
+        self.assertEqual(len({event.key() for event in events}), len(events))
+        self.assertEqual(NoteOnEvent(0, b'\x3c\x40').key(), NoteOnEvent(0, bytearray(b'\x3c\x40')).key())
+        self.assertEqual(MetaEvent(0x01, memoryview(b'xa')[1:]).key(), MetaEvent(0x01, b'a').key())
@@ -0,0 +1,375 @@
+import unittest
+import unittest.mock
+import concurrent.futures
+import io
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import tracemalloc
+
+from events import MetaEvent, SysExEvent, NoteOnEvent, NoteOffEvent, ProgramChangeEvent
+from fileio import MidiFile, MidiTrack
+
+
+def make_chunk(chunk_id, data):
+    return chunk_id + struct.pack(">L", len(data)) + data
+
+
+TRACK0_BYTES = (
+    b'\x00\xff\x51\x03\x07\xa1\x20'   # Tempo 500000
+    b'\x00\xff\x2f\x00'               # End of track
+)
+TRACK1_BYTES = (
+    b'\x00\x90\x3c\x40'               # Note on
+    b'\x60\x3c\x00'                   # Note on with running status
+    b'\x00\xc0\x05'                   # Program change
+    b'\x00\xf0\x03\x7e\x7f\xf7'       # SysEx
+    b'\x81\x00\x80\x3c\x40'           # Note off
+    b'\x00\xff\x2f\x00'               # End of track
+)
+MIDI_FILE_BYTES = (
+    make_chunk(b'MThd', struct.pack(">HHH", 1, 2, 96))
+    + make_chunk(b'MTrk', TRACK0_BYTES)
+    + make_chunk(b'MTrk', TRACK1_BYTES)
+)
+TRACK1_EVENTS = [
+    (0, NoteOnEvent(0, bytearray(b'\x3c\x40'))),
+    (0x60, NoteOnEvent(0, bytearray(b'\x3c\x00'))),
+    (0, ProgramChangeEvent(0, bytearray(b'\x05'))),
+    (0, SysExEvent(b'\x7e\x7f\xf7')),
+    (0x80, NoteOffEvent(0, bytearray(b'\x3c\x40'))),
+    (0, MetaEvent(0x2f, b'')),
+]
+
+
+class MidiFileFromStreamTest(unittest.TestCase):
+
+    def test_from_stream(self):
+        midi_file = MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES))
+        self.assertEqual(midi_file.format_type, 1)
+        self.assertEqual(midi_file.time_division, 96)
+        self.assertEqual(len(midi_file.tracks), 2)
+        self.assertEqual(midi_file.tracks[1].events, TRACK1_EVENTS)
+
+    def test_payloads_are_bytes(self):
+        midi_file = MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES))
+        tempo = midi_file.tracks[0].events[0][1]
+        sysex = midi_file.tracks[1].events[3][1]
+        self.assertIsInstance(tempo.data, bytes)
+        self.assertIsInstance(sysex.data, bytes)
+        self.assertEqual(repr(tempo), "<MetaEvent: event_type=81 data=b'\\x07\\xa1 '>")
+
+
+class MidiFileFromBufferTest(unittest.TestCase):
+
+    def assertSameTracks(self, midi_file, other):
+        self.assertEqual(midi_file.format_type, other.format_type)
+        self.assertEqual(midi_file.time_division, other.time_division)
+        self.assertEqual([t.events for t in midi_file.tracks],
+                         [t.events for t in other.tracks])
+
+    def test_from_buffer_matches_from_stream(self):
+        expected = MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES))
+        for buffer in (MIDI_FILE_BYTES, bytearray(MIDI_FILE_BYTES), memoryview(MIDI_FILE_BYTES)):
+            self.assertSameTracks(MidiFile.from_buffer(buffer), expected)
+
+    def test_payloads_are_slices_of_buffer(self):
+        buffer = bytearray(MIDI_FILE_BYTES)
+        midi_file = MidiFile.from_buffer(buffer)
+        tempo = midi_file.tracks[0].events[0][1]
+        self.assertIsInstance(tempo.data, memoryview)
+        self.assertIs(tempo.data.obj, buffer)
+        self.assertEqual(tempo.data, b'\x07\xa1\x20')
+        self.assertEqual(repr(tempo), "<MetaEvent: event_type=81 data=b'\\x07\\xa1 '>")
+
+    def test_from_mmap(self):
+        with tempfile.NamedTemporaryFile(suffix=".mid", delete=False) as f:
+            f.write(MIDI_FILE_BYTES)
+        try:
+            midi_file = MidiFile.from_mmap(f.name)
+            self.assertSameTracks(midi_file, MidiFile.from_buffer(MIDI_FILE_BYTES))
+        finally:
+            os.remove(f.name)
+
+    def test_track_from_buffer_at_offset(self):
+        track = MidiTrack.from_buffer(MIDI_FILE_BYTES, 14 + 8 + len(TRACK0_BYTES))
+        self.assertEqual(track.events, TRACK1_EVENTS)
+
+    def test_wrong_chunk_id(self):
+        with self.assertRaises(ValueError):
+            MidiTrack.from_buffer(MIDI_FILE_BYTES)
+
+
+class LazyMidiFileTest(unittest.TestCase):
+
+    def assertLazyTracks(self, midi_file):
+        self.assertEqual(midi_file.format_type, 1)
+        self.assertEqual(len(midi_file.tracks), 2)
+        self.assertEqual(midi_file.tracks.chunk_table,
+                         [(14, len(TRACK0_BYTES)), (14 + 8 + len(TRACK0_BYTES), len(TRACK1_BYTES))])
+        self.assertFalse(midi_file.tracks.is_decoded(1))
+        self.assertEqual(midi_file.tracks[1].events, TRACK1_EVENTS)
+        self.assertTrue(midi_file.tracks.is_decoded(1))
+        self.assertFalse(midi_file.tracks.is_decoded(0))
+
+    def test_lazy_from_buffer(self):
+        self.assertLazyTracks(MidiFile.from_buffer(MIDI_FILE_BYTES, lazy=True))
+
+    def test_lazy_from_stream(self):
+        self.assertLazyTracks(MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES), lazy=True))
+
+    def test_lazy_from_filename(self):
+        with tempfile.NamedTemporaryFile(suffix=".mid", delete=False) as f:
+            f.write(MIDI_FILE_BYTES)
+        try:
+            self.assertLazyTracks(MidiFile.from_filename(f.name, lazy=True))
+        finally:
+            os.remove(f.name)
+
+    def test_release(self):
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES, lazy=True)
+        track = midi_file.tracks[0]
+        self.assertIs(midi_file.tracks[0], track)
+        midi_file.tracks.release(0)
+        self.assertFalse(midi_file.tracks.is_decoded(0))
+        self.assertIsNot(midi_file.tracks[0], track)
+
+    def test_keep_decoded_false(self):
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES, lazy=True)
+        midi_file.tracks.keep_decoded = False
+        self.assertEqual(midi_file.tracks[-1].events, TRACK1_EVENTS)
+        self.assertFalse(midi_file.tracks.is_decoded(1))
+
+
+class MidiFileWriteTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        self.assertEqual(midi_file.to_bytes(), MIDI_FILE_BYTES)
+        stream = io.BytesIO()
+        midi_file.write_to(stream)
+        self.assertEqual(stream.getvalue(), MIDI_FILE_BYTES)
+
+    def test_lazy_round_trip(self):
+        self.assertEqual(MidiFile.from_buffer(MIDI_FILE_BYTES, lazy=True).to_bytes(), MIDI_FILE_BYTES)
+
+    def test_running_status(self):
+        track = MidiTrack(events=[
+            (0, NoteOnEvent(1, b'\x3c\x40')),
+            (0, NoteOnEvent(1, b'\x3e\x40')),
+            (0, MetaEvent(0x01, b'a')),
+            (0, NoteOnEvent(1, b'\x40\x40')),
+            (0, NoteOffEvent(1, b'\x40\x40')),
+        ])
+        self.assertEqual(track.to_bytes(), make_chunk(
+            b'MTrk',
+            b'\x00\x91\x3c\x40'
+            b'\x00\x3e\x40'
+            b'\x00\xff\x01\x01a'
+            b'\x00\x91\x40\x40'
+            b'\x00\x81\x40\x40'))
+
+    def test_long_delta_time(self):
+        track = MidiTrack(events=[(0x100000, MetaEvent(0x2f, b''))])
+        self.assertEqual(track.to_bytes(), make_chunk(b'MTrk', b'\xc0\x80\x00\xff\x2f\x00'))
+
+
+class ParallelTrackDecodingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.expected = [t.events for t in MidiFile.from_buffer(MIDI_FILE_BYTES).tracks]
+
+    def test_thread_pool(self):
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES, executor=executor, parallel_threshold=0)
+        self.assertEqual([t.events for t in midi_file.tracks], self.expected)
+
+    def test_process_pool(self):
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES, executor=executor, parallel_threshold=0)
+        self.assertEqual([t.events for t in midi_file.tracks], self.expected)
+
+    def test_serial_below_threshold(self):
+        executor = unittest.mock.Mock()
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES, executor=executor)
+        executor.map.assert_not_called()
+        self.assertEqual([t.events for t in midi_file.tracks], self.expected)
+
+
+class MergedEventsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.midi_file = MidiFile(1, 96)
+        self.midi_file.tracks = [
+            MidiTrack(events=[(0, MetaEvent(0x01, b'a')), (10, MetaEvent(0x01, b'b')), (0, MetaEvent(0x01, b'c'))]),
+            MidiTrack(events=[(5, NoteOnEvent(0, b'\x3c\x40')), (5, NoteOnEvent(0, b'\x3c\x00'))]),
+            MidiTrack(events=[(0, NoteOnEvent(1, b'\x3c\x40'))]),
+        ]
+
+    def test_merged_events(self):
+        merged = [(tick, index) for tick, index, _ in self.midi_file.merged_events()]
+        self.assertEqual(merged, [(0, 0), (0, 2), (5, 1), (10, 0), (10, 0), (10, 1)])
+        events = [event for tick, index, event in self.midi_file.merged_events() if index == 0]
+        self.assertEqual([e.data for e in events], [b'a', b'b', b'c'])
+
+    def test_merged_events_of_lazy_file(self):
+        midi_file = MidiFile.from_buffer(self.midi_file.to_bytes(), lazy=True)
+        self.assertEqual(list(midi_file.merged_events()), list(self.midi_file.merged_events()))
+        self.assertFalse(any(midi_file.tracks.is_decoded(i) for i in range(len(midi_file.tracks))))
+
+
+class IncrementalWriteTest(unittest.TestCase):
+
+    def test_parsed_tracks_are_not_modified(self):
+        for midi_file in (MidiFile.from_buffer(MIDI_FILE_BYTES), MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES))):
+            self.assertFalse(any(track.modified for track in midi_file.tracks))
+            self.assertEqual(bytes(midi_file.tracks[1].data), TRACK1_BYTES)
+        self.assertTrue(MidiTrack(events=[]).modified)
+
+    def test_unmodified_tracks_are_copied(self):
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        with unittest.mock.patch.object(MetaEvent, 'append_to') as append_to:
+            self.assertEqual(midi_file.to_bytes(), MIDI_FILE_BYTES)
+            stream = io.BytesIO()
+            midi_file.write_to(stream)
+            self.assertEqual(stream.getvalue(), MIDI_FILE_BYTES)
+        append_to.assert_not_called()
+
+    def test_changed_event_list(self):
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        midi_file.tracks[1].events.insert(-1, (0, NoteOffEvent(0, b'\x3c\x00')))
+        self.assertTrue(midi_file.tracks[1].modified)
+        self.assertFalse(midi_file.tracks[0].modified)
+        expected_track = TRACK1_BYTES[:-4] + b'\x00\x3c\x00' + TRACK1_BYTES[-4:]
+        expected = MIDI_FILE_BYTES[:14 + 8 + len(TRACK0_BYTES)] + make_chunk(b'MTrk', expected_track)
+        self.assertEqual(midi_file.to_bytes(), expected)
+        self.assertFalse(midi_file.tracks[1].modified)
+        self.assertEqual(bytes(midi_file.tracks[1].data), expected_track)
+
+    def test_events_changed_in_place_are_saved(self):
+        for midi_file in (MidiFile.from_buffer(MIDI_FILE_BYTES), MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES))):
+            track = midi_file.tracks[1]
+            track.events[0][1].velocity = 0x10
+            self.assertTrue(track.modified)
+            self.assertFalse(midi_file.tracks[0].modified)
+            saved = MidiFile.from_buffer(midi_file.to_bytes())
+            self.assertEqual(saved.tracks[1].events[0][1].velocity, 0x10)
+            self.assertFalse(track.modified)
+            track.events[0][1].note_number = 0x3d
+            midi_file.tracks[0].events[0][1].data = b'changed'
+            stream = io.BytesIO()
+            midi_file.write_to(stream)
+            saved = MidiFile.from_buffer(stream.getvalue())
+            self.assertEqual(saved.tracks[1].events[0][1], NoteOnEvent(0, b'\x3d\x10'))
+            self.assertEqual(bytes(saved.tracks[0].events[0][1].data), b'changed')
+
+    def test_changes_to_other_events(self):
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        other_file = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        NoteOnEvent(0, b'\x3c\x40').velocity = 0x10
+        other_file.tracks[1].events[0][1].velocity = 0x10
+        self.assertFalse(any(track.modified for track in midi_file.tracks))
+        midi_file.tracks[1].events[0][1].velocity = 0x10
+        self.assertEqual([track.modified for track in midi_file.tracks], [False, True])
+        data = midi_file.tracks[0].data
+        midi_file.to_bytes()
+        self.assertIs(midi_file.tracks[0].data, data)
+        self.assertFalse(midi_file.tracks[1].modified)
+
+    def test_changes_after_pickling(self):
+        track = pickle.loads(pickle.dumps(MidiFile.from_buffer(MIDI_FILE_BYTES).tracks[1]))
+        self.assertFalse(track.modified)
+        track.events[0][1].velocity = 0x10
+        self.assertTrue(track.modified)
+
+    def test_mark_modified(self):
+        track = MidiFile.from_buffer(MIDI_FILE_BYTES).tracks[1]
+        track.mark_modified()
+        self.assertTrue(track.modified)
+        self.assertEqual(track.to_bytes(), make_chunk(b'MTrk', TRACK1_BYTES))
+        self.assertFalse(track.modified)
+
+    def test_replaced_events(self):
+        track = MidiFile.from_buffer(MIDI_FILE_BYTES).tracks[0]
+        track.events = [(0, MetaEvent(0x2f, b''))]
+        self.assertTrue(track.modified)
+        self.assertEqual(track.to_bytes(), make_chunk(b'MTrk', b'\x00\xff\x2f\x00'))
+        self.assertFalse(track.modified)
+
+    def test_lazy_tracks_are_not_decoded(self):
+        for midi_file in (MidiFile.from_buffer(MIDI_FILE_BYTES, lazy=True),
+                          MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES), lazy=True)):
+            midi_file.tracks[0].events.pop()
+            stream = io.BytesIO()
+            midi_file.write_to(stream)
+            self.assertEqual(stream.getvalue(), midi_file.to_bytes())
+            self.assertEqual(stream.getvalue()[14:],
+                             make_chunk(b'MTrk', TRACK0_BYTES[:-4]) + make_chunk(b'MTrk', TRACK1_BYTES))
+            self.assertFalse(midi_file.tracks.is_decoded(1))
+
+
+class IterEventsTest(unittest.TestCase):
+
+    def expected_events(self, midi_file_bytes=MIDI_FILE_BYTES):
+        midi_file = MidiFile.from_buffer(midi_file_bytes)
+        return [(index, delta_time, event) for index, track in enumerate(midi_file.tracks)
+                for delta_time, event in track.events]
+
+    def test_iter_events(self):
+        self.assertEqual(list(MidiFile.iter_events(io.BytesIO(MIDI_FILE_BYTES))), self.expected_events())
+
+    def test_pipe(self):
+        read_fd, write_fd = os.pipe()
+        writer = threading.Thread(target=lambda: (os.write(write_fd, MIDI_FILE_BYTES), os.close(write_fd)))
+        writer.start()
+        with open(read_fd, "rb", buffering=0) as stream:
+            self.assertEqual(list(MidiFile.iter_events(stream)), self.expected_events())
+        writer.join()
+
+    def test_concatenated_files(self):
+        other = MidiTrack(events=[(0, NoteOnEvent(3, b'\x3c\x40'))]).to_bytes()
+        other_file = make_chunk(b'MThd', struct.pack(">HHH", 0, 1, 480)) + other
+        stream = io.BytesIO(MIDI_FILE_BYTES + other_file + MIDI_FILE_BYTES)
+        files = []
+        for index, (midi_file, events) in enumerate(MidiFile.iter_stream(stream)):
+            files.append((midi_file.format_type, midi_file.time_division))
+            if index == 1:
+                self.assertEqual(list(events), [(0, 0, NoteOnEvent(3, b'\x3c\x40'))])
+        self.assertEqual(files, [(1, 96), (0, 480), (1, 96)])
+
+    def test_iter_events_stops_after_the_file(self):
+        stream = io.BytesIO(MIDI_FILE_BYTES + b'next')
+        self.assertEqual(len(list(MidiFile.iter_events(stream))), 8)
+        self.assertEqual(stream.read(), b'next')
+
+    def test_unknown_chunks_are_skipped(self):
+        midi_file_bytes = MIDI_FILE_BYTES[:14] + make_chunk(b'XFIH', bytes(100)) + MIDI_FILE_BYTES[14:]
+        self.assertEqual(list(MidiFile.iter_events(io.BytesIO(midi_file_bytes))), self.expected_events())
+
+    def test_truncated_buffer(self):
+        buffer = MIDI_FILE_BYTES[:-3]
+        for parse in (MidiFile.from_buffer, lambda buffer: MidiFile.from_buffer(buffer, lazy=True),
+                      lambda buffer: MidiTrack.from_buffer(buffer, 14 + 8 + len(TRACK0_BYTES))):
+            with self.assertRaisesRegex(ValueError, "ends after {} bytes".format(len(TRACK1_BYTES) - 3)):
+                parse(buffer)
+
+    def test_truncated_stream(self):
+        with self.assertRaises(ValueError):
+            list(MidiFile.iter_events(io.BytesIO(MIDI_FILE_BYTES[:14 + 8 + len(TRACK0_BYTES)])))
+
+    def test_memory_is_bounded_by_the_largest_event(self):
+        dump = SysExEvent(bytes(1 << 16))
+        track = MidiTrack(events=[(0, dump)] * 64 + [(0, MetaEvent(0x2f, b''))])
+        midi_file_bytes = make_chunk(b'MThd', struct.pack(">HHH", 0, 1, 96)) + track.to_bytes()
+        stream = io.BufferedReader(io.BytesIO(midi_file_bytes))
+        del track, dump
+        tracemalloc.start()
+        try:
+            for _ in MidiFile.iter_events(stream):
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, len(midi_file_bytes) // 8)
@@ -0,0 +1,94 @@
+import unittest
+import io
+
+from events import ChannelEvent, MetaEvent, NoteOnEvent, NoteOffEvent, SysExEvent
+from events.event_factory import event_generator
+from events.filtering import EventFilter
+from events.instrumentation import ParseStats
+from fileio import MidiFile, MidiTrack
+from tests.test_fileio import MIDI_FILE_BYTES, TRACK1_EVENTS
+
+
+def absolute_events(events):
+    tick = 0
+    for delta_time, event in events:
+        tick += delta_time
+        yield tick, event
+
+
+class NonSeekableStream(io.RawIOBase):
+    """Readable stream that can not seek, like a pipe."""
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.data.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class EventFilterTest(unittest.TestCase):
+
+    def assertFiltered(self, event_filter, keep):
+        expected = [(t, e) for t, e in absolute_events(TRACK1_EVENTS) if keep(e)]
+        for midi_file in (MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES), event_filter=event_filter),
+                          MidiFile.from_buffer(MIDI_FILE_BYTES, event_filter=event_filter),
+                          MidiFile.from_buffer(MIDI_FILE_BYTES, lazy=True, event_filter=event_filter)):
+            self.assertEqual(list(absolute_events(midi_file.tracks[1].events)), expected)
+
+    def test_no_criteria_keeps_everything(self):
+        self.assertFiltered(EventFilter(), lambda e: True)
+
+    def test_event_classes(self):
+        self.assertFiltered(EventFilter(event_classes=(NoteOnEvent, NoteOffEvent)),
+                            lambda e: isinstance(e, (NoteOnEvent, NoteOffEvent)))
+        self.assertFiltered(EventFilter(event_classes=(ChannelEvent,)), lambda e: isinstance(e, ChannelEvent))
+
+    def test_skipped_delta_times_are_folded(self):
+        midi_file = MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES),
+                                         event_filter=EventFilter(event_classes=(NoteOffEvent,)))
+        self.assertEqual(midi_file.tracks[1].events, [(0x60 + 0x80, NoteOffEvent(0, bytearray(b'\x3c\x40')))])
+
+    def test_statuses_and_channels(self):
+        self.assertFiltered(EventFilter(statuses=range(0x80, 0xa0)), lambda e: 0x80 <= e.status < 0xa0)
+        self.assertFiltered(EventFilter(channels={1}), lambda e: not isinstance(e, ChannelEvent))
+
+    def test_meta_types(self):
+        event_filter = EventFilter(event_classes=(MetaEvent,), meta_types={0x51})
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES, event_filter=event_filter)
+        self.assertEqual(midi_file.tracks[0].events, [(0, MetaEvent(0x51, b'\x07\xa1\x20'))])
+        self.assertEqual(midi_file.tracks[1].events, [])
+
+    def test_sysex(self):
+        self.assertFiltered(EventFilter(event_classes=(SysExEvent,)), lambda e: isinstance(e, SysExEvent))
+
+    def test_event_generator(self):
+        stream = io.BytesIO(b'\x90\x3c\x40\xf8\x3c\x00\xf0\x01\xf7\x80\x3c\x40')
+        events = event_generator(stream, event_filter=EventFilter(event_classes=(NoteOffEvent,)))
+        self.assertEqual(next(events), NoteOffEvent(0, bytearray(b'\x3c\x40')))
+        with self.assertRaises(ValueError):
+            event_generator(stream, stats=ParseStats(), event_filter=EventFilter())
+
+    def test_stats_and_filter_are_rejected_before_reading(self):
+        stream = io.BytesIO(MIDI_FILE_BYTES[14:])
+        with self.assertRaises(ValueError):
+            MidiTrack.from_stream(stream, stats=ParseStats(), event_filter=EventFilter())
+        self.assertEqual(stream.tell(), 0)
+
+    def test_non_seekable_stream(self):
+        sysex = b'\xf0\x86\x8d\x20' + bytes(100000)
+        stream = NonSeekableStream(b'\xff\x01\x02ab' + sysex + b'\x90\x3c\x40')
+        events = event_generator(stream, event_filter=EventFilter(event_classes=(NoteOnEvent,)))
+        self.assertEqual(next(events), NoteOnEvent(0, b'\x3c\x40'))
+        stream = NonSeekableStream(b'\xf0\x86\x8d\x20' + bytes(10))
+        with self.assertRaises(ValueError):
+            next(event_generator(stream, event_filter=EventFilter(event_classes=(NoteOnEvent,))))
+
+    def test_running_status_after_skipped_meta_event(self):
+        stream = io.BytesIO(b'\xff\x01\x00\x3c\x40')
+        with self.assertRaises(ValueError):
+            next(event_generator(stream, event_filter=EventFilter(event_classes=(NoteOnEvent,))))
@@ -0,0 +1,37 @@
+import unittest
+import io
+
+from events.event_factory import event_generator
+from events.instrumentation import ParseStats
+from fileio import MidiFile
+from tests.test_fileio import MIDI_FILE_BYTES, TRACK0_BYTES, TRACK1_BYTES, TRACK1_EVENTS
+
+
+class ParseStatsTest(unittest.TestCase):
+
+    def test_midi_file_stats(self):
+        hook_calls = []
+        stats = ParseStats(hook=lambda stats, track_stats: hook_calls.append(track_stats))
+        midi_file = MidiFile.from_stream(io.BytesIO(MIDI_FILE_BYTES), stats=stats)
+        self.assertEqual(midi_file.tracks[1].events, TRACK1_EVENTS)
+
+        self.assertEqual(stats.events, 8)
+        self.assertEqual(stats.events_by_class['MetaEvent'], 3)
+        self.assertEqual(stats.events_by_class['NoteOnEvent'], 2)
+        self.assertEqual(stats.events_by_status[0x90], 2)
+        self.assertEqual(stats.running_status_hits, 1)
+        self.assertEqual(stats.payload_bytes, 6)
+        self.assertEqual([t.index for t in stats.tracks], [0, 1])
+        self.assertEqual([t.size for t in stats.tracks], [len(TRACK0_BYTES), len(TRACK1_BYTES)])
+        self.assertEqual([t.events for t in stats.tracks], [2, 6])
+        self.assertEqual(stats.tracks[1].running_status_hits, 1)
+        self.assertTrue(all(t.seconds >= 0 for t in stats.tracks))
+        self.assertEqual(hook_calls, stats.tracks)
+
+    def test_event_generator_stats(self):
+        stats = ParseStats()
+        events = event_generator(io.BytesIO(b'\x90\x3c\x40\xf8\x3c\x00\xf0\x01\xf7'), stats)
+        self.assertEqual(len([next(events) for _ in range(3)]), 3)
+        self.assertEqual(stats.events_by_class, {'NoteOnEvent': 2, 'SysExEvent': 1})
+        self.assertEqual(stats.running_status_hits, 1)
+        self.assertEqual(stats.payload_bytes, 1)
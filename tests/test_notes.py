@@ -0,0 +1,67 @@
+import unittest
+
+from events import ControllerEvent, NoteOnEvent, NoteOffEvent
+from fileio import MidiFile, MidiTrack
+from notes import Note, extract_note_arrays, extract_notes, np
+
+
+def track(*events):
+    """Creates a track from (tick, event) tuples."""
+    previous, delta_events = 0, []
+    for tick, event in events:
+        delta_events.append((tick - previous, event))
+        previous = tick
+    return MidiTrack(events=delta_events)
+
+
+def on(channel, pitch, velocity=0x40):
+    return NoteOnEvent(channel, bytes((pitch, velocity)))
+
+
+def off(channel, pitch):
+    return NoteOffEvent(channel, bytes((pitch, 0x40)))
+
+
+OVERLAPPING = track((0, on(0, 60, 10)), (10, on(0, 60, 20)), (20, off(0, 60)), (30, on(0, 60, 0)), (40, off(0, 60)))
+
+
+class ExtractNotesTest(unittest.TestCase):
+
+    def test_note_on_with_velocity_zero(self):
+        notes = extract_notes(track((0, on(1, 60, 100)), (0, ControllerEvent(1, b'\x40\x7f')), (96, on(1, 60, 0)),
+                                    (96, on(1, 62, 90)), (192, off(1, 62))))
+        self.assertEqual(notes, [Note(0, 96, 60, 100, 1, 0), Note(96, 192, 62, 90, 1, 0)])
+
+    def test_channels_are_separate(self):
+        notes = extract_notes(track((0, on(0, 60)), (0, on(1, 60)), (5, off(1, 60)), (10, off(0, 60))))
+        self.assertEqual([(note.channel, note.end) for note in notes], [(0, 10), (1, 5)])
+
+    def test_overlap_policies(self):
+        def spans(overlap):
+            return [(note.start, note.end, note.velocity) for note in extract_notes(OVERLAPPING, overlap)]
+        self.assertEqual(spans('fifo'), [(0, 20, 10), (10, 30, 20)])
+        self.assertEqual(spans('lifo'), [(0, 30, 10), (10, 20, 20)])
+        self.assertEqual(spans('retrigger'), [(0, 10, 10), (10, 20, 20)])
+        self.assertEqual(spans('ignore'), [(0, 20, 10)])
+        with self.assertRaises(ValueError):
+            extract_notes(OVERLAPPING, 'other')
+
+    def test_unterminated_policies(self):
+        unterminated = track((0, on(0, 60)), (10, on(0, 62)), (20, off(0, 62)), (30, ControllerEvent(0, b'\x40\x00')))
+        self.assertEqual([(n.pitch, n.end) for n in extract_notes(unterminated)], [(60, 30), (62, 20)])
+        self.assertEqual([(n.pitch, n.end) for n in extract_notes(unterminated, unterminated='drop')], [(62, 20)])
+
+    def test_orphan_note_off(self):
+        self.assertEqual(extract_notes(track((0, off(0, 60)))), [])
+
+    def test_merged_tracks(self):
+        midi_file = MidiFile(1, 96)
+        midi_file.tracks = [track((0, on(0, 60)), (20, on(0, 64))), track((10, off(0, 60)), (30, off(0, 64)))]
+        self.assertEqual(extract_notes(midi_file), [Note(0, 10, 60, 0x40, 0, 0), Note(20, 30, 64, 0x40, 0, 0)])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_note_arrays(self):
+        arrays = extract_note_arrays(OVERLAPPING)
+        self.assertEqual(arrays.start.tolist(), [0, 10])
+        self.assertEqual(arrays.end.tolist(), [20, 30])
+        self.assertEqual(arrays.pitch.dtype, np.uint8)
@@ -0,0 +1,128 @@
+import unittest
+
+from events import ControllerEvent, MetaEvent, NoteOnEvent, NoteOffEvent, ProgramChangeEvent
+from fileio import MidiFile, MidiTrack
+from pianoroll import np, scipy
+from trackdiff import absolute_events
+
+if np is not None:
+    import pianoroll
+
+
+def midi_file(*tracks):
+    """Creates a file with a time division of 96 from tracks of (tick, event) tuples."""
+    midi_file = MidiFile(1, 96)
+    for events in tracks:
+        previous, delta_events = 0, []
+        for tick, event in events:
+            delta_events.append((tick - previous, event))
+            previous = tick
+        midi_file.tracks.append(MidiTrack(events=delta_events))
+    return midi_file
+
+
+def pedal(channel, value):
+    return ControllerEvent(channel, bytes((64, value)))
+
+
+SONG = midi_file(
+    [(0, MetaEvent(0x51, (250000).to_bytes(3, 'big')))],
+    [(0, ProgramChangeEvent(0, b'\x05')),
+     (0, NoteOnEvent(0, b'\x3c\x40')),
+     (0, pedal(0, 127)),
+     (96, NoteOffEvent(0, b'\x3c\x00')),
+     (96, NoteOnEvent(0, b'\x40\x30')),
+     (144, NoteOnEvent(0, b'\x40\x00')),
+     (192, pedal(0, 0)),
+     (192, ProgramChangeEvent(0, b'\x07')),
+     (192, NoteOnEvent(0, b'\x3c\x7f')),
+     (240, NoteOffEvent(0, b'\x3c\x00'))],
+    [(48, NoteOnEvent(9, b'\x24\x64')), (96, NoteOnEvent(9, b'\x24\x00'))],
+)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class PianoRollTest(unittest.TestCase):
+
+    def test_ticks(self):
+        roll = pianoroll.piano_roll(SONG, 48, use_sustain=False)
+        self.assertEqual(roll.shape, (1, 128, 5))
+        self.assertEqual(roll[0, 0x3c].tolist(), [0x40, 0x40, 0, 0, 0x7f])
+        self.assertEqual(roll[0, 0x40].tolist(), [0, 0, 0x30, 0, 0])
+        self.assertEqual(roll[0, 0x24].tolist(), [0, 0x64, 0, 0, 0])
+        self.assertEqual(np.count_nonzero(roll), 5)
+
+    def test_sustain(self):
+        roll = pianoroll.piano_roll(SONG, 48, binary=True)
+        self.assertEqual(roll[0, 0x3c].tolist(), [1, 1, 1, 1, 1])
+        self.assertEqual(roll[0, 0x40].tolist(), [0, 0, 1, 1, 0])
+        self.assertEqual(roll[0, 0x24].tolist(), [0, 1, 0, 0, 0])
+
+    def test_sustain_is_cut_by_the_same_pitch(self):
+        song = midi_file([(0, pedal(0, 127)), (0, NoteOnEvent(0, b'\x3c\x40')), (10, NoteOnEvent(0, b'\x3c\x00')),
+                          (20, NoteOnEvent(0, b'\x3c\x40')), (30, NoteOnEvent(0, b'\x3c\x00')), (100, pedal(0, 0))])
+        roll = pianoroll.piano_roll(song, 10)
+        self.assertEqual(roll[0, 0x3c].tolist(), [0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40])
+
+    def test_seconds(self):
+        # 250000 microseconds per quarter note of 96 ticks, so 48 ticks are 0.125 seconds.
+        roll = pianoroll.piano_roll(SONG, 0.125, unit='seconds', use_sustain=False)
+        self.assertEqual(roll.tolist(), pianoroll.piano_roll(SONG, 48, use_sustain=False).tolist())
+
+    def test_invalid_tempo_event(self):
+        song = midi_file([(0, MetaEvent(0x51, b'\x03\xd0'))], [(0, NoteOnEvent(0, b'\x3c\x40'))])
+        with self.assertRaises(ValueError):
+            pianoroll.piano_roll(song, 0.125, unit='seconds')
+
+    def test_window(self):
+        roll = pianoroll.piano_roll(SONG, 48, start=96, stop=192, use_sustain=False)
+        self.assertEqual(roll.shape, (1, 128, 2))
+        self.assertEqual(roll[0, 0x40].tolist(), [0x30, 0])
+        self.assertEqual(np.count_nonzero(roll), 1)
+        roll = pianoroll.piano_roll(SONG, 48, start=96, stop=192)
+        self.assertEqual(roll[0, 0x3c].tolist(), [0x40, 0x40])
+
+    def test_seconds_window_reads_events_up_to_stop(self):
+        song = midi_file(*([(tick, event) for tick, event in absolute_events(track.events)] for track in SONG.tracks),
+                         [(0, ControllerEvent(1, b'\x07\x40')), (1000, ControllerEvent(1, b'\x07\x40')),
+                          (1100, NoteOffEvent(1, b'\x3c\x40'))])
+        data = bytearray(song.to_bytes())
+        data[-3] = 0xf4  # An invalid status byte two events after stop.
+        song = MidiFile.from_buffer(bytes(data), lazy=True)
+        roll = pianoroll.piano_roll(song, 0.125, unit='seconds', start=0.25, stop=0.5, use_sustain=False)
+        self.assertEqual(roll.tolist(), pianoroll.piano_roll(SONG, 48, start=96, stop=192, use_sustain=False).tolist())
+        with self.assertRaises(ValueError):
+            pianoroll.piano_roll(song, 0.125, unit='seconds')
+
+    def test_layering(self):
+        roll = pianoroll.piano_roll(SONG, 48, layering='channel')
+        self.assertEqual(roll.shape, (16, 128, 5))
+        self.assertEqual(roll[9, 0x24].tolist(), [0, 0x64, 0, 0, 0])
+        self.assertEqual(np.count_nonzero(roll[0, 0x24]), 0)
+        roll = pianoroll.piano_roll(SONG, 48, layering='program', use_sustain=False)
+        self.assertEqual(roll[5, 0x3c].tolist(), [0x40, 0x40, 0, 0, 0])
+        self.assertEqual(roll[7, 0x3c].tolist(), [0, 0, 0, 0, 0x7f])
+        self.assertEqual(roll[0, 0x24].tolist(), [0, 0x64, 0, 0, 0])
+
+    def test_overlapping_notes_keep_the_largest_value(self):
+        roll = pianoroll.render([0, 5], [20, 15], [60, 60], np.array([10, 20], dtype=np.uint8), 10)
+        self.assertEqual(roll[0, 60].tolist(), [20, 20])
+
+    @unittest.skipIf(scipy is None, "scipy is not installed")
+    def test_sparse(self):
+        sparse = pianoroll.piano_roll(SONG, 48, layering='channel', sparse=True)
+        self.assertEqual(sparse.shape, (16 * 128, 5))
+        dense = pianoroll.piano_roll(SONG, 48, layering='channel')
+        self.assertEqual(sparse.toarray().tolist(), dense.reshape(16 * 128, 5).tolist())
+
+    @unittest.skipIf(scipy is None, "scipy is not installed")
+    def test_sparse_in_blocks(self):
+        dense = pianoroll.piano_roll(SONG, 48, layering='channel')
+        block_cells, pianoroll.SPARSE_BLOCK_CELLS = pianoroll.SPARSE_BLOCK_CELLS, 5
+        try:
+            sparse = pianoroll.piano_roll(SONG, 48, layering='channel', sparse=True)
+        finally:
+            pianoroll.SPARSE_BLOCK_CELLS = block_cells
+        self.assertEqual(sparse.toarray().tolist(), dense.reshape(16 * 128, 5).tolist())
+        empty = pianoroll.render([], [], [], np.zeros(0, dtype=np.uint8), 10, stop=30, sparse=True)
+        self.assertEqual((empty.shape, empty.nnz), ((128, 3), 0))
@@ -0,0 +1,87 @@
+import unittest
+import os
+import pickle
+import tempfile
+
+from benchmarks.corpus_generator import generate_midi_file
+from fileio import MidiFile, MidiTrack
+from seekindex import TrackIndex, indexes_from_bytes, indexes_to_bytes
+from tests.test_fileio import MIDI_FILE_BYTES, TRACK1_BYTES, TRACK1_EVENTS
+
+
+def absolute_events(events):
+    tick = 0
+    for delta_time, event in events:
+        tick += delta_time
+        yield tick, event
+
+
+class TrackIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.midi_file = MidiFile.from_buffer(generate_midi_file(number_of_events=4000, number_of_tracks=2))
+        self.track = self.midi_file.tracks[1]
+        self.events = list(absolute_events(self.track.events))
+
+    def test_build(self):
+        index = TrackIndex.build(TRACK1_BYTES, interval=2)
+        self.assertEqual(list(index.ticks), [0, 0x60, 0x60])
+        self.assertEqual(list(index.offsets), [0, 7, 16])
+        self.assertEqual(list(index.running_statuses), [0, 0x90, 0])
+        self.assertEqual(index.size, len(TRACK1_BYTES))
+
+    def test_invalid_interval(self):
+        for interval in (0, -16):
+            with self.assertRaises(ValueError):
+                TrackIndex.build(TRACK1_BYTES, interval)
+            with self.assertRaises(ValueError):
+                self.track.build_index(interval)
+
+    def test_events_from(self):
+        self.track.build_index(interval=16)
+        last_tick = self.events[-1][0]
+        for tick in (0, 1, self.events[100][0], self.events[101][0] + 1, last_tick, last_tick + 1):
+            expected = [(t, e) for t, e in self.events if t >= tick]
+            self.assertEqual(list(self.track.events_from(tick)), expected)
+
+    def test_events_from_running_status_checkpoint(self):
+        track = MidiTrack.from_buffer(MIDI_FILE_BYTES, 14 + 8 + 11)
+        track.build_index(interval=1)
+        expected = [(t, e) for t, e in absolute_events(TRACK1_EVENTS) if t >= 0x60]
+        self.assertEqual(list(track.events_from(0x60)), expected)
+
+    def test_events_from_without_index(self):
+        expected = [(t, e) for t, e in self.events if t >= 500]
+        self.assertEqual(list(self.track.events_from(500)), expected)
+
+    def test_build_index_of_unparsed_track(self):
+        track = MidiTrack(events=TRACK1_EVENTS)
+        track.build_index(interval=2)
+        self.assertEqual(list(track.events_from(0x61)), list(absolute_events(TRACK1_EVENTS))[-2:])
+
+    def test_to_bytes(self):
+        index = self.track.build_index(interval=16)
+        self.assertEqual(TrackIndex.from_bytes(b'x' + index.to_bytes(), 1), (index, len(index.to_bytes()) + 1))
+        indexes = self.midi_file.build_indexes()
+        self.assertEqual(indexes_from_bytes(indexes_to_bytes(indexes)), indexes)
+
+    def test_save_and_load_indexes(self):
+        indexes = self.midi_file.build_indexes(interval=32)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "file.mtix")
+            self.midi_file.save_indexes(filename)
+            midi_file = MidiFile.from_buffer(generate_midi_file(number_of_events=4000, number_of_tracks=2))
+            midi_file.load_indexes(filename)
+            self.assertEqual([track.index for track in midi_file.tracks], indexes)
+            with self.assertRaises(ValueError):
+                MidiFile.from_buffer(MIDI_FILE_BYTES).load_indexes(filename)
+
+    def test_wrong_data(self):
+        index = TrackIndex.build(TRACK1_BYTES)
+        with self.assertRaises(ValueError):
+            list(index.events_from(TRACK1_BYTES + b'\x00\x90\x3c\x40', 0))
+
+    def test_pickle_parsed_track(self):
+        track = pickle.loads(pickle.dumps(self.track))
+        self.assertEqual(track.events, self.track.events)
+        self.assertEqual(track.data, self.track.data)
@@ -0,0 +1,80 @@
+import unittest
+
+from events import MetaEvent, NoteOnEvent
+from fileio import MidiFile, MidiTrack
+from tempo import TempoMap, np
+
+
+def tempo_event(microseconds):
+    return MetaEvent(0x51, microseconds.to_bytes(3, 'big'))
+
+
+class TempoMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.midi_file = MidiFile(1, 96)
+        self.midi_file.tracks = [
+            MidiTrack(events=[(96, tempo_event(1000000)), (96, tempo_event(250000))]),
+            MidiTrack(events=[(0, NoteOnEvent(0, b'\x3c\x40')), (1000, NoteOnEvent(0, b'\x3c\x00'))]),
+        ]
+        self.tempo_map = TempoMap.from_midi_file(self.midi_file)
+
+    def test_tick_to_seconds(self):
+        tempo_map = self.tempo_map
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(0), 0)
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(48), 0.25)
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(96), 0.5)
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(144), 1.0)
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(192), 1.5)
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(288), 1.75)
+
+    def test_seconds_to_tick(self):
+        for tick in (0, 10, 96, 100, 192, 500):
+            self.assertAlmostEqual(self.tempo_map.seconds_to_tick(self.tempo_map.tick_to_seconds(tick)), tick)
+
+    def test_until_seconds(self):
+        tempo_map = TempoMap.until_seconds(self.midi_file, 1.0)
+        self.assertEqual(tempo_map.ticks, [0, 96])
+        self.assertAlmostEqual(tempo_map.seconds_to_tick(0.75), 120)
+        tempo_map = TempoMap.until_seconds(self.midi_file, 2.0)
+        self.assertEqual(tempo_map.ticks, self.tempo_map.ticks)
+        self.assertEqual(tempo_map.seconds_per_tick, self.tempo_map.seconds_per_tick)
+
+    def test_default_tempo(self):
+        self.assertAlmostEqual(TempoMap(480).tick_to_seconds(960), 1.0)
+
+    def test_tempo_changes_at_same_tick(self):
+        tempo_map = TempoMap(96, [(0, 1000000), (0, 250000)])
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(96), 0.25)
+
+    def test_smpte(self):
+        tempo_map = TempoMap(0xe728, [(0, 1000000)])  # 25 frames per second, 40 ticks per frame
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(1000), 1.0)
+        self.assertAlmostEqual(tempo_map.seconds_to_tick(2.0), 2000)
+        self.assertAlmostEqual(TempoMap(0xe350).tick_to_seconds(2400), 1001 / 1000)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_vectorized(self):
+        ticks = np.arange(0, 400, 7)
+        seconds = self.tempo_map.ticks_to_seconds(ticks)
+        self.assertTrue(np.allclose(seconds, [self.tempo_map.tick_to_seconds(t) for t in ticks.tolist()]))
+        self.assertTrue(np.allclose(self.tempo_map.seconds_to_ticks(seconds), ticks))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_from_track_arrays(self):
+        arrays = [track.to_arrays() for track in self.midi_file.tracks]
+        tempo_map = TempoMap.from_track_arrays(96, arrays)
+        self.assertEqual(tempo_map.ticks, self.tempo_map.ticks)
+        self.assertEqual(tempo_map.seconds_per_tick, self.tempo_map.seconds_per_tick)
+
+    def test_invalid_tempo_events(self):
+        for data in (b'', b'\x07\xa1', b'\x07\xa1\x20\x00'):
+            self.midi_file.tracks[0].events.append((0, MetaEvent(0x51, data)))
+            with self.assertRaises(ValueError):
+                TempoMap.from_midi_file(self.midi_file)
+            with self.assertRaises(ValueError):
+                TempoMap.until_seconds(self.midi_file, 10.0)
+            if np is not None:
+                with self.assertRaises(ValueError):
+                    TempoMap.from_track_arrays(96, [track.to_arrays() for track in self.midi_file.tracks])
+            self.midi_file.tracks[0].events.pop()
@@ -0,0 +1,48 @@
+import unittest
+
+from events import MetaEvent, NoteOnEvent, NoteOffEvent
+from fileio import MidiTrack
+from trackdiff import TrackDiff, diff_tracks
+
+
+def track(*events):
+    """Creates a track from (tick, event) tuples."""
+    previous, delta_events = 0, []
+    for tick, event in events:
+        delta_events.append((tick - previous, event))
+        previous = tick
+    return MidiTrack(events=delta_events)
+
+
+class DiffTracksTest(unittest.TestCase):
+
+    def test_equal_tracks(self):
+        old = track((0, NoteOnEvent(0, b'\x3c\x40')), (10, NoteOffEvent(0, b'\x3c\x40')))
+        self.assertEqual(diff_tracks(old, old), TrackDiff([], [], []))
+
+    def test_reordered_within_tick(self):
+        old = track((0, NoteOnEvent(0, b'\x3c\x40')), (0, NoteOnEvent(0, b'\x3e\x40')))
+        new = track((0, NoteOnEvent(0, b'\x3e\x40')), (0, NoteOnEvent(0, b'\x3c\x40')))
+        self.assertEqual(diff_tracks(old, new), TrackDiff([], [], []))
+
+    def test_inserted_deleted_and_moved(self):
+        old = track((0, MetaEvent(0x03, b'Piano')),
+                    (0, NoteOnEvent(0, b'\x3c\x40')),
+                    (10, NoteOnEvent(0, b'\x3c\x00')),
+                    (10, NoteOnEvent(0, b'\x3e\x40')),
+                    (20, NoteOnEvent(0, b'\x3e\x00')))
+        new = track((0, MetaEvent(0x03, b'Organ')),
+                    (0, NoteOnEvent(0, b'\x3c\x40')),
+                    (15, NoteOnEvent(0, b'\x3c\x00')),
+                    (20, NoteOnEvent(0, b'\x3e\x00')),
+                    (30, NoteOnEvent(0, b'\x40\x40')))
+        diff = diff_tracks(old, new)
+        self.assertEqual(diff.inserted, [(0, MetaEvent(0x03, b'Organ')), (30, NoteOnEvent(0, b'\x40\x40'))])
+        self.assertEqual(diff.deleted, [(0, MetaEvent(0x03, b'Piano')), (10, NoteOnEvent(0, b'\x3e\x40'))])
+        self.assertEqual(diff.moved, [(10, 15, NoteOnEvent(0, b'\x3c\x00'))])
+
+    def test_repeated_events_move_in_tick_order(self):
+        old = track((0, NoteOnEvent(0, b'\x3c\x40')), (10, NoteOnEvent(0, b'\x3c\x40')))
+        new = track((5, NoteOnEvent(0, b'\x3c\x40')), (15, NoteOnEvent(0, b'\x3c\x40')))
+        self.assertEqual([(old_tick, new_tick) for old_tick, new_tick, _ in diff_tracks(old, new).moved],
+                         [(0, 5), (10, 15)])
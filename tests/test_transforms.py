@@ -0,0 +1,86 @@
+import unittest
+
+from arrays import np
+from events import MetaEvent, NoteOnEvent, NoteOffEvent, ControllerEvent
+from fileio import MidiFile, MidiTrack
+from tests.test_fileio import MIDI_FILE_BYTES, TRACK1_EVENTS
+
+if np is not None:
+    import transforms
+
+
+def note_track():
+    return MidiTrack(events=[
+        (0, NoteOnEvent(0, b'\x3c\x40')),
+        (0, NoteOnEvent(9, b'\x24\x7f')),
+        (0, ControllerEvent(0, b'\x07\x64')),
+        (47, NoteOffEvent(0, b'\x3c\x40')),
+        (2, NoteOnEvent(0, b'\x7e\x10')),
+        (100, NoteOnEvent(0, b'\x7e\x00')),
+        (0, MetaEvent(0x2f, b'')),
+    ])
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TransformsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.arrays = note_track().to_arrays()
+
+    def test_transpose(self):
+        arrays = transforms.transpose(self.arrays, 3, channels=range(9))
+        self.assertEqual(arrays.data1.tolist(), [0x3f, 0x24, 0x07, 0x3f, 0x7f, 0x7f, 0x2f])
+        arrays = transforms.transpose(self.arrays, -0x30)
+        self.assertEqual(arrays.data1.tolist(), [0x0c, 0, 0x07, 0x0c, 0x4e, 0x4e, 0x2f])
+        arrays = transforms.transpose(self.arrays, np.int64(3), channels=range(9))
+        self.assertEqual(arrays.data1.tolist(), [0x3f, 0x24, 0x07, 0x3f, 0x7f, 0x7f, 0x2f])
+        with self.assertRaises(TypeError):
+            transforms.transpose(self.arrays, 1.5)
+
+    def test_map_velocities(self):
+        arrays = transforms.map_velocities(self.arrays, lambda velocities: velocities * 2)
+        self.assertEqual(arrays.data2.tolist(), [0x7f, 0x7f, 0x64, 0x40, 0x20, 0, 0])
+        arrays = transforms.map_velocities(self.arrays, transforms.power_curve(scale=0.5), channels={9})
+        self.assertEqual(arrays.data2.tolist(), [0x40, 0x40, 0x64, 0x40, 0x10, 0, 0])
+        with self.assertRaises(ValueError):
+            transforms.map_velocities(self.arrays, [1, 2, 3])
+
+    def test_remap_channels(self):
+        arrays = transforms.remap_channels(self.arrays, {0: 2, 9: 0})
+        self.assertEqual(arrays.status.tolist(), [0x92, 0x90, 0xb2, 0x82, 0x92, 0x92, 0xff])
+        with self.assertRaises(ValueError):
+            transforms.remap_channels(self.arrays, {0: 16})
+
+    def test_quantize(self):
+        arrays = transforms.quantize(self.arrays, 48)
+        self.assertEqual(arrays.tick.tolist(), [0, 0, 0, 48, 48, 144, 149])
+        self.assertEqual(arrays.delta.tolist(), [0, 0, 0, 48, 0, 96, 5])
+        arrays = transforms.quantize(self.arrays, 96, statuses=(0x90, 0xa0))
+        self.assertEqual(arrays.tick.tolist(), [0, 0, 0, 47, 96, 192, 192])
+        self.assertEqual(arrays.status.tolist(), [0x90, 0x99, 0xb0, 0x80, 0x90, 0x90, 0xff])
+        arrays = transforms.quantize(self.arrays, 96, strength=0.5)
+        self.assertEqual(arrays.tick.tolist(), [0, 0, 0, 23, 73, 171, 171])
+        arrays = transforms.quantize(self.arrays, np.int32(48))
+        self.assertEqual(arrays.tick.tolist(), [0, 0, 0, 48, 48, 144, 149])
+        with self.assertRaises(ValueError):
+            transforms.quantize(self.arrays, 48.0)
+
+    def test_track_transform(self):
+        track = note_track()
+        track.transform(transforms.transpose, 12, channels={0})
+        self.assertEqual(track.events[0], (0, NoteOnEvent(0, b'\x48\x40')))
+        self.assertEqual(track.events[1], (0, NoteOnEvent(9, b'\x24\x7f')))
+        self.assertTrue(track.modified)
+
+    def test_file_transform(self):
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        midi_file.transform(transforms.remap_channels, {0: 5}, tracks=[1])
+        events = midi_file.tracks[1].events
+        self.assertEqual([events[i][1].channel for i in (0, 1, 2, 4)], [5, 5, 5, 5])
+        self.assertEqual([events[i] for i in (3, 5)], [TRACK1_EVENTS[i] for i in (3, 5)])
+        self.assertFalse(midi_file.tracks[0].modified)
+
+    def test_transform_buffer(self):
+        midi_file = MidiFile.from_buffer(MIDI_FILE_BYTES)
+        midi_file.transform(transforms.transpose, 2)
+        self.assertEqual(transforms.transform_buffer(MIDI_FILE_BYTES, transforms.transpose, 2), midi_file.to_bytes())
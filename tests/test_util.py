@@ -1,5 +1,6 @@
 import unittest
 import io
+import random
 import util
 
 
@@ -20,6 +21,14 @@ class VariableLengthTest(unittest.TestCase):
                              "{} not equal {}".format(bytes_, correct_number))
             self.assertEqual(stream.tell(), len(bytes_))
 
+    def test_read_variable_length_at(self):
+        for bytes_, correct_number in self.bytes_to_test:
+            buffer = b'\x00' + bytes_
+            number, offset = util.read_variable_length_int_at(buffer, 1)
+            self.assertEqual(number, correct_number,
+                             "{} not equal {}".format(bytes_, correct_number))
+            self.assertEqual(offset, len(buffer))
+
     def test_int_to_variable_length(self):
         for bytes_, number in self.bytes_to_test:
             var_bytes = util.int_to_variable_bytes(number)
@@ -40,6 +49,41 @@ class VariableLengthTest(unittest.TestCase):
         self.assertEqual(my_bytes[:2], util.int_to_variable_bytes(length))
 
 
+class FastVariableLengthTest(unittest.TestCase):
+    numbers = list(range(0x4100)) + [0x1fffff, 0x200000, 0x200001, 0x0fffffff] \
+        + [random.Random(0).randrange(0x10000000) for _ in range(1000)]
+
+    def test_same_as_reference(self):
+        for number in self.numbers:
+            reference = bytes(reversed([b | 0x80 if i else b for i, b in enumerate(util.seven_bit_iterator(number))]))
+            encoded = util.encode_variable_length_int(number)
+            self.assertEqual(encoded, reference)
+            self.assertEqual(util.int_to_variable_bytes(number), reference)
+            self.assertEqual(util.read_variable_length_int_at(encoded, 0), (number, len(encoded)))
+            self.assertEqual(util.read_variable_length_int(io.BytesIO(encoded)), number)
+
+    def test_encode_sequence(self):
+        encoded = util.encode_variable_length_ints(self.numbers)
+        self.assertEqual(encoded, b''.join(map(util.int_to_variable_bytes, self.numbers)))
+
+    def test_reject_more_than_four_bytes(self):
+        with self.assertRaises(ValueError):
+            util.read_variable_length_int_at(b'\x81\x80\x80\x80\x00', 0)
+        with self.assertRaises(ValueError):
+            util.encode_variable_length_int(0x10000000)
+        with self.assertRaises(ValueError):
+            util.encode_variable_length_int(-1)
+        self.assertEqual(util.int_to_variable_bytes(0x10000000), b'\x81\x80\x80\x80\x00')
+
+    def test_read_delta_times(self):
+        data = (b'\x00\x90\x3c\x40'
+                b'\x81\x00\x3c\x00'
+                b'\x05\xf8\xc0\x05'
+                b'\x06\xff\x01\x02ab'
+                b'\x07\xf0\x01\xf7')
+        self.assertEqual(util.read_delta_times(b'xx' + data, 2, 2 + len(data)), [0, 0x80, 5, 6, 7])
+
+
 class BitOperationsTest(unittest.TestCase):
 
     def test_first_bit_and_rest(self):
@@ -50,3 +94,13 @@ class BitOperationsTest(unittest.TestCase):
         self.assertEqual(util.get_nibbles(0xff), (0xf, 0xf))
         self.assertEqual(util.get_nibbles(0x37), (0x3, 0x7))
         self.assertEqual(util.get_nibbles(0x00), (0x0, 0x0))
+
+
+class SkipTest(unittest.TestCase):
+
+    def test_skip_bytes(self):
+        stream = io.BytesIO(bytes(util.SKIP_BLOCK_SIZE * 2 + 10))
+        util.skip_bytes(stream, util.SKIP_BLOCK_SIZE * 2 + 5)
+        self.assertEqual(stream.tell(), util.SKIP_BLOCK_SIZE * 2 + 5)
+        with self.assertRaises(ValueError):
+            util.skip_bytes(stream, 6)
@@ -0,0 +1,66 @@
+"""Differences between two versions of a track in linear time.
+
+Events are compared by their key, see events.base.BaseMidiEvent.key, and by absolute tick.
+The events at a tick are compared as a multiset, so reordering events within a tick is not a change.
+"""
+import collections
+
+
+# inserted and deleted are lists of (tick, event) tuples, moved is a list of
+# (old_tick, new_tick, event) tuples for events that only changed tick.
+TrackDiff = collections.namedtuple('TrackDiff', 'inserted deleted moved')
+
+
+def absolute_events(events):
+    """Yields (tick, event) tuples for a list of (delta_time, event) tuples."""
+    tick = 0
+    for delta_time, event in events:
+        tick += delta_time
+        yield tick, event
+
+
+def diff_tracks(old, new):
+    """Returns the TrackDiff between the events of two MidiTracks.
+
+    The common start and end of the tracks are skipped first, as edits are usually local.
+    Events of new are then matched with equal events at the same tick in old. Of the events
+    left over, the ones matching an event of old at another tick are moved, in tick order,
+    and the rest are inserted or deleted."""
+    old_events = list(absolute_events(old.events))
+    new_events = list(absolute_events(new.events))
+    start, old_stop, new_stop = 0, len(old_events), len(new_events)
+    while start < old_stop and start < new_stop and old_events[start] == new_events[start]:
+        start += 1
+    while old_stop > start and new_stop > start and old_events[old_stop - 1] == new_events[new_stop - 1]:
+        old_stop -= 1
+        new_stop -= 1
+
+    unmatched_old = collections.defaultdict(list)
+    for tick, event in old_events[start:old_stop]:
+        unmatched_old[tick, event.key()].append(event)
+
+    unmatched_new = []
+    for tick, event in new_events[start:new_stop]:
+        key = event.key()
+        matching = unmatched_old.get((tick, key))
+        if matching:
+            matching.pop()
+        else:
+            unmatched_new.append((tick, key, event))
+
+    # unmatched_old is in tick order, as ticks only increase and dicts keep insertion order.
+    old_ticks_by_key = collections.defaultdict(collections.deque)
+    for (tick, key), events in unmatched_old.items():
+        old_ticks_by_key[key].extend(tick for _ in events)
+
+    inserted, moved = [], []
+    for tick, key, event in unmatched_new:
+        old_ticks = old_ticks_by_key.get(key)
+        if old_ticks:
+            old_tick = old_ticks.popleft()
+            unmatched_old[old_tick, key].pop()
+            moved.append((old_tick, tick, event))
+        else:
+            inserted.append((tick, event))
+    deleted = [(tick, event) for (tick, _), events in unmatched_old.items() for event in events]
+    return TrackDiff(inserted, deleted, moved)
@@ -0,0 +1,127 @@
+"""Bulk transforms of the events of a track, working on all matching events at once.
+
+The transforms take TrackArrays and return new TrackArrays, so they also work on read-only
+arrays like the ones loaded from a cache.ParseCache. Arguments are validated once per call,
+and results are clamped to the valid range instead of checking every event. Use
+MidiTrack.transform and MidiFile.transform to apply them to parsed events, or
+transform_buffer to go from the bytes of a file to new bytes without event objects.
+Requires numpy.
+"""
+import numbers
+import struct
+
+from arrays import TrackArrays, np, require_numpy
+from fileio import MidiFile
+
+
+END_OF_TRACK = 0x2f
+
+
+def channel_mask(arrays, channels=None, statuses=(0x80, 0xf0)):
+    """Returns a boolean array selecting the channel events with a status in the half open range
+    statuses, on one of channels if it is given."""
+    low, high = statuses
+    mask = (arrays.status >= low) & (arrays.status < high)
+    if channels is not None:
+        mask &= np.isin(arrays.status & 0x0f, list(channels))
+    return mask
+
+
+def replace(arrays, **columns):
+    """Returns new TrackArrays with some of the columns replaced."""
+    values = {name: getattr(arrays, name) for name in TrackArrays.columns}
+    values.update(columns)
+    return TrackArrays(payload=arrays.payload, **values)
+
+
+def transpose(arrays, semitones, channels=None):
+    """Transposes note on, note off and note aftertouch events, clamping notes to 0-127.
+
+    Leave out channel 9 to keep General MIDI drums."""
+    if not isinstance(semitones, numbers.Integral):
+        raise TypeError("semitones has to be an integer")
+    mask = channel_mask(arrays, channels, (0x80, 0xb0))
+    data1 = arrays.data1.copy()
+    data1[mask] = np.clip(data1[mask].astype(np.int64) + semitones, 0, 127)
+    return replace(arrays, data1=data1)
+
+
+def map_velocities(arrays, curve, channels=None):
+    """Maps the velocities of note on events through curve, clamped to 1-127.
+
+    curve is a sequence of 128 velocities indexed by the old velocity, like power_curve
+    returns, or a function mapping an array of velocities to new velocities.
+    Note on events with velocity 0 are note offs and are left alone."""
+    mask = channel_mask(arrays, channels, (0x90, 0xa0)) & (arrays.data2 > 0)
+    velocities = arrays.data2[mask]
+    if callable(curve):
+        new_velocities = np.asarray(curve(velocities.astype(np.float64)))
+    else:
+        table = np.asarray(curve)
+        if table.shape != (128,):
+            raise ValueError("curve has to have 128 entries, got shape {}".format(table.shape))
+        new_velocities = table[velocities]
+    data2 = arrays.data2.copy()
+    data2[mask] = np.clip(np.rint(new_velocities), 1, 127)
+    return replace(arrays, data2=data2)
+
+
+def power_curve(exponent=1.0, scale=1.0):
+    """Returns a velocity curve table of scale * 127 * (velocity / 127) ** exponent.
+
+    Exponents below 1 make soft notes louder, above 1 softer."""
+    return scale * 127 * (np.arange(128) / 127) ** exponent
+
+
+def remap_channels(arrays, mapping):
+    """Moves channel events to other channels. mapping is a dict from old to new channel."""
+    table = np.arange(16, dtype=np.uint8)
+    for old, new in mapping.items():
+        if not (0 <= old < 16 and 0 <= new < 16):
+            raise ValueError("Channels have to be between 0 and 15, got {} -> {}".format(old, new))
+        table[old] = new
+    mask = channel_mask(arrays)
+    status = arrays.status.copy()
+    status[mask] = status[mask] & 0xf0 | table[status[mask] & 0x0f]
+    return replace(arrays, status=status)
+
+
+def quantize(arrays, grid, strength=1.0, channels=None, statuses=(0x80, 0xf0)):
+    """Moves the absolute ticks of the selected channel events towards the closest multiple of grid.
+
+    strength is the fraction of the distance to move, 1 snaps to the grid. The events are then
+    sorted by tick again, keeping their order within a tick, and the delta times recomputed.
+    An end of track event stays last. By default all channel events are quantized, give
+    statuses=(0x90, 0xa0) to only quantize note on events.
+    """
+    if not (isinstance(grid, numbers.Integral) and grid > 0):
+        raise ValueError("grid has to be a positive integer")
+    if not 0 <= strength <= 1:
+        raise ValueError("strength has to be between 0 and 1")
+    mask = channel_mask(arrays, channels, statuses)
+    tick = arrays.tick.copy()
+    selected = tick[mask]
+    snapped = (selected + grid // 2) // grid * grid
+    tick[mask] = selected + np.rint((snapped - selected) * strength).astype(np.int64)
+
+    if len(tick) and arrays.status[-1] == 0xff and arrays.data1[-1] == END_OF_TRACK:
+        tick[-1] = tick.max()
+    order = np.argsort(tick, kind='stable')
+    tick = tick[order]
+    delta = np.diff(tick, prepend=0)
+    columns = {name: getattr(arrays, name)[order] for name in TrackArrays.columns}
+    columns.update(delta=delta, tick=tick)
+    return TrackArrays(payload=arrays.payload, **columns)
+
+
+def transform_buffer(buffer, function, *args, **kwargs):
+    """Applies function(arrays, *args, **kwargs) to every track of the midi file in buffer.
+
+    Returns the bytes of the transformed file, no event objects are created."""
+    require_numpy()
+    format_type, time_division, track_arrays = MidiFile.arrays_from_buffer(buffer)
+    output = bytearray(b'MThd')
+    output += struct.pack(">LHHH", 6, format_type, len(track_arrays), time_division)
+    for arrays in track_arrays:
+        function(arrays, *args, **kwargs).append_to(output)
+    return bytes(output)
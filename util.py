@@ -46,8 +46,18 @@ def seven_bit_numbers_to_int(sequence):
 def read_variable_length_int(stream):
     """Reads a sequence of variable length bytes and gets the integer value.
 
-    As specified in the MIDI specification."""
-    return seven_bit_numbers_to_int(bytes(variable_bytes_iterator(stream)))
+    As specified in the MIDI specification.
+    Gives the same result as seven_bit_numbers_to_int(bytes(variable_bytes_iterator(stream))),
+    without the generators."""
+    value = 0
+    while True:
+        data = stream.read(1)
+        if not data:
+            return value
+        byte = data[0]
+        value = (value << 7) | (byte & 0x7f)
+        if byte < 0x80:
+            return value
 
 
 def read_variable_length_data(stream):
@@ -61,6 +71,31 @@ def read_variable_length_data(stream):
     return data
 
 
+# Size of the blocks read when skipping data in a stream that can not seek.
+SKIP_BLOCK_SIZE = 1 << 16
+
+
+def skip_bytes(stream, size):
+    """Reads and discards size bytes of stream, SKIP_BLOCK_SIZE at a time."""
+    while size > 0:
+        data = stream.read(min(size, SKIP_BLOCK_SIZE))
+        if not data:
+            raise ValueError("The stream ended while skipping {} bytes".format(size))
+        size -= len(data)
+
+
+def skip_variable_length_data(stream):
+    """Skips variable length data, seeking past it if the stream is seekable.
+
+    Other streams, like pipes and devices, are read with skip_bytes."""
+    length = read_variable_length_int(stream)
+    seekable = getattr(stream, 'seekable', None)
+    if seekable is not None and seekable():
+        stream.seek(length, 1)
+    else:
+        skip_bytes(stream, length)
+
+
 def seven_bit_iterator(integer):
     """Iterates through the least significant seven bits of an integer."""
     while True:
@@ -72,6 +107,8 @@ def seven_bit_iterator(integer):
 
 def int_to_variable_bytes(integer):
     """Converts an integer to the midi variable length format."""
+    if 0 <= integer <= MAX_VARIABLE_LENGTH_INT:
+        return encode_variable_length_int(integer)
     seven_bits = seven_bit_iterator(integer)
     var_bytes = bytearray([next(seven_bits)])
     var_bytes.extend(b | 0x80 for b in seven_bits)
@@ -89,6 +126,114 @@ def write_variable_length_data(stream, data):
     stream.write(data)
 
 
+# Fast variable length quantity codec, limited to the 4 bytes allowed by the MIDI specification.
+
+MAX_VARIABLE_LENGTH_INT = 0x0fffffff
+
+_SINGLE_BYTES = [bytes((i,)) for i in range(0x80)]
+
+
+def encode_variable_length_int(integer):
+    """Converts an integer to the midi variable length format.
+
+    Raises ValueError if the integer does not fit in 4 bytes."""
+    if integer < 0x80:
+        if integer < 0:
+            raise ValueError("Variable length integers can not be negative: {}".format(integer))
+        return _SINGLE_BYTES[integer]
+    if integer < 0x4000:
+        return bytes((integer >> 7 | 0x80, integer & 0x7f))
+    if integer < 0x200000:
+        return bytes((integer >> 14 | 0x80, integer >> 7 & 0x7f | 0x80, integer & 0x7f))
+    if integer <= MAX_VARIABLE_LENGTH_INT:
+        return bytes((integer >> 21 | 0x80, integer >> 14 & 0x7f | 0x80, integer >> 7 & 0x7f | 0x80,
+                      integer & 0x7f))
+    raise ValueError("Variable length integers have to fit in 4 bytes: {}".format(integer))
+
+
+def encode_variable_length_ints(integers):
+    """Encodes a sequence of integers into one bytes object."""
+    return b''.join(map(encode_variable_length_int, integers))
+
+
+# Buffer operations.
+
+def read_variable_length_int_at(buffer, offset):
+    """Reads a variable length integer from buffer starting at offset.
+
+    Returns a tuple of the form (integer, new_offset).
+    Raises ValueError if it is longer than 4 bytes."""
+    byte = buffer[offset]
+    if byte < 0x80:
+        return byte, offset + 1
+    value = byte & 0x7f
+    byte = buffer[offset + 1]
+    if byte < 0x80:
+        return value << 7 | byte, offset + 2
+    value = value << 7 | byte & 0x7f
+    byte = buffer[offset + 2]
+    if byte < 0x80:
+        return value << 7 | byte, offset + 3
+    value = value << 7 | byte & 0x7f
+    byte = buffer[offset + 3]
+    if byte < 0x80:
+        return value << 7 | byte, offset + 4
+    raise ValueError("Variable length integer longer than 4 bytes at offset {}".format(offset))
+
+
+def unsupported_status_error(status):
+    """Returns the error for the system common and real-time status bytes 0xf1-0xf6 and
+    0xf9-0xfe, which are not allowed in midi files."""
+    return ValueError("Unsupported status byte: 0x{:02x}".format(status))
+
+
+def skip_event_at(buffer, offset, running_status=None):
+    """Skips the event starting at offset in buffer without creating an event object.
+
+    Returns a tuple of the form (running_status, new_offset), where running status is None after
+    meta and SysEx events."""
+    status = buffer[offset]
+    while status == 0xf8:  # Filter out MIDI-beat clock
+        offset += 1
+        status = buffer[offset]
+    if status == 0xff or status == 0xf0 or status == 0xf7:
+        length, offset = read_variable_length_int_at(buffer, offset + 2 if status == 0xff else offset + 1)
+        return None, offset + length
+    if status >= 0xf0:
+        raise unsupported_status_error(status)
+    if status >= 0x80:
+        return status, offset + (3 if has_two_params(status) else 2)
+    if running_status is None:
+        raise ValueError("Running status without a preceding channel event")
+    return running_status, offset + (2 if has_two_params(running_status) else 1)
+
+
+def read_delta_times(buffer, offset, stop):
+    """Decodes the delta times of all events in the track chunk data between offset and stop.
+
+    The events are only skipped, no event objects are created."""
+    delta_times = []
+    running_status = None
+    while offset < stop:
+        delta_time, offset = read_variable_length_int_at(buffer, offset)
+        delta_times.append(delta_time)
+        running_status, offset = skip_event_at(buffer, offset, running_status)
+    return delta_times
+
+
+def read_variable_length_data_at(buffer, offset):
+    """Reads variable length data from buffer starting at offset.
+
+    The data is returned as a slice of buffer, so no copy is made if buffer is a memoryview.
+    Returns a tuple of the form (data, new_offset).
+    """
+    length, offset = read_variable_length_int_at(buffer, offset)
+    end = offset + length
+    data = buffer[offset:end]
+    assert len(data) == length
+    return data, end
+
+
 # Functions for fixing running status on midi channel events
 
 def is_real_status(status):
@@ -111,3 +256,15 @@ def get_status_and_params(stream, status, running_status=None):
     if has_two_params(status):
         params.extend(stream.read(1))
     return status, params
+
+
+def get_status_and_params_at(buffer, offset, status, running_status=None):
+    """Buffer version of get_status_and_params.
+
+    offset is the position right after the status byte.
+    Returns a tuple of the form (status, params, new_offset)."""
+    if not is_real_status(status):
+        status = running_status
+        offset -= 1
+    end = offset + 2 if has_two_params(status) else offset + 1
+    return status, bytearray(buffer[offset:end]), end